@@ -0,0 +1,30 @@
+import time
+
+import numpy as np
+from synergy.combination import BRAID, Zimmer
+from synergy.utils.dose_tools import grid
+
+# Times BRAID and Zimmer fits with the analytic Jacobian against finite differences, on noisy data from known parameters
+
+D1, D2 = grid(1e-3,1e0,1e-2,1e1,8,8, include_zero=True)
+
+models = [
+    ("BRAID", BRAID, BRAID(E0=1, E1=0.2, E2=0.1, E3=0, h1=2.3, h2=0.8, C1=1e-2, C2=1e-1, kappa=1, delta=0.5)),
+    ("Zimmer", Zimmer, Zimmer(h1=2.3, h2=0.8, C1=1e-2, C2=1e-1, a12=-0.5, a21=1.2)),
+]
+
+n_repeats = 20
+
+for name, model_class, truth in models:
+    np.random.seed(0)
+    E = [truth.E(D1, D2) + np.random.normal(0, 0.02, len(D1)) for _ in range(n_repeats)]
+
+    for use_jacobian in [True, False]:
+        ssr = []
+        start = time.time()
+        for Ei in E:
+            model = model_class()
+            model.fit(D1, D2, Ei, use_jacobian=use_jacobian)
+            ssr.append(model.sum_of_squares_residuals)
+        elapsed = time.time() - start
+        print("%s use_jacobian=%s: %0.1f ms per fit, median SSR %0.4g"%(name, use_jacobian, 1000*elapsed/n_repeats, np.median(ssr)))
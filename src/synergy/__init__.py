@@ -4,4 +4,5 @@ __citation__="Wooten, DJ and Albert, RA. synergy - A Python library for calculat
 
 from . import combination
 from . import single
-from . import utils
\ No newline at end of file
+from . import utils
+from . import pipeline
@@ -34,17 +34,17 @@ class Bliss(DoseDependentModel):
         E = np.asarray(E)
         super().fit(d1,d2,E, drug1_model=drug1_model, drug2_model=drug2_model, **kwargs)
 
-        drug1_model = self.drug1_model
-        drug2_model = self.drug2_model
+        self.synergy, self.reference = self._get_synergy(d1, d2, E, self.drug1_model, self.drug2_model)
+        return self.synergy
 
+    def _get_synergy(self, d1, d2, E, drug1_model, drug2_model):
         E1_alone = drug1_model.E(d1)
         E2_alone = drug2_model.E(d2)
 
-        self.reference = E1_alone*E2_alone
-        self.synergy = self.reference - E
-        self.synergy[(d1==0) | (d2==0)] = 0
-
-        return self.synergy
+        reference = E1_alone*E2_alone
+        synergy = reference - E
+        synergy[(d1==0) | (d2==0)] = 0
+        return synergy, reference
 
     def _get_single_drug_classes(self):
         return MarginalLinear, None
\ No newline at end of file
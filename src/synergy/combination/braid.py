@@ -19,6 +19,7 @@ from .. import utils
 
 from ..single import Hill
 from .parametric_base import ParametricModel
+from .jacobians.braid_jacobian import jacobian
 
 class BRAID(ParametricModel):
     """BRAID synergy (doi:10.1038/srep25523).
@@ -73,16 +74,22 @@ class BRAID(ParametricModel):
         if variant == "kappa":
             self.fit_function = lambda d, E0, E1, E2, E3, logh1, logh2, logC1, logC2, kappa: self._model(d[0], d[1], E0, E1, E2, E3, np.exp(logh1), np.exp(logh2), np.exp(logC1), np.exp(logC2), kappa, 1)
 
+            self.jacobian_function = lambda d, E0, E1, E2, E3, logh1, logh2, logC1, logC2, kappa: jacobian(d[0], d[1], E0, E1, E2, E3, logh1, logh2, logC1, logC2, kappa, 0)[:,:-1]
+
             self.bounds = tuple(zip(self.E0_bounds, self.E1_bounds, self.E2_bounds, self.E3_bounds, self.logh1_bounds, self.logh2_bounds, self.logC1_bounds, self.logC2_bounds, self.kappa_bounds))
         
         elif variant == "delta":
             self.fit_function = lambda d, E0, E1, E2, E3, logh1, logh2, logC1, logC2, logdelta: self._model(d[0], d[1], E0, E1, E2, E3, np.exp(logh1), np.exp(logh2), np.exp(logC1), np.exp(logC2), 0, np.exp(logdelta))
 
+            self.jacobian_function = lambda d, E0, E1, E2, E3, logh1, logh2, logC1, logC2, logdelta: jacobian(d[0], d[1], E0, E1, E2, E3, logh1, logh2, logC1, logC2, 0, logdelta)[:,[0,1,2,3,4,5,6,7,9]]
+
             self.bounds = tuple(zip(self.E0_bounds, self.E1_bounds, self.E2_bounds, self.E3_bounds, self.logh1_bounds, self.logh2_bounds, self.logC1_bounds, self.logC2_bounds, self.logdelta_bounds))
         
         elif variant == "both":
             self.fit_function = lambda d, E0, E1, E2, E3, logh1, logh2, logC1, logC2, kappa, logdelta: self._model(d[0], d[1], E0, E1, E2, E3, np.exp(logh1), np.exp(logh2), np.exp(logC1), np.exp(logC2), kappa, np.exp(logdelta))
 
+            self.jacobian_function = lambda d, E0, E1, E2, E3, logh1, logh2, logC1, logC2, kappa, logdelta: jacobian(d[0], d[1], E0, E1, E2, E3, logh1, logh2, logC1, logC2, kappa, logdelta)
+
             self.bounds = tuple(zip(self.E0_bounds, self.E1_bounds, self.E2_bounds, self.E3_bounds, self.logh1_bounds, self.logh2_bounds, self.logC1_bounds, self.logC2_bounds, self.kappa_bounds, self.logdelta_bounds))
 
     def fit(self, d1, d2, E, drug1_model=None, drug2_model=None, use_jacobian = True, p0=None, bootstrap_iterations=0, **kwargs):
@@ -113,10 +120,10 @@ class BRAID(ParametricModel):
             # Fit the single drug models if they were not pre-fit by the user
             if not drug1_model.is_fit():
                 mask = np.where(d2==min(d2))
-                drug1_model.fit(d1[mask], E[mask])
+                utils.fit_cache.fit(drug1_model, d1[mask], E[mask])
             if not drug2_model.is_fit():
                 mask = np.where(d1==min(d1))
-                drug2_model.fit(d2[mask], E[mask])
+                utils.fit_cache.fit(drug2_model, d2[mask], E[mask])
             
             # Get initial guesses of E0, E1, E2, h1, h2, C1, and C2 from single-drug fits
             E0_1, E1, h1, C1 = drug1_model.get_parameters()
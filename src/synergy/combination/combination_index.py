@@ -36,21 +36,26 @@ class CombinationIndex(DoseDependentModel):
         E = np.asarray(E)
         super().fit(d1,d2,E, drug1_model=drug1_model, drug2_model=drug2_model, **kwargs)
 
-        drug1_model = self.drug1_model
-        drug2_model = self.drug2_model
+        self.synergy, self.reference = self._get_synergy(d1, d2, E, self.drug1_model, self.drug2_model)
+        return self.synergy
 
+    def _get_synergy(self, d1, d2, E, drug1_model, drug2_model):
         with np.errstate(divide='ignore', invalid='ignore'):
             d1_alone = drug1_model.E_inv(E)
             d2_alone = drug2_model.E_inv(E)
 
-            self.synergy = d1/d1_alone + d2/d2_alone
+            synergy = d1/d1_alone + d2/d2_alone
 
-        reference_model = Schindler()
-        self.reference = 1-reference_model._model(d1, d2, 1, 1, drug1_model.h, drug2_model.h, drug1_model.C, drug2_model.C)
+            reference_model = Schindler()
+            reference = 1-reference_model._model(d1, d2, 1, 1, drug1_model.h, drug2_model.h, drug1_model.C, drug2_model.C)
 
-        self.synergy[(d1==0) | (d2==0)] = 1
+        synergy[(d1==0) | (d2==0)] = 1
         
-        return self.synergy
+        return synergy, reference
+
+    def _get_synergy_direction(self):
+        # CI is synergistic below 1
+        return 1, -1
 
     def _get_single_drug_classes(self):
         return Hill_CI, Hill_CI
@@ -48,15 +48,19 @@ class HSA(DoseDependentModel):
         self.drug1_model = drug1_model
         self.drug2_model = drug2_model
 
+        self.synergy, self.reference = self._get_synergy(d1, d2, E, drug1_model, drug2_model)
+        return self.synergy
+
+    def _get_synergy(self, d1, d2, E, drug1_model, drug2_model):
         E1_alone = drug1_model.E(d1)
         E2_alone = drug2_model.E(d2)
 
-        self.reference = np.minimum(E1_alone, E2_alone)
-        #self.synergy = np.minimum(E1_alone-E, E2_alone-E)
-        self.synergy = self.reference - E
+        reference = np.minimum(E1_alone, E2_alone)
+        #synergy = np.minimum(E1_alone-E, E2_alone-E)
+        synergy = reference - E
         
-        self.synergy[(d1==0) | (d2==0)] = 0
-        return self.synergy
+        synergy[(d1==0) | (d2==0)] = 0
+        return synergy, reference
 
     def _get_single_drug_classes(self):
         return MarginalLinear, None
\ No newline at end of file
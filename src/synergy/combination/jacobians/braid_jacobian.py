@@ -0,0 +1,111 @@
+#    Copyright (C) 2020 David J. Wooten
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+
+def jacobian(d1, d2, E0, E1, E2, E3, logh1, logh2, logC1, logC2, kappa, logdelta):
+    """Evaluates Jacobian of BRAID (both kappa and delta)
+
+    The kappa variant corresponds to logdelta=0 (dropping the last column), and the delta variant to kappa=0 (dropping the second-to-last column).
+
+    Returns:
+    -----------
+    jacobian : numpy.ndarray
+        j_E0, j_E1, j_E2, j_E3, j_logh1, j_logh2, j_logC1, j_logC2, j_kappa, j_logdelta
+    """
+    h1 = np.exp(logh1)
+    h2 = np.exp(logh2)
+    C1 = np.exp(logC1)
+    C2 = np.exp(logC2)
+    delta = np.exp(logdelta)
+
+    # The E parameter with the largest |E-E0| sets the maximum effect (see BRAID._model)
+    delta_Es = [E1-E0, E2-E0, E3-E0]
+    max_delta_E_index = np.argmax(np.abs(delta_Es))
+    max_delta_E = delta_Es[max_delta_E_index]
+    is_max = [float(i == max_delta_E_index) for i in range(3)]
+
+    a1 = (E1-E0)/max_delta_E
+    a2 = (E2-E0)/max_delta_E
+
+    q = delta*np.sqrt(h1*h2) # q = 1/power in BRAID._model
+
+    x1 = np.power(d1/C1, h1)
+    x2 = np.power(d2/C2, h2)
+    den1 = 1 + (1-a1)*x1
+    den2 = 1 + (1-a2)*x2
+    D1 = a1*x1/den1
+    D2 = a2*x2/den2
+
+    u1 = np.power(D1, 1/q)
+    u2 = np.power(D2, 1/q)
+    u12 = np.sqrt(u1*u2)
+    D = u1 + u2 + kappa*u12
+
+    # Chain through each drug's "effective dose". Where a drug is absent its D is 0, and so are all of these derivatives.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Dq = np.power(D, -q)
+        F = 1/(1+Dq)
+        dF_dD = np.where(D > 0, q*Dq/D*F*F, 0)
+        dF_dD1 = np.where(D1 > 0, dF_dD*(u1 + kappa*u12/2)/(q*D1), 0)
+        dF_dD2 = np.where(D2 > 0, dF_dD*(u2 + kappa*u12/2)/(q*D2), 0)
+        logx1 = np.where(x1 > 0, np.log(x1), 0)
+        logx2 = np.where(x2 > 0, np.log(x2), 0)
+        logD1 = np.where(D1 > 0, np.log(D1), 0)
+        logD2 = np.where(D2 > 0, np.log(D2), 0)
+        logD = np.where(D > 0, np.log(D), 0)
+
+    # dF/dq, holding D1 and D2 fixed
+    dD_dq = -(u1*logD1 + u2*logD2 + kappa*u12*(logD1+logD2)/2)/(q*q)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dF_dq = np.where(D > 0, F*F*Dq*(logD + q*dD_dq/D), 0)
+
+    dD1_da1 = x1*(1+x1)/(den1*den1)
+    dD2_da2 = x2*(1+x2)/(den2*den2)
+    dD1_dx1 = a1/(den1*den1)
+    dD2_dx2 = a2/(den2*den2)
+
+    dF_da1 = dF_dD1*dD1_da1
+    dF_da2 = dF_dD2*dD2_da2
+
+    # ********** E parameters ********
+
+    # E = E0 + max_delta_E*F(a1, a2), with a_i = (E_i-E0)/max_delta_E
+    j_E0 = 1 - F + dF_da1*(a1-1) + dF_da2*(a2-1)
+    j_E1 = is_max[0]*F + dF_da1 - (dF_da1*a1 + dF_da2*a2)*is_max[0]
+    j_E2 = is_max[1]*F + dF_da2 - (dF_da1*a1 + dF_da2*a2)*is_max[1]
+    j_E3 = is_max[2]*F - (dF_da1*a1 + dF_da2*a2)*is_max[2]
+
+    # ********** logh ********
+
+    j_logh1 = max_delta_E*(dF_dD1*dD1_dx1*x1*logx1 + dF_dq*q/2)
+    j_logh2 = max_delta_E*(dF_dD2*dD2_dx2*x2*logx2 + dF_dq*q/2)
+
+    # ********** logC ********
+
+    j_logC1 = -max_delta_E*dF_dD1*dD1_dx1*x1*h1
+    j_logC2 = -max_delta_E*dF_dD2*dD2_dx2*x2*h2
+
+    # ********** kappa ********
+
+    j_kappa = max_delta_E*dF_dD*u12
+
+    # ********** logdelta ********
+
+    j_logdelta = max_delta_E*dF_dq*q
+
+    jac = np.hstack([np.broadcast_to(j, np.shape(D)).reshape(-1,1) for j in [j_E0, j_E1, j_E2, j_E3, j_logh1, j_logh2, j_logC1, j_logC2, j_kappa, j_logdelta]])
+    jac[np.isnan(jac)] = 0
+    return jac
@@ -116,7 +116,53 @@ def jacobian(d1, d2, E0, E1, E2, E3, logh1, logh2, logC1, logC2, r1r, r2r, logal
 
 
 
+    # The expressions above hold the forward rates r1 and r2 fixed, but the model holds r1r and r2r fixed (r1 = r1r/C1**h1), so changing h1 or C1 also changes r1. Scaling d1 and C1 together leaves E unchanged, so the missing chain-rule terms follow from the dose elasticities of E.
+    j_logd1, j_logd2 = _dose_elasticities(d1h1, d2h2, C1h1, C2h2, r1, r2, r1r, r2r, alpha21d1gamma21h1, alpha12d2gamma12h2, h1, h2, gamma12, gamma21, E0, E1, E2, E3)
+    j_logh1 = j_logh1 - logC1*(j_logC1 + j_logd1)
+    j_logh2 = j_logh2 - logC2*(j_logC2 + j_logd2)
+    j_logC1 = -j_logd1
+    j_logC2 = -j_logd2
+
     # E0, E1, E2, E3, logh1, logh2, logC1, logC2, logalpha12, logalpha21
     jac = np.hstack([j.reshape(-1,1) for j in [j_E0, j_E1, j_E2, j_E3, j_logh1, j_logh2, j_logC1, j_logC2, j_logalpha12, j_logalpha21, j_loggamma12, j_loggamma21]])
     jac[np.isnan(jac)] = 0
-    return jac
\ No newline at end of file
+    return jac
+
+def _dose_elasticities(d1h1, d2h2, C1h1, C2h2, r1, r2, r1r, r2r, alpha21d1gamma21h1, alpha12d2gamma12h2, h1, h2, gamma12, gamma21, E0, E1, E2, E3):
+    """Evaluates dE/dlog(d1) and dE/dlog(d2) of MuSyC, using the state fractions of MuSyC._model()
+
+    Returns:
+    -----------
+    j_logd1, j_logd2 : array_like
+    """
+    r1r_gamma21 = np.power(r1r, gamma21)
+    r2r_gamma12 = np.power(r2r, gamma12)
+    r12 = r1*r2*(r1r_gamma21 + r2r_gamma12)
+    a1 = np.power(r1, gamma21)*alpha21d1gamma21h1
+    a2 = np.power(r2, gamma12)*alpha12d2gamma12h2
+
+    # Unnormalized fractions of cells in each state
+    U = r12*C1h1*C2h2 + a1*r1*r2r_gamma12*C1h1 + a2*r2*r1r_gamma21*C2h2
+    A1 = d1h1*(r12*C2h2 + a1*r1*r2r_gamma12) + d2h2*r2*a1*r2r_gamma12
+    A2 = d2h2*(r12*C1h1 + a2*r2*r1r_gamma21) + d1h1*r1*a2*r1r_gamma21
+    A12 = d1h1*r1*a2*(r2r + a1) + d2h2*r2*a1*(r1r + a2)
+    Z = U + A1 + A2 + A12
+    E = (U*E0 + A1*E1 + A2*E2 + A12*E3) / Z
+
+    # Derivatives of d1h1 and a1 (d2h2 and a2) with respect to log(d1) (log(d2))
+    dd1, da1 = h1*d1h1, gamma21*h1*a1
+    dd2, da2 = h2*d2h2, gamma12*h2*a2
+
+    dU = da1*r1*r2r_gamma12*C1h1
+    dA1 = dd1*(r12*C2h2 + a1*r1*r2r_gamma12) + d1h1*da1*r1*r2r_gamma12 + d2h2*r2*da1*r2r_gamma12
+    dA2 = dd1*r1*a2*r1r_gamma21
+    dA12 = dd1*r1*a2*(r2r + a1) + d1h1*r1*a2*da1 + d2h2*r2*da1*(r1r + a2)
+    j_logd1 = (dU*(E0-E) + dA1*(E1-E) + dA2*(E2-E) + dA12*(E3-E)) / Z
+
+    dU = da2*r2*r1r_gamma21*C2h2
+    dA1 = dd2*r2*a1*r2r_gamma12
+    dA2 = dd2*(r12*C1h1 + a2*r2*r1r_gamma21) + d2h2*da2*r2*r1r_gamma21 + d1h1*r1*da2*r1r_gamma21
+    dA12 = d1h1*r1*da2*(r2r + a1) + dd2*r2*a1*(r1r + a2) + d2h2*r2*a1*da2
+    j_logd2 = (dU*(E0-E) + dA1*(E1-E) + dA2*(E2-E) + dA12*(E3-E)) / Z
+
+    return j_logd1, j_logd2
@@ -0,0 +1,87 @@
+#    Copyright (C) 2020 David J. Wooten
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+
+def jacobian(d1, d2, logh1, logh2, logC1, logC2, a12, a21):
+    """Evaluates Jacobian of Zimmer's effective dose model
+
+    The effective dose d1_eff is the positive root of A*x^2 + B*x + C = 0 (see Zimmer._model), so its derivatives follow from implicit differentiation of the quadratic, dx/dp = -(A_p*x^2 + B_p*x + C_p) / sqrt(B^2 - 4*A*C).
+
+    Returns:
+    -----------
+    jacobian : numpy.ndarray
+        j_logh1, j_logh2, j_logC1, j_logC2, j_a12, j_a21
+    """
+    h1 = np.exp(logh1)
+    h2 = np.exp(logh2)
+    C1 = np.exp(logC1)
+    C2 = np.exp(logC2)
+
+    A = d2 + C2*(a21+1) + d2*a12
+    B = d2*C1 + C1*C2 + a12*d2*C1 - d1*(d2+C2*(a21+1))
+    C = -d1*(d2*C1 + C1*C2)
+    sqrt_disc = np.sqrt(B*B - 4*A*C)
+
+    d1p = (-B + sqrt_disc) / (2.*A)
+
+    # Partial derivatives of the quadratic's coefficients (w.r.t. logC1, logC2, a12, a21)
+    A_p = [0, C2*(a21+1), d2, C2]
+    B_p = [C1*(d2 + C2 + a12*d2), C2*(C1 - d1*(a21+1)), d2*C1, -d1*C2]
+    C_p = [-d1*C1*(d2 + C2), -d1*C1*C2, 0, 0]
+    C1_p = [C1, 0, 0, 0]
+
+    d1p_p = [-(a*d1p*d1p + b*d1p + c)/sqrt_disc for a,b,c in zip(A_p, B_p, C_p)]
+
+    # d2_eff = d2 / (1 + a21*w), where w = d1_eff/(d1_eff+C1) is drug 1's occupancy
+    w = d1p/(d1p+C1)
+    w_p = [(d1p_i*C1 - d1p*C1_i)/np.power(d1p+C1,2) for d1p_i, C1_i in zip(d1p_p, C1_p)]
+    den = 1 + a21*w
+    d2p = d2/den
+    a21_p = [0, 0, 0, 1]
+    d2p_p = [-d2*(a21_i*w + a21*w_i)/(den*den) for a21_i, w_i in zip(a21_p, w_p)]
+
+    # E = S1*S2, with S_i = 1/(1+y_i) and y_i = (d_i_eff/C_i)^h_i
+    y1 = np.power(d1p/C1, h1)
+    y2 = np.power(d2p/C2, h2)
+    S1 = 1/(1+y1)
+    S2 = 1/(1+y2)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        logy1 = np.where(y1 > 0, np.log(y1), 0)
+        logy2 = np.where(y2 > 0, np.log(y2), 0)
+
+        # dlog(d_eff)/dp - where a drug is absent, y=0 and these terms vanish
+        dlogd1p = [np.where(d1p > 0, d1p_i/d1p, 0) for d1p_i in d1p_p]
+        dlogd2p = [np.where(d2p > 0, d2p_i/d2p, 0) for d2p_i in d2p_p]
+
+    dlogC1 = [1, 0, 0, 0]
+    dlogC2 = [0, 1, 0, 0]
+
+    dS1 = [-S1*S1*y1*h1*(dlogd1p_i - dlogC1_i) for dlogd1p_i, dlogC1_i in zip(dlogd1p, dlogC1)]
+    dS2 = [-S2*S2*y2*h2*(dlogd2p_i - dlogC2_i) for dlogd2p_i, dlogC2_i in zip(dlogd2p, dlogC2)]
+
+    # ********** logh ********
+
+    j_logh1 = -S2*S1*S1*y1*logy1
+    j_logh2 = -S1*S2*S2*y2*logy2
+
+    # ********** logC, a12, a21 ********
+
+    j_logC1, j_logC2, j_a12, j_a21 = [S2*dS1_i + S1*dS2_i for dS1_i, dS2_i in zip(dS1, dS2)]
+
+    jac = np.hstack([np.broadcast_to(j, np.shape(d1p)).reshape(-1,1) for j in [j_logh1, j_logh2, j_logC1, j_logC2, j_a12, j_a21]])
+    jac[np.isnan(jac)] = 0
+    return jac
@@ -19,9 +19,6 @@ from ..single import Hill
 from .. import utils
 from .nonparametric_base import DoseDependentModel
 
-# Used for delta variant of Loewe
-from scipy.optimize import minimize_scalar
-
 class Loewe(DoseDependentModel):
     """Loewe Additivity Synergy
     
@@ -64,27 +61,22 @@ class Loewe(DoseDependentModel):
         E = np.asarray(E)
         super().fit(d1,d2,E, drug1_model=drug1_model, drug2_model=drug2_model, **kwargs)
 
-        drug1_model = self.drug1_model
-        drug2_model = self.drug2_model
-
-
-        if self.variant == "delta":
-            self.reference = self._E_reference(d1, d2, drug1_model, drug2_model)
-            self.synergy = self._get_synergy_delta(d1, d2, E, drug1_model, drug2_model)
-        else:
-            self.synergy = self._get_synergy_CI(d1, d2, E, drug1_model, drug2_model)
-
+        self.synergy, self.reference = self._get_synergy(d1, d2, E, self.drug1_model, self.drug2_model)
         return self.synergy
+
+    def _get_synergy(self, d1, d2, E, drug1_model, drug2_model):
+        if self.variant.startswith("delta"):
+            return self._get_synergy_delta(d1, d2, E, drug1_model, drug2_model)
+        return self._get_synergy_CI(d1, d2, E, drug1_model, drug2_model), None
     
     def _get_synergy_delta(self, d1, d2, E, drug1_model, drug2_model):
         
-        # Save reference and synergy
-        if self.reference is None:
-            self.reference = self._E_reference(d1, d2, drug1_model, drug2_model)
-        synergy = self.reference - E
+        # Return reference and synergy
+        reference = self._E_reference(d1, d2, drug1_model, drug2_model)
+        synergy = reference - E
 
         synergy[(d1==0) | (d2==0)] = 0
-        return synergy
+        return synergy, reference
 
     def _get_synergy_CI(self, d1, d2, E, drug1_model, drug2_model):
         with np.errstate(divide='ignore', invalid='ignore'):
@@ -94,43 +86,53 @@ class Loewe(DoseDependentModel):
         synergy[(d1==0) | (d2==0)] = 1
         return synergy
 
+    def _get_synergy_direction(self):
+        if self.variant.startswith("delta"):
+            return 0, 1
+        # The CI-like variant is synergistic below 1
+        return 1, -1
+
     def _get_single_drug_classes(self):
         # The delta model ONLY works when single drugs are fit with Hill equation
-        if self.variant=="delta":
+        if self.variant.startswith("delta"):
             return Hill, Hill
 
         # Otherwise, default to Hill, but allow anything
         return Hill, None
 
-    def _fit_Loewe_reference(self, X_r, X_c, drug1_model, drug2_model):
+    def _fit_Loewe_reference(self, X_r, X_c, pa_r, pa_c):
         """Calculates a reference (null) model for Loewe for drug1 and drug2 at concentrations X_r and X_c
 
-        drug1_model and drug2_model MUST be some form of Hill equation
+        pa_r and pa_c are the (E0, Emax, h, C) parameters of Hill equations for drug1 and drug2. X_r, X_c, and the parameters may all be arrays (e.g., one set of parameters per plate), in which case all of the reference values are solved together.
         
         Contributed by Mark Russo at Bristol Myers Squibb
 
-        Returns scipy.optimize.minimize_scalar object
+        Returns:
+        ----------
+        Y : numpy.array
+            The Loewe reference effect at each (X_r, X_c). Where no effect satisfies CI == 1, this is whichever bound comes closest. Where the two drugs' effect ranges do not overlap, this is np.nan.
         """
         # Unpack single drug parameters
-        pa_r = drug1_model.get_parameters()
-        pa_c = drug2_model.get_parameters()
         [Emin_r, Emax_r, h_r, m_r] = pa_r
         [Emin_c, Emax_c, h_c, m_c] = pa_c
 
         # Compute the bounds within which Y_Loewe is valid.
         # Any value outside these bounds causes algorithm to take a root of a negative.
-        bounds_r = [Emin_r, Emax_r]; bounds_r.sort()
-        bounds_c = [Emin_c, Emax_c]; bounds_c.sort()
-        bounds   = [max(bounds_r[0], bounds_c[0]), min(bounds_r[1], bounds_c[1])]
+        bounds   = [np.maximum(np.minimum(Emin_r, Emax_r), np.minimum(Emin_c, Emax_c)), np.minimum(np.maximum(Emin_r, Emax_r), np.maximum(Emin_c, Emax_c))]
 
-        # Quadratic function with a minimum at CI=1
-        f  = lambda Y: ((X_r/(m_r*(((Y-Emin_r)/(Emax_r-Y))**(1/h_r))) + X_c/(m_c*(((Y-Emin_c)/(Emax_c-Y))**(1/h_c)))) - 1.0)**2
+        # CI - 1, which is monotonic in Y between the bounds
+        # (np.abs() only clears the sign of -0.0 at the bounds themselves)
+        f  = lambda Y: X_r/(m_r*np.abs((Y-Emin_r)/(Emax_r-Y))**(1/h_r)) + X_c/(m_c*np.abs((Y-Emin_c)/(Emax_c-Y))**(1/h_c)) - 1.0
 
-        # Perform constrained minimization to find Y as close as possible to CI == 1 and return result.
-        return minimize_scalar(f, method='bounded', bounds=bounds)
+        # Solve CI == 1 for every point at once
+        Y, _ = utils.fit_tools.bisect_many(f, bounds[0]+0*X_r, bounds[1]+0*X_r)
+        Y[bounds[0] > bounds[1]] = np.nan
+        return Y
 
     def _E_reference(self, d1, d2, drug1_model, drug2_model):
         """Calculates a reference (null) model for Loewe for drug1 and drug2.
+
+        The single-drug parameters may be arrays that broadcast against d1 and d2 (see fit_plates()).
         
         Contributed by Mark Russo at Bristol Myers Squibb
         Modified by David Wooten
@@ -138,16 +140,14 @@ class Loewe(DoseDependentModel):
 
         # Compute the reference model
         with np.errstate(divide='ignore', invalid='ignore'):
+            d1 = np.asarray(d1, dtype=np.float64)
+            d2 = np.asarray(d2, dtype=np.float64)
             ref  = 0*d1
 
-            pa1 = drug1_model.get_parameters()
-            pa2 = drug2_model.get_parameters()
-
-            weakest_E = max(pa1[1], pa2[1])
+            pa1 = [np.broadcast_to(p, d1.shape) for p in drug1_model.get_parameters()]
+            pa2 = [np.broadcast_to(p, d1.shape) for p in drug2_model.get_parameters()]
 
-            stronger_drug = drug1_model
-            if pa1[1] > pa2[1]: # pa[1] is Emax
-                stronger_drug = drug2_model
+            weakest_E = np.maximum(pa1[1], pa2[1]) # pa[1] is Emax
 
             # Loewe becomes undefined for effects past the weaker drug's Emax
             # We implement several variants to handle this case:
@@ -161,44 +161,41 @@ class Loewe(DoseDependentModel):
             elif self.variant=="delta_synergyfinder": option=4
             else: option=1
 
-            for i in range(len(ref)):
-                X1, X2 = d1[i], d2[i]
-                E1, E2 = drug1_model.E(X1), drug2_model.E(X2)
-                
-                # No drug
-                if X1 == 0.0 and X2 == 0.0:
-                    ref[i] = 0.5 * (E2 + E1)
-
-                # Single drugs
-                elif X2 == 0:
-                    ref[i] = E1
-                elif X1 == 0:
-                    ref[i] = E2
-
-                # If the combo E is stronger than the weaker drug is capable of, don't bother trying to fit
-                elif E1 < weakest_E or E2 < weakest_E:
-                    if option==1:
-                        ref[i] = weakest_E
-                    elif option==2:
-                        ref[i] = min(E1,E2)
-                    elif option==3:
-                        ref[i] = np.nan
-                    elif option==4:
-                        ref[i] = stronger_drug.E(X1+X2)
-                    else:
-                        ref[i] = np.nan
-                else:
-                    # Numerically solve the value for Loewe
-                    res = self._fit_Loewe_reference(X1, X2, drug1_model, drug2_model)
-                    if res.success:
-                        ref[i] = res.x
-                    else:
-                        ref[i] = min(E2, E1)
+            E1, E2 = drug1_model.E(d1), drug2_model.E(d2)
+
+            # No drug
+            no_drug = (d1 == 0) & (d2 == 0)
+            ref[no_drug] = 0.5 * (E2[no_drug] + E1[no_drug])
+
+            # Single drugs
+            drug1_only = (d2 == 0) & ~no_drug
+            drug2_only = (d1 == 0) & ~no_drug
+            ref[drug1_only] = E1[drug1_only]
+            ref[drug2_only] = E2[drug2_only]
+
+            # If the combo E is stronger than the weaker drug is capable of, don't bother trying to fit
+            combo = (d1 != 0) & (d2 != 0)
+            out_of_range = combo & ((E1 < weakest_E) | (E2 < weakest_E))
+            if option==1:
+                ref[out_of_range] = weakest_E[out_of_range]
+            elif option==2:
+                ref[out_of_range] = np.minimum(E1, E2)[out_of_range]
+            elif option==4:
+                stronger_E = np.where(pa1[1] > pa2[1], drug2_model.E(d1+d2), drug1_model.E(d1+d2))
+                ref[out_of_range] = stronger_E[out_of_range]
+            else:
+                ref[out_of_range] = np.nan
+
+            # Numerically solve the value for Loewe
+            to_solve = combo & ~out_of_range
+            if to_solve.any():
+                Y = self._fit_Loewe_reference(d1[to_solve], d2[to_solve], [p[to_solve] for p in pa1], [p[to_solve] for p in pa2])
+                ref[to_solve] = np.where(np.isnan(Y), np.minimum(E1, E2)[to_solve], Y)
         return ref
 
     def plot_heatmap(self, cmap="PRGn", neglog=None, center_on_zero=True, **kwargs):
         if neglog is None:
-            if self.variant=="delta":
+            if self.variant.startswith("delta"):
                 neglog=False
             else:
                 neglog=True
@@ -206,7 +203,7 @@ class Loewe(DoseDependentModel):
 
     def plot_surface_plotly(self, cmap="PRGn", neglog=None, center_on_zero=True, **kwargs):
         if neglog is None:
-            if self.variant=="delta":
+            if self.variant.startswith("delta"):
                 neglog=False
             else:
                 neglog=True
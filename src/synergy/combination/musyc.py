@@ -127,10 +127,10 @@ class MuSyC(ParametricModel):
             # Fit the single drug models if they were not pre-fit by the user
             if not drug1_model.is_fit():
                 mask = np.where(d2==min(d2))
-                drug1_model.fit(d1[mask], E[mask])
+                utils.fit_cache.fit(drug1_model, d1[mask], E[mask])
             if not drug2_model.is_fit():
                 mask = np.where(d1==min(d1))
-                drug2_model.fit(d2[mask], E[mask])
+                utils.fit_cache.fit(drug2_model, d2[mask], E[mask])
 
             # Get initial guesses of E0, E1, E2, h1, h2, C1, and C2 from single-drug fits
             E0_1, E1, h1, C1 = drug1_model.get_parameters()
@@ -153,6 +153,109 @@ class MuSyC(ParametricModel):
         utils.sanitize_initial_guess(p0, self.bounds)
         return p0
 
+    def fit_many(self, d1, d2, E, group_ids, p0=None, use_jacobian=True, max_iterations=200):
+        """Fits MuSyC independently to many drug combinations (e.g., every pair in a screen) at once.
+
+        Rather than calling fit() once per combination, all combinations are stacked and fit simultaneously with a vectorized, bounded Levenberg-Marquardt solver (synergy.utils.fit_tools.curve_fit_many). Initial guesses are obtained the same way as in fit(), but the single-drug Hill fits for every combination are also done in one batch. This model's bounds and variant are used for every combination. The model's own parameters are not changed.
+
+        Parameters
+        ----------
+        d1 : array_like
+            Doses of drug 1, for all combinations
+
+        d2 : array_like
+            Doses of drug 2, for all combinations
+
+        E : array_like
+            Dose-response at doses d1 and d2, for all combinations
+
+        group_ids : array_like
+            Label identifying which combination each sample belongs to
+
+        p0 : array_like , default=None
+            Initial guess, in the same (linear) scale as fit(). Either a single parameter list used for every combination, or an array of shape (n_groups x n_parameters) ordered by sorted unique group_ids. If None, initial guesses are obtained from batched single-drug Hill fits.
+
+        use_jacobian : bool , default=True
+            If True, the analytic Jacobian is used. Otherwise finite differences are used.
+
+        max_iterations : int , default=200
+            Maximum number of Levenberg-Marquardt iterations
+
+        Returns
+        ----------
+        table : dict
+            Column arrays, one row per combination: "group", each fit parameter (E0, E1, ..., in linear scale), "beta", "converged", "sum_of_squares_residuals", and "r_squared".
+        """
+        d1 = np.asarray(d1, dtype=np.float64)
+        d2 = np.asarray(d2, dtype=np.float64)
+        E = np.asarray(E, dtype=np.float64)
+
+        groups, order, gidx, offsets = utils.fit_tools.group_indices(group_ids)
+        d1 = d1[order]
+        d2 = d2[order]
+        E = E[order]
+
+        if p0 is None:
+            p0 = self._get_initial_guess_many(d1, d2, E, gidx, offsets, use_jacobian, max_iterations)
+        else:
+            p0 = np.array(p0, dtype=np.float64, ndmin=2)
+            with np.errstate(divide='ignore'):
+                p0 = np.column_stack(self._transform_params_to_fit(p0.T))
+
+        jac = self.jacobian_function if use_jacobian else None
+        _, popt, converged, ssr = utils.fit_tools.curve_fit_many(self.fit_function, np.vstack((d1,d2)), E, gidx, p0, bounds=self.bounds, jac=jac, max_iterations=max_iterations)
+
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            params = self._transform_params_from_fit(popt.T)
+        E_mean = np.add.reduceat(E, offsets) / np.bincount(gidx)
+        ss_tot = np.add.reduceat((E - E_mean[gidx])**2, offsets)
+
+        table = dict()
+        table['group'] = groups
+        names = ['E0', 'E1', 'E2', 'E3', 'h1', 'h2', 'C1', 'C2', 'alpha12', 'alpha21', 'gamma12', 'gamma21']
+        for name, values in zip(names, params):
+            table[name] = np.asarray(values)
+        table['beta'] = MuSyC._get_beta(table['E0'], table['E1'], table['E2'], table['E3'])
+        table['converged'] = converged
+        table['sum_of_squares_residuals'] = ssr
+        table['r_squared'] = 1 - ssr/ss_tot
+        return table
+
+    def _get_initial_guess_many(self, d1, d2, E, gidx, offsets, use_jacobian, max_iterations):
+        """Batched equivalent of _get_initial_guess() for group-sorted data. Returns an (n_groups x n_parameters) array of initial guesses in the fit scale.
+        """
+        n_groups = len(offsets)
+        d1_min = np.minimum.reduceat(d1, offsets)[gidx]
+        d2_min = np.minimum.reduceat(d2, offsets)[gidx]
+        d1_max = np.maximum.reduceat(d1, offsets)[gidx]
+        d2_max = np.maximum.reduceat(d2, offsets)[gidx]
+
+        # Fit drug 1 (where d2==min(d2)) and drug 2 (where d1==min(d1)) for every group in batch
+        single_fits = []
+        for d, mask, E_bounds, h_bounds, C_bounds in [(d1, d2==d2_min, self.E1_bounds, self.h1_bounds, self.C1_bounds), (d2, d1==d1_min, self.E2_bounds, self.h2_bounds, self.C2_bounds)]:
+            single_model = Hill(E0_bounds=self.E0_bounds, Emax_bounds=E_bounds, h_bounds=h_bounds, C_bounds=C_bounds)
+            table = single_model.fit_many(d[mask], E[mask], gidx[mask], use_jacobian=use_jacobian, max_iterations=max_iterations)
+            with np.errstate(divide='ignore'):
+                single_fits.append(np.column_stack(single_model._transform_params_to_fit([table[name] for name in single_model._parameter_names])))
+
+        (E0_1, E1, logh1, logC1), (E0_2, E2, logh2, logC2) = single_fits[0].T, single_fits[1].T
+
+        # Initial guess of E3 is the mean of E(d1_max, d2_max), or the minimum E if that point does not exist
+        corner = (d1==d1_max) & (d2==d2_max)
+        n_corner = np.bincount(gidx[corner], minlength=n_groups)
+        E3 = np.bincount(gidx[corner], weights=E[corner], minlength=n_groups)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            E3 = np.where(n_corner > 0, E3/n_corner, np.minimum.reduceat(E, offsets))
+
+        # Synergy parameters start additive (alpha=gamma=1, so their logs are 0)
+        additive = np.zeros(n_groups)
+        p0 = [(E0_1+E0_2)/2., E1, E2, E3, logh1, logh2, logC1, logC2, additive, additive, additive, additive]
+        if self.variant == "no_gamma":
+            p0 = p0[:-2]
+        p0 = np.column_stack(p0)
+        lower, upper = np.asarray(self.bounds, dtype=np.float64)
+        return np.clip(p0, lower, upper)
+
     def _transform_params_from_fit(self, params):
         
         if self.variant == "no_gamma":
@@ -237,7 +340,10 @@ class MuSyC(ParametricModel):
         return self._model(d1, d2, self.E0, self.E1, self.E2, min(self.E1,self.E2), self.h1, self.h2, self.C1, self.C2, self.r1r, self.r2r, 1, 1, 1, 1)
 
     def _model(self, d1, d2, E0, E1, E2, E3, h1, h2, C1, C2, r1r, r2r, alpha12, alpha21, gamma12, gamma21):
+        """Steady-state MuSyC dose response.
 
+        The fractions of cells in the states U, A1, A2 and A12 share a single denominator. Every term is built from a handful of powers, each computed once, so this evaluates the same expression as the full symbolic solution at a fraction of the cost.
+        """
         d1h1 = np.power(d1,h1)
         d2h2 = np.power(d2,h2)
 
@@ -247,26 +353,27 @@ class MuSyC(ParametricModel):
         r1 = r1r/C1h1
         r2 = r2r/C2h2
 
-        alpha21d1gamma21h1 = np.power(alpha21*d1, gamma21*h1)
-        alpha12d2gamma12h2 = np.power(alpha12*d2, gamma12*h2)
+        # Scalars shared across the numerators and denominator
+        r1r_gamma21 = np.power(r1r, gamma21)
+        r2r_gamma12 = np.power(r2r, gamma12)
+        r1_gamma21 = np.power(r1, gamma21)
+        r2_gamma12 = np.power(r2, gamma12)
+        r12 = r1*r2*(r1r_gamma21 + r2r_gamma12)
 
-        C12h1 = np.power(C1,2*h1)
-        C22h2 = np.power(C2,2*h2)
+        # The only dose-dependent powers, besides d1h1 and d2h2
+        a1 = r1_gamma21*np.power(alpha21*d1, gamma21*h1)
+        a2 = r2_gamma12*np.power(alpha12*d2, gamma12*h2)
 
-        # ********** U ********
+        a1_r1 = a1*r1*r2r_gamma12
+        a2_r2 = a2*r2*r1r_gamma21
 
-        U=(r1*r2*np.power((r1*C1h1),gamma21)*C1h1*C2h2+r1*r2*np.power((r2*C2h2),gamma12)*C1h1*C2h2+np.power(r1,(gamma21+1))*alpha21d1gamma21h1*np.power((r2*C2h2),gamma12)*C1h1+np.power(r2,(gamma12+1))*alpha12d2gamma12h2*np.power((r1*C1h1),gamma21)*C2h2)/(d1h1*r1*r2*np.power((r1*C1h1),gamma21)*C2h2+d1h1*r1*r2*np.power((r2*C2h2),gamma12)*C2h2+d1h1*r1*np.power(r2,(gamma12+1))*alpha12d2gamma12h2*C2h2+d1h1*r1*np.power(r2,gamma12)*alpha12d2gamma12h2*np.power((r1*C1h1),gamma21)+d1h1*np.power(r1,(gamma21+1))*np.power(r2,gamma12)*alpha21d1gamma21h1*alpha12d2gamma12h2+d1h1*np.power(r1,(gamma21+1))*alpha21d1gamma21h1*np.power((r2*C2h2),gamma12)+d2h2*r1*r2*np.power((r1*C1h1),gamma21)*C1h1+d2h2*r1*r2*np.power((r2*C2h2),gamma12)*C1h1+d2h2*np.power(r1,(gamma21+1))*r2*alpha21d1gamma21h1*C1h1+d2h2*np.power(r1,gamma21)*r2*alpha21d1gamma21h1*np.power((r2*C2h2),gamma12)+d2h2*np.power(r1,gamma21)*np.power(r2,(gamma12+1))*alpha21d1gamma21h1*alpha12d2gamma12h2+d2h2*np.power(r2,(gamma12+1))*alpha12d2gamma12h2*np.power((r1*C1h1),gamma21)+r1*r2*np.power((r1*C1h1),gamma21)*C1h1*C2h2+r1*r2*np.power((r2*C2h2),gamma12)*C1h1*C2h2+np.power(r1,(gamma21+1))*alpha21d1gamma21h1*np.power((r2*C2h2),gamma12)*C1h1+np.power(r2,(gamma12+1))*alpha12d2gamma12h2*np.power((r1*C1h1),gamma21)*C2h2)
+        # Unnormalized fractions of cells in each state
+        U = r12*C1h1*C2h2 + a1_r1*C1h1 + a2_r2*C2h2
+        A1 = d1h1*(r12*C2h2 + a1_r1) + d2h2*r2*a1*r2r_gamma12
+        A2 = d2h2*(r12*C1h1 + a2_r2) + d1h1*r1*a2*r1r_gamma21
+        A12 = d1h1*r1*a2*(r2r + a1) + d2h2*r2*a1*(r1r + a2)
 
-        #**********E1********
-
-        A1=(d1h1*r1*r2*np.power((r1*C1h1),gamma21)*C2h2+d1h1*r1*r2*np.power((r2*C2h2),gamma12)*C2h2+d1h1*np.power(r1,(gamma21+1))*alpha21d1gamma21h1*np.power((r2*C2h2),gamma12)+d2h2*np.power(r1,gamma21)*r2*alpha21d1gamma21h1*np.power((r2*C2h2),gamma12))/(d1h1*r1*r2*np.power((r1*C1h1),gamma21)*C2h2+d1h1*r1*r2*np.power((r2*C2h2),gamma12)*C2h2+d1h1*r1*np.power(r2,(gamma12+1))*alpha12d2gamma12h2*C2h2+d1h1*r1*np.power(r2,gamma12)*alpha12d2gamma12h2*np.power((r1*C1h1),gamma21)+d1h1*np.power(r1,(gamma21+1))*np.power(r2,gamma12)*alpha21d1gamma21h1*alpha12d2gamma12h2+d1h1*np.power(r1,(gamma21+1))*alpha21d1gamma21h1*np.power((r2*C2h2),gamma12)+d2h2*r1*r2*np.power((r1*C1h1),gamma21)*C1h1+d2h2*r1*r2*np.power((r2*C2h2),gamma12)*C1h1+d2h2*np.power(r1,(gamma21+1))*r2*alpha21d1gamma21h1*C1h1+d2h2*np.power(r1,gamma21)*r2*alpha21d1gamma21h1*np.power((r2*C2h2),gamma12)+d2h2*np.power(r1,gamma21)*np.power(r2,(gamma12+1))*alpha21d1gamma21h1*alpha12d2gamma12h2+d2h2*np.power(r2,(gamma12+1))*alpha12d2gamma12h2*np.power((r1*C1h1),gamma21)+r1*r2*np.power((r1*C1h1),gamma21)*C1h1*C2h2+r1*r2*np.power((r2*C2h2),gamma12)*C1h1*C2h2+np.power(r1,(gamma21+1))*alpha21d1gamma21h1*np.power((r2*C2h2),gamma12)*C1h1+np.power(r2,(gamma12+1))*alpha12d2gamma12h2*np.power((r1*C1h1),gamma21)*C2h2)
-
-        #**********E2********
-
-        A2=(d1h1*r1*np.power(r2,gamma12)*alpha12d2gamma12h2*np.power((r1*C1h1),gamma21)+d2h2*r1*r2*np.power((r1*C1h1),gamma21)*C1h1+d2h2*r1*r2*np.power((r2*C2h2),gamma12)*C1h1+d2h2*np.power(r2,(gamma12+1))*alpha12d2gamma12h2*np.power((r1*C1h1),gamma21))/(d1h1*r1*r2*np.power((r1*C1h1),gamma21)*C2h2+d1h1*r1*r2*np.power((r2*C2h2),gamma12)*C2h2+d1h1*r1*np.power(r2,(gamma12+1))*alpha12d2gamma12h2*C2h2+d1h1*r1*np.power(r2,gamma12)*alpha12d2gamma12h2*np.power((r1*C1h1),gamma21)+d1h1*np.power(r1,(gamma21+1))*np.power(r2,gamma12)*alpha21d1gamma21h1*alpha12d2gamma12h2+d1h1*np.power(r1,(gamma21+1))*alpha21d1gamma21h1*np.power((r2*C2h2),gamma12)+d2h2*r1*r2*np.power((r1*C1h1),gamma21)*C1h1+d2h2*r1*r2*np.power((r2*C2h2),gamma12)*C1h1+d2h2*np.power(r1,(gamma21+1))*r2*alpha21d1gamma21h1*C1h1+d2h2*np.power(r1,gamma21)*r2*alpha21d1gamma21h1*np.power((r2*C2h2),gamma12)+d2h2*np.power(r1,gamma21)*np.power(r2,(gamma12+1))*alpha21d1gamma21h1*alpha12d2gamma12h2+d2h2*np.power(r2,(gamma12+1))*alpha12d2gamma12h2*np.power((r1*C1h1),gamma21)+r1*r2*np.power((r1*C1h1),gamma21)*C1h1*C2h2+r1*r2*np.power((r2*C2h2),gamma12)*C1h1*C2h2+np.power(r1,(gamma21+1))*alpha21d1gamma21h1*np.power((r2*C2h2),gamma12)*C1h1+np.power(r2,(gamma12+1))*alpha12d2gamma12h2*np.power((r1*C1h1),gamma21)*C2h2)
-
-        
-        return U*E0 + A1*E1 + A2*E2 + (1-(U+A1+A2))*E3
+        return (U*E0 + A1*E1 + A2*E2 + A12*E3) / (U + A1 + A2 + A12)
     
     @staticmethod
     def _get_beta(E0, E1, E2, E3):
@@ -20,11 +20,16 @@ import numpy as np
 from .. import utils
 from ..utils import plots
 from ..single import Hill
+from ..single.parametric_base import ParameterizedModel1D
 
 
 class DoseDependentModel(ABC):
     """These are models for which synergy is defined independently at each individual dose.
     """
+
+    # True if the synergy of each well depends only on that well and the single-drug models (see _get_synergy()), so that a surface can be scored in chunks of wells. Models that fit across the whole surface (e.g., ZIP) set this to False, and override _score_plates() instead.
+    _pointwise_synergy = True
+
     def __init__(self, h1_bounds=(0,np.inf), h2_bounds=(0,np.inf),  \
             C1_bounds=(0,np.inf), C2_bounds=(0,np.inf),             \
             E0_bounds=(-np.inf,np.inf), E1_bounds=(-np.inf,np.inf), \
@@ -60,6 +65,8 @@ class DoseDependentModel(ABC):
         self.drug1_model = None
         self.drug2_model = None
         self.reference = None
+        self.bootstrap_synergy = None
+        self.metrics = None
 
     def fit(self, d1, d2, E, drug1_model=None, drug2_model=None, **kwargs):
         """Calculates dose-dependent synergy at doses d1, d2.
@@ -91,6 +98,7 @@ class DoseDependentModel(ABC):
         """
         self.d1 = d1
         self.d2 = d2
+        self.bootstrap_synergy = None
         self.synergy = 0*d1
         self.synergy[:] = np.nan
 
@@ -104,14 +112,301 @@ class DoseDependentModel(ABC):
         # Fit the single drug models if they were not pre-fit by the user
         if not self.drug1_model.is_fit():
             mask = np.where(d2==min(d2))
-            self.drug1_model.fit(d1[mask], E[mask], **kwargs)
+            utils.fit_cache.fit(self.drug1_model, d1[mask], E[mask], **kwargs)
         if not self.drug2_model.is_fit():
             mask = np.where(d1==min(d1))
-            self.drug2_model.fit(d2[mask], E[mask], **kwargs)
+            utils.fit_cache.fit(self.drug2_model, d2[mask], E[mask], **kwargs)
 
 
         return self.synergy
 
+    def fit_plates(self, d1, d2, E, drug1_parameters=None, drug2_parameters=None, use_jacobian=True, max_iterations=200):
+        """Calculates dose-dependent synergy for a stack of plates at once.
+
+        Each row of E is an independent experiment (e.g., one plate of a screen). Rather than calling fit() once per plate, single-drug models for every plate are fit in one batch (using the single-drug class' fit_many()), and the reference and synergy of every well are computed in one vectorized pass.
+
+        After fitting, drug1_model and drug2_model hold every plate's single-drug model at once (see the single-drug class' _from_fit_many()), so drug1_model.E(d) evaluates each plate on its own row.
+
+        Parameters
+        ----------
+        d1 : array_like
+            (n_plates x n_wells) doses of drug 1. If every plate shares the same layout, a single row of n_wells doses may be given.
+        
+        d2 : array_like
+            (n_plates x n_wells) doses of drug 2, or a single shared row
+
+        E : array_like
+            (n_plates x n_wells) dose-response of every well on every plate
+
+        drug1_parameters : array_like , default=None
+            (n_plates x n_parameters) parameters of drug 1 alone on each plate, in the order returned by the single-drug model's get_parameters() (e.g., E0, Emax, h, C for Hill). Models that default to a non-parametric single-drug model (e.g., MarginalLinear) interpret these as Hill parameters. If None (default), drug 1 is fit on each plate where d2==min(d2).
+
+        drug2_parameters : array_like , default=None
+            Same as drug1_parameters, for drug 2.
+
+        use_jacobian : bool , default=True
+            Passed to the single-drug class' fit_many()
+
+        max_iterations : int , default=200
+            Passed to the single-drug class' fit_many()
+
+        Returns
+        ----------
+        synergy : numpy.ndarray
+            (n_plates x n_wells) synergy of every well on every plate
+        """
+        E = np.array(E, dtype=np.float64, ndmin=2)
+        d1 = np.broadcast_to(np.asarray(d1, dtype=np.float64), E.shape)
+        d2 = np.broadcast_to(np.asarray(d2, dtype=np.float64), E.shape)
+
+        self.d1 = d1
+        self.d2 = d2
+        self.bootstrap_synergy = None
+
+        self.drug1_model, self.drug2_model, self.synergy, self.reference = self._score_plates(d1, d2, E, drug1_parameters, drug2_parameters, use_jacobian, max_iterations)
+        return self.synergy
+
+    def _score_plates(self, d1, d2, E, drug1_parameters, drug2_parameters, use_jacobian, max_iterations):
+        """Fits (or stacks the given parameters of) both single drugs for every plate, and scores every well. See fit_plates().
+
+        Returns
+        ----------
+        drug1_model, drug2_model : single-drug models
+            Stacked models, holding every plate at once
+
+        synergy : numpy.ndarray
+            (n_plates x n_wells) synergy
+
+        reference : numpy.ndarray
+            (n_plates x n_wells) reference (null) effect, or None if the model has none
+        """
+        drug1_model, drug2_model = self._get_single_plates(d1, d2, E, drug1_parameters, drug2_parameters, use_jacobian, max_iterations)
+        synergy, reference = self._get_synergy(d1, d2, E, drug1_model, drug2_model)
+        return drug1_model, drug2_model, synergy, reference
+
+    def _get_single_plates(self, d1, d2, E, drug1_parameters, drug2_parameters, use_jacobian, max_iterations):
+        """Fits (or stacks the given parameters of) both single drugs for every plate. See fit_plates().
+
+        Returns
+        ----------
+        drug1_model, drug2_model : single-drug models
+            Stacked models, holding every plate at once
+        """
+        single_fits = [(drug1_parameters, d1, d2, self.E1_bounds, self.h1_bounds, self.C1_bounds), (drug2_parameters, d2, d1, self.E2_bounds, self.h2_bounds, self.C2_bounds)]
+        single_models = []
+        for parameters, d, d_other, E_bounds, h_bounds, C_bounds in single_fits:
+            if parameters is not None:
+                single_models.append(self._stack_single_models(np.asarray(parameters, dtype=np.float64).T))
+            else:
+                # Each plate's single drug is fit where the other drug is at its minimum on that plate
+                mask = d_other==np.min(d_other, axis=1, keepdims=True)
+                single_models.append(self._fit_single_plates(d, E, mask, E_bounds, h_bounds, C_bounds, use_jacobian, max_iterations))
+
+        return single_models
+
+    def bootstrap(self, d1, d2, E, bootstrap_iterations=100, seed=None, use_jacobian=True, max_iterations=200):
+        """Estimates the uncertainty of the synergy at each dose by resampling replicate wells.
+
+        In each resample, every well's effect is replaced by the effect of a well drawn (with replacement) from the replicates of the same dose combination. The resamples are then scored like a stack of plates (see fit_plates()): single drugs for every resample are fit in one batch, and the synergy of every resample is computed in one vectorized pass.
+
+        Wells without replicates keep their measured effect, so only designs with replicates have resampling uncertainty. fit() and fit_plates() clear earlier resamples, so call this after fitting.
+
+        Parameters
+        ----------
+        d1 : array_like
+            Doses of drug 1
+        
+        d2 : array_like
+            Doses of drug 2
+
+        E : array_like
+            Dose-response at doses d1 and d2
+
+        bootstrap_iterations : int , default=100
+            Number of resamples
+
+        seed : int , default=None
+            If not None, used as numpy.random.seed(seed) before resampling
+
+        use_jacobian : bool , default=True
+            Passed to the single-drug class' fit_many()
+
+        max_iterations : int , default=200
+            Passed to the single-drug class' fit_many()
+
+        Returns
+        ----------
+        bootstrap_synergy : numpy.ndarray
+            (bootstrap_iterations x M) synergy of every resample, also stored in bootstrap_synergy. See get_synergy_range() for percentile bands.
+        """
+        d1 = np.asarray(d1, dtype=np.float64)
+        d2 = np.asarray(d2, dtype=np.float64)
+        E = np.asarray(E, dtype=np.float64)
+
+        if seed is not None: np.random.seed(seed)
+        grid = utils.dose_tools.DoseGrid(np.column_stack([d1, d2]))
+        E_resampled = E[utils.fit_tools.resample_within_groups(grid.replicates, utils.fit_tools.resample_seeds(bootstrap_iterations))]
+
+        d1_resampled = np.broadcast_to(d1, E_resampled.shape)
+        d2_resampled = np.broadcast_to(d2, E_resampled.shape)
+        self.bootstrap_synergy = self._score_plates(d1_resampled, d2_resampled, E_resampled, None, None, use_jacobian, max_iterations)[2]
+        return self.bootstrap_synergy
+
+    def get_synergy_range(self, confidence_interval=95):
+        """Returns the lower and upper percentile bands of the synergy at each dose, from the resamples drawn by bootstrap().
+
+        Resamples in which the synergy is undefined (nan) at a dose are ignored at that dose.
+
+        Parameters
+        ----------
+        confidence_interval : int, float, default=95
+            % confidence interval to return. Must be between 0 and 100.
+
+        Returns
+        ----------
+        synergy_range : numpy.ndarray
+            (2 x M) lower and upper bounds of the synergy at each dose, or None if bootstrap() has not been run
+        """
+        if self.bootstrap_synergy is None:
+            return None
+        if confidence_interval < 0 or confidence_interval > 100:
+            return None
+        return utils.fit_tools.percentile_bands(self.bootstrap_synergy, confidence_interval)
+
+    def fit_metrics(self, d1, d2, E, drug1_model=None, drug2_model=None, window=None, bootstrap_iterations=0, confidence_interval=95, seed=None, chunk_size=65536, use_jacobian=True, max_iterations=200, **kwargs):
+        """Fits the model and summarizes its synergy surface, without keeping the surface.
+
+        Single drugs are fit as in fit(). The reference and synergy are then computed a chunk of wells at a time, and each chunk is reduced into running summaries (see synergy.utils.surface_metrics.SurfaceMetrics) before the next is computed. Neither synergy nor the reference is stored. Models that cannot score wells in chunks (e.g., ZIP) are fit in full, and their surface is summarized in one chunk.
+
+        Parameters
+        ----------
+        d1 : array_like
+            Doses of drug 1
+        
+        d2 : array_like
+            Doses of drug 2
+
+        E : array_like
+            Dose-response at doses d1 and d2
+
+        drug1_model, drug2_model : single-drug-model, default=None
+            See fit()
+
+        window : array_like , default=None
+            ((low1, high1), (low2, high2)) dose bounds within which max_synergy and max_antagonism are taken. If None, every combination well is used.
+
+        bootstrap_iterations : int , default=0
+            If greater than 0, replicate wells are resampled this many times (see bootstrap()) to count significantly synergistic wells. Single drugs are refit to every resample in one batch, and each chunk of wells is scored for every resample.
+
+        confidence_interval : int, float, default=95
+            % confidence interval a well's synergy must lie within to be significant
+
+        seed : int , default=None
+            If not None, used as numpy.random.seed(seed) before resampling. The same seed draws the same resamples as bootstrap(), whatever the chunk_size.
+
+        chunk_size : int , default=65536
+            Number of wells scored at once. With bootstrap_iterations > 0, this is split among the resamples.
+
+        use_jacobian : bool , default=True
+            Passed to the single-drug fits, including the batched refits of every resample (see bootstrap())
+
+        max_iterations : int , default=200
+            Passed to the single-drug class' fit_many() when refitting resamples
+
+        kwargs
+            kwargs to pass to Hill.fit() (or whichever single-drug model is used)
+
+        Returns
+        ----------
+        metrics : dict
+            Summaries of the synergy surface (see synergy.utils.surface_metrics.SurfaceMetrics.result()), also stored in metrics
+        """
+        d1 = np.asarray(d1, dtype=np.float64)
+        d2 = np.asarray(d2, dtype=np.float64)
+        E = np.asarray(E, dtype=np.float64)
+
+        grid = utils.dose_tools.DoseGrid(np.column_stack([d1, d2]))
+        null, sign = self._get_synergy_direction()
+        metrics = utils.surface_metrics.SurfaceMetrics(grid, null=null, sign=sign, window=window)
+
+        if not self._pointwise_synergy:
+            synergy = self.fit(d1, d2, E, drug1_model=drug1_model, drug2_model=drug2_model, use_jacobian=use_jacobian, **kwargs)
+            lower, upper = None, None
+            if bootstrap_iterations > 0:
+                self.bootstrap(d1, d2, E, bootstrap_iterations=bootstrap_iterations, seed=seed, use_jacobian=use_jacobian, max_iterations=max_iterations)
+                lower, upper = self.get_synergy_range(confidence_interval)
+            metrics.update(slice(None), synergy, lower, upper)
+            self.metrics = metrics.result()
+            return self.metrics
+
+        DoseDependentModel.fit(self, d1, d2, E, drug1_model=drug1_model, drug2_model=drug2_model, use_jacobian=use_jacobian, **kwargs)
+        self.synergy = None
+        self.reference = None
+
+        if bootstrap_iterations > 0:
+            # Seeds are drawn as in bootstrap(), and draws are indexed by well, so the single-drug refits and every chunk share each resample
+            if seed is not None: np.random.seed(seed)
+            seeds = utils.fit_tools.resample_seeds(bootstrap_iterations)
+            samples = np.where(grid.any_single_drug_mask())[0]
+            E_resampled = E[utils.fit_tools.resample_within_groups(grid.replicates, seeds, samples)]
+            d1_samples = np.broadcast_to(d1[samples], E_resampled.shape)
+            d2_samples = np.broadcast_to(d2[samples], E_resampled.shape)
+            resampled_drug1_model = self._fit_single_plates(d1_samples, E_resampled, d2_samples==np.min(d2), self.E1_bounds, self.h1_bounds, self.C1_bounds, use_jacobian, max_iterations)
+            resampled_drug2_model = self._fit_single_plates(d2_samples, E_resampled, d1_samples==np.min(d1), self.E2_bounds, self.h2_bounds, self.C2_bounds, use_jacobian, max_iterations)
+            chunk_size = max(1, chunk_size // bootstrap_iterations)
+
+        for start in range(0, len(E), chunk_size):
+            rows = slice(start, start+chunk_size)
+            synergy, _ = self._get_synergy(d1[rows], d2[rows], E[rows], self.drug1_model, self.drug2_model)
+
+            lower, upper = None, None
+            if bootstrap_iterations > 0:
+                E_resampled = E[utils.fit_tools.resample_within_groups(grid.replicates, seeds, np.arange(start, start+len(synergy)))]
+                d1_resampled = np.broadcast_to(d1[rows], E_resampled.shape)
+                d2_resampled = np.broadcast_to(d2[rows], E_resampled.shape)
+                lower, upper = utils.fit_tools.percentile_bands(self._get_synergy(d1_resampled, d2_resampled, E_resampled, resampled_drug1_model, resampled_drug2_model)[0], confidence_interval)
+
+            metrics.update(rows, synergy, lower, upper)
+
+        self.metrics = metrics.result()
+        return self.metrics
+
+    def _get_synergy_direction(self):
+        """
+        Returns
+        -------
+        null : float
+            Synergy of an additive combination
+
+        sign : int
+            1 if larger synergy values are more synergistic, -1 if smaller values are
+        """
+        return 0, 1
+
+    def _fit_single_plates(self, d, E, mask, E_bounds, h_bounds, C_bounds, use_jacobian, max_iterations):
+        """Fits one single-drug model per plate (row) to the wells in mask, all at once, returning them stacked as a single model
+        """
+        default_class, _ = self._get_single_drug_classes()
+        model = default_class(E0_bounds=self.E0_bounds, Emax_bounds=E_bounds, h_bounds=h_bounds, C_bounds=C_bounds)
+        plates = np.broadcast_to(np.arange(E.shape[0])[:,np.newaxis], E.shape)
+
+        table = model.fit_many(d[mask], E[mask], plates[mask], use_jacobian=use_jacobian, max_iterations=max_iterations)
+        return model._from_fit_many(table)
+
+    def _stack_single_models(self, parameters):
+        """Builds a single-drug model whose parameters are (n_plates x 1) columns
+
+        Parameters
+        ----------
+        parameters : array_like
+            One array per parameter (in the order of get_parameters()), each with one value per plate
+        """
+        default_class, _ = self._get_single_drug_classes()
+        if not issubclass(default_class, ParameterizedModel1D):
+            default_class = Hill
+        model = default_class()
+        return model._from_fit_many(dict(zip(model._parameter_names, parameters)))
+
     @abstractmethod
     def _get_single_drug_classes(self):
         """
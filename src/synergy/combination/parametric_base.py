@@ -14,16 +14,20 @@
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import os
+
 import numpy as np
 from scipy.optimize import curve_fit
-from scipy.stats import norm
 
 from .. import utils
 from ..utils import plots, dose_tools
+from ..utils.serialization import SerializableModel
 
 
 
-class ParametricModel(ABC):
+class ParametricModel(SerializableModel, ABC):
     """Base class for paramterized synergy models, including MuSyC, Zimmer, GPDI, and BRAID.
     """
     def __init__(self):
@@ -41,6 +45,8 @@ class ParametricModel(ABC):
         self.aic = None
         self.bic = None
         self.bootstrap_parameters = None
+        self.bootstrap_iterations = 0
+        self.n_starts = 1
 
     def _score(self, d1, d2, E):
         """Calculate goodness of fit and model quality scores, including sum-of-squares residuals, R^2, Akaike Information Criterion (AIC), and Bayesian Information Criterion (BIC).
@@ -135,11 +141,11 @@ class ParametricModel(ABC):
             if True in np.isnan(popt):
                 return None
             return self._transform_params_from_fit(popt)
-        except:
+        except Exception as err:
             print("Exception during combination drug response fit: %s"%err)
             return None
 
-    def fit(self, d1, d2, E, drug1_model=None, drug2_model=None, use_jacobian = True, p0=None, bootstrap_iterations=0, seed=None, **kwargs):
+    def fit(self, d1, d2, E, drug1_model=None, drug2_model=None, use_jacobian = True, p0=None, bootstrap_iterations=0, seed=None, n_jobs=1, executor=None, bootstrap_tol=None, bootstrap_chunk_size=50, bootstrap_confidence_interval=95, n_starts=1, n_starts_agree=None, **kwargs):
         """Fit the model to data.
 
         Parameters
@@ -170,6 +176,27 @@ class ParametricModel(ABC):
 
         seed : int, default=None
             If not None, used as numpy.random.seed(start_seed) at the beginning of bootstrap resampling
+
+        n_jobs : int, default=1
+            Number of worker processes used to run bootstrap iterations and multi-start fits. If -1, uses all available CPUs. Each iteration draws its noise from its own seed (derived from seed), so bootstrap_parameters are identical for any n_jobs.
+
+        executor : concurrent.futures.Executor, default=None
+            If given, bootstrap iterations and multi-start fits are submitted to this executor instead of a new process pool. Work is split into n_jobs chunks (or one per CPU if n_jobs<=1).
+
+        bootstrap_tol : float, default=None
+            If not None, bootstrapping is adaptive: iterations are run in chunks of bootstrap_chunk_size, and stop early once no bound of the bootstrap_confidence_interval of any parameter moves by more than bootstrap_tol times that interval's width between chunks. bootstrap_iterations is then the maximum number of iterations. The number actually run is stored in model.bootstrap_iterations.
+
+        bootstrap_chunk_size : int, default=50
+            Number of iterations between convergence checks when bootstrap_tol is set
+
+        bootstrap_confidence_interval : float, default=95
+            Confidence interval whose bounds are checked for convergence when bootstrap_tol is set
+
+        n_starts : int, default=1
+            If greater than 1, the fit is started from p0 plus n_starts-1 points drawn from a Latin hypercube over self.bounds (in fit-space, e.g., log(h) and log(C)). Infinite bounds are replaced by p0 +/- max(1, |p0|). The solution with the lowest sum of squared residuals is kept.
+
+        n_starts_agree : int, default=None
+            If not None, multi-start fitting stops early once this many starts have reached the best sum of squared residuals (to a relative tolerance of 1e-4). The number of starts actually run is stored in model.n_starts.
         
         kwargs
             kwargs to pass to scipy.optimize.curve_fit()
@@ -183,30 +210,90 @@ class ParametricModel(ABC):
 
         xdata = np.vstack((d1,d2))
         
-        if 'p0' in kwargs:
-            p0 = list(kwargs.get('p0'))
-        else:
-            p0 = None
+        if p0 is not None:
+            p0 = list(p0)
         
         p0 = self._get_initial_guess(d1, d2, E, drug1_model, drug2_model, p0=p0)
 
-        kwargs['p0']=p0
-        
-        with np.errstate(divide='ignore', invalid='ignore'):
-            popt = self._internal_fit(xdata, E, use_jacobian, **kwargs)
+        if n_jobs == -1:
+            n_jobs = os.cpu_count()
+
+        # A single pool is shared by multi-start fitting and bootstrapping
+        pool = None
+        if executor is None and n_jobs is not None and n_jobs > 1 and (n_starts > 1 or bootstrap_iterations > 0):
+            pool = ProcessPoolExecutor(max_workers=n_jobs)
+            executor = pool
+
+        try:
+            if n_starts > 1:
+                popt = self._multistart_fit(xdata, E, use_jacobian, p0, n_starts, n_starts_agree=n_starts_agree, n_jobs=n_jobs, executor=executor, **kwargs)
+            else:
+                kwargs['p0']=p0
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    popt = self._internal_fit(xdata, E, use_jacobian, **kwargs)
+                self.n_starts = 1
+
+            if popt is None:
+                self._set_parameters(self._transform_params_from_fit(p0))
+                self.converged = False
+            else:
+                self.converged = True
+                self._set_parameters(popt)
+                n_parameters = len(popt)
+                n_samples = len(d1)
+                if (n_samples - n_parameters - 1 > 0):
+                    self._score(d1, d2, E)
+                    kwargs['p0'] = self._transform_params_to_fit(popt)
+                    self._bootstrap_resample(d1, d2, E, use_jacobian, bootstrap_iterations, n_jobs=n_jobs, executor=executor, bootstrap_tol=bootstrap_tol, bootstrap_chunk_size=bootstrap_chunk_size, bootstrap_confidence_interval=bootstrap_confidence_interval, **kwargs)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    def _multistart_fit(self, xdata, E, use_jacobian, p0, n_starts, n_starts_agree=None, n_jobs=1, executor=None, **kwargs):
+        """Fits the model from p0 and n_starts-1 Latin hypercube starting points within self.bounds, keeping the fit with the lowest sum of squared residuals.
+
+        Returns
+        ----------
+        popt : numpy.array
+            The best parameters (transformed from fit-space), or None if every start failed
+        """
+        p0 = np.asarray(p0, dtype=np.float64)
+        lower, upper = (np.asarray(b, dtype=np.float64) for b in self.bounds)
+
+        # Infinite bounds cannot be sampled, so sample a box around p0 instead
+        width = np.maximum(1., np.abs(p0))
+        lower = np.where(np.isfinite(lower), lower, p0 - width)
+        upper = np.where(np.isfinite(upper), upper, p0 + width)
+
+        starts = lower + utils.fit_tools.latin_hypercube(n_starts-1, len(p0))*(upper-lower)
+        starts = [p0] + list(starts)
 
-        if popt is None:
-            self._set_parameters(self._transform_params_from_fit(p0))
-            self.converged = False
+        start_chunk = partial(_multistart_fits, self, xdata, E, use_jacobian, kwargs)
+
+        # Serially, check for agreement after every start. In parallel, after every round of workers.
+        if n_starts_agree is None:
+            chunk_size = n_starts
+        elif executor is None:
+            chunk_size = 1
         else:
-            self.converged = True
-            self._set_parameters(popt)
-            n_parameters = len(popt)
-            n_samples = len(d1)
-            if (n_samples - n_parameters - 1 > 0):
-                self._score(d1, d2, E)
-                kwargs['p0'] = self._transform_params_to_fit(popt)
-                self._bootstrap_resample(d1, d2, E, use_jacobian, bootstrap_iterations, **kwargs)
+            chunk_size = n_jobs if (n_jobs is not None and n_jobs > 1) else os.cpu_count()
+
+        results = []
+        for start in range(0, n_starts, chunk_size):
+            results += utils.fit_tools.map_chunks(start_chunk, starts[start:start+chunk_size], n_jobs, executor)
+            if n_starts_agree is None:
+                continue
+            
+            ssr = np.asarray([r[1] for r in results])
+            best_ssr = np.min(ssr)
+            if np.isfinite(best_ssr) and np.sum(ssr <= best_ssr*(1+1e-4)) >= n_starts_agree:
+                break
+
+        self.n_starts = len(results)
+        popt, ssr = min(results, key=lambda r: r[1])
+        if not np.isfinite(ssr):
+            return None
+        return popt
     
     @abstractmethod
     def E(self, d1, d2):
@@ -266,37 +353,70 @@ class ParametricModel(ABC):
         pass
 
     
-    def _bootstrap_resample(self, d1, d2, E, use_jacobian, bootstrap_iterations, seed=None, **kwargs):
+    def _bootstrap_resample(self, d1, d2, E, use_jacobian, bootstrap_iterations, n_jobs=1, executor=None, bootstrap_tol=None, bootstrap_chunk_size=50, bootstrap_confidence_interval=95, **kwargs):
         """Internal function to identify confidence intervals for parameters
         """
 
         if not self._is_parameterized(): return
         if not self.converged: return
 
+        # Without iterations, leave the global random state untouched
+        if bootstrap_iterations <= 0:
+            self.bootstrap_iterations = 0
+            self.bootstrap_parameters = None
+            return
+
         n_data_points = len(E)
         n_parameters = len(self._get_parameters())
         
         sigma_residuals = np.sqrt(self.sum_of_squares_residuals / (n_data_points - n_parameters))
 
         E_model = self.E(d1, d2)
-        bootstrap_parameters = []
-
         xdata = np.vstack((d1,d2))
 
-        #if start_seed is not None: np.random.seed(start_seed)
-        for iteration in range(bootstrap_iterations):
-            #if start_seed is not None: np.random.seed(start_seed + iteration)
-            residuals_step = norm.rvs(loc=0, scale=sigma_residuals, size=n_data_points)
+        # Every iteration gets its own seed, derived from the global numpy random state (which fit(seed=...) sets). This makes the results independent of how iterations are split among workers or chunks.
+        seeds = np.random.SeedSequence(np.random.randint(0, 2**31, size=4)).spawn(bootstrap_iterations)
 
-            # Add random noise to model prediction
-            E_iteration = E_model + residuals_step
+        if n_jobs == -1:
+            n_jobs = os.cpu_count()
 
-            # Fit noisy data
-            with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
-                popt1 = self._internal_fit(xdata, E_iteration, use_jacobian=use_jacobian, **kwargs)
-            
-            if popt1 is not None:
-                bootstrap_parameters.append(popt1)
+        bootstrap_chunk = partial(_bootstrap_iterations, self, xdata, E_model, sigma_residuals, use_jacobian, kwargs)
+
+        pool = None
+        if executor is None and n_jobs is not None and n_jobs > 1:
+            pool = ProcessPoolExecutor(max_workers=n_jobs)
+            executor = pool
+
+        if bootstrap_tol is None:
+            chunk_size = max(bootstrap_iterations, 1)
+        else:
+            chunk_size = max(int(bootstrap_chunk_size), 1)
+
+        results = []
+        previous_range = None
+        try:
+            for start in range(0, bootstrap_iterations, chunk_size):
+                results += utils.fit_tools.map_chunks(bootstrap_chunk, seeds[start:start+chunk_size], n_jobs, executor)
+                if bootstrap_tol is None:
+                    continue
+
+                # Stop once the confidence interval bounds have stabilized
+                bootstrap_parameters = [popt1 for popt1 in results if popt1 is not None]
+                if len(bootstrap_parameters) == 0:
+                    continue
+                lb = (100-bootstrap_confidence_interval)/2.
+                parameter_range = np.percentile(np.vstack(bootstrap_parameters), [lb, 100-lb], axis=0)
+                if previous_range is not None:
+                    width = np.abs(parameter_range[1] - parameter_range[0])
+                    if np.all(np.abs(parameter_range - previous_range) <= bootstrap_tol*width):
+                        break
+                previous_range = parameter_range
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        self.bootstrap_iterations = len(results)
+        bootstrap_parameters = [popt1 for popt1 in results if popt1 is not None]
         if len(bootstrap_parameters) > 0:
             self.bootstrap_parameters = np.vstack(bootstrap_parameters)
         else:
@@ -429,4 +549,49 @@ class ParametricModel(ABC):
         # d1 and d2 may come from data, and have replicates. This would cause problems with surface plots (replicates in scatter_points are fine, but replicates in the surface itself are not)
         d1, d2 = dose_tools.remove_replicates(d1, d2)
         E = self.E(d1, d2)
-        plots.plot_surface_plotly(d1, d2, E, cmap=cmap, **kwargs)
\ No newline at end of file
+        plots.plot_surface_plotly(d1, d2, E, cmap=cmap, **kwargs)
+
+
+def _bootstrap_iterations(model, xdata, E_model, sigma_residuals, use_jacobian, kwargs, seeds):
+    """Runs the bootstrap iterations for the given seeds. This is a module-level function so it can be sent to worker processes.
+
+    Returns
+    ----------
+    results : list
+        For each seed, the fit parameters, or None if the fit failed
+    """
+    results = []
+    for seed in seeds:
+        rng = np.random.default_rng(seed)
+        residuals_step = rng.normal(loc=0, scale=sigma_residuals, size=len(E_model))
+
+        # Add random noise to model prediction
+        E_iteration = E_model + residuals_step
+
+        # Fit noisy data
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            results.append(model._internal_fit(xdata, E_iteration, use_jacobian=use_jacobian, **kwargs))
+    return results
+
+def _multistart_fits(model, xdata, E, use_jacobian, kwargs, starts):
+    """Fits the model from each of the given starting points (in fit-space). This is a module-level function so it can be sent to worker processes.
+
+    Returns
+    ----------
+    results : list
+        For each start, a tuple of the fit parameters (or None if the fit failed) and their sum of squared residuals (inf if the fit failed)
+    """
+    kwargs = dict(kwargs)
+    results = []
+    for p0 in starts:
+        kwargs['p0'] = p0
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            popt = model._internal_fit(xdata, E, use_jacobian=use_jacobian, **kwargs)
+            ssr = np.inf
+            if popt is not None:
+                residuals = model.fit_function(xdata, *model._transform_params_to_fit(popt)) - E
+                ssr = np.sum(residuals*residuals)
+                if not np.isfinite(ssr):
+                    ssr = np.inf
+        results.append((popt, ssr))
+    return results
@@ -39,11 +39,12 @@ class Schindler(DoseDependentModel):
         E = np.asarray(E)
         super().fit(d1,d2,E, drug1_model=drug1_model, drug2_model=drug2_model, **kwargs)
 
-        drug1_model = self.drug1_model
-        drug2_model = self.drug2_model
-        
-        E0_1, E1, h1, C1 = self.drug1_model.get_parameters()
-        E0_2, E2, h2, C2 = self.drug2_model.get_parameters()
+        self.synergy, self.reference = self._get_synergy(d1, d2, E, self.drug1_model, self.drug2_model)
+        return self.synergy
+
+    def _get_synergy(self, d1, d2, E, drug1_model, drug2_model):
+        E0_1, E1, h1, C1 = drug1_model.get_parameters()
+        E0_2, E2, h2, C2 = drug2_model.get_parameters()
         E0 = (E0_1+E0_2)/2.
         uE1 = E0-E1
         uE2 = E0-E2
@@ -56,11 +57,11 @@ class Schindler(DoseDependentModel):
 
         uE_model[np.where((d1==0) & (d2==0))] = 0
 
-        self.reference = E0-uE_model
-        self.synergy = uE-uE_model
+        reference = E0-uE_model
+        synergy = uE-uE_model
 
-        self.synergy[(d1==0) | (d2==0)] = 0.
-        return self.synergy
+        synergy[(d1==0) | (d2==0)] = 0.
+        return synergy, reference
     
 
     def _model(self, d1, d2, E1, E2, h1, h2, C1, C2):
@@ -13,6 +13,10 @@
 #    You should have received a copy of the GNU General Public License
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import os
+
 import numpy as np
 import inspect
 import warnings
@@ -43,6 +47,10 @@ class ZIP(DoseDependentModel):
     _C_12 : array_like
         The EC50 of drug 2 obtained by holding D1==constant
     """
+
+    # Each well's Hill fits share data with every other well at the same dose of either drug, so plates are scored by _score_plates()
+    _pointwise_synergy = False
+
     def __init__(self, E0_bounds=(0,1.5), E1_bounds=(0,1.5), E2_bounds=(0,1.5), h1_bounds=(0,np.inf), C1_bounds=(0,np.inf), h2_bounds=(0,np.inf), C2_bounds=(0,np.inf), synergyfinder=False):
 
         super().__init__(h1_bounds=h1_bounds, h2_bounds=h2_bounds, C1_bounds=C1_bounds, C2_bounds=C2_bounds, E0_bounds=E0_bounds, E1_bounds=E1_bounds, E2_bounds=E2_bounds)
@@ -59,8 +67,21 @@ class ZIP(DoseDependentModel):
     def _get_single_drug_classes(self):
         return Hill, Hill
 
-    def fit(self, d1, d2, E, drug1_model=None, drug2_model=None, use_jacobian=True, **kwargs):
-    
+    def fit(self, d1, d2, E, drug1_model=None, drug2_model=None, use_jacobian=True, n_jobs=1, executor=None, **kwargs):
+        """Calculates ZIP synergy at doses d1, d2.
+
+        The Hill equation fit holding d2==D2 only depends on D2 (and likewise for d1==D1), so one fit is done per unique dose of each drug, and mapped back to every sample. These fits are independent, and can be run in parallel.
+
+        Parameters
+        ----------
+        n_jobs : int, default=1
+            Number of worker processes used for the Hill fits. If -1, uses all available CPUs.
+
+        executor : concurrent.futures.Executor, default=None
+            If given, the Hill fits are submitted to this executor instead of a new process pool
+
+        See DoseDependentModel.fit() for the remaining parameters.
+        """
         d1 = np.asarray(d1)
         d2 = np.asarray(d2)
         E = np.asarray(E)
@@ -96,39 +117,42 @@ class ZIP(DoseDependentModel):
         self._Emax_21 = []
         self._Emax_12 = []
         
-        if self.synergyfinder:
-            zip_model = _Hill_3P(Emax_bounds=(-1e-6,1e-6))
-        else:
-            zip_model = _Hill_3P(Emax_bounds=(0,1.5))
-        
+        Emax_bounds = self._get_Emax_bounds()
 
-        for D1, D2 in zip(d1, d2):
-            # Fix d2==D2, and fit hill for D1
+        # Fix d2==D2, and fit hill for d1 (and vice versa), once per unique D2 (or D1)
+        D2_unique, D2_inverse = np.unique(d2, return_inverse=True)
+        D1_unique, D1_inverse = np.unique(d1, return_inverse=True)
+
+        slices = []
+        for D2 in D2_unique:
             mask = np.where(d2==D2)
-            y2 = drug2_model.E(D2)
-            zip_model.E0 = y2
-            zip_model.fit(d1[mask],E[mask], use_jacobian=use_jacobian, p0=[Emax_1,h1,C1])
-            self._h_21.append(zip_model.h)
-            self._C_21.append(zip_model.C)
-            self._Emax_21.append(zip_model.Emax)
-
-            # Fix d1==D1, and fit hill for D2
+            slices.append((d1[mask], E[mask], drug2_model.E(D2), [Emax_1,h1,C1]))
+        for D1 in D1_unique:
             mask = np.where(d1==D1)
-            y1 = drug1_model.E(D1)
-            zip_model.E0 = y1
-            zip_model.fit(d2[mask],E[mask], use_jacobian=use_jacobian, p0=[Emax_2,h2,C2])
-            self._h_12.append(zip_model.h)
-            self._C_12.append(zip_model.C)
-            self._Emax_12.append(zip_model.Emax)
-        
-        self._h_21 = np.asarray(self._h_21)
-        self._h_12 = np.asarray(self._h_12)
-        self._C_21 = np.asarray(self._C_21)
-        self._C_12 = np.asarray(self._C_12)
-        self._Emax_21 = np.asarray(self._Emax_21)
-        self._Emax_12 = np.asarray(self._Emax_12)
+            slices.append((d2[mask], E[mask], drug1_model.E(D1), [Emax_2,h2,C2]))
+
+        if n_jobs == -1:
+            n_jobs = os.cpu_count()
 
-        self.synergy = self._delta_score(d1, d2, E0, self.drug1_model.Emax, self.drug2_model.Emax, h1, h2, C1, C2, self._Emax_21, self._Emax_12, self._h_21, self._h_12, self._C_21, self._C_12)
+        pool = None
+        if executor is None and n_jobs is not None and n_jobs > 1:
+            pool = ProcessPoolExecutor(max_workers=n_jobs)
+            executor = pool
+        try:
+            results = utils.fit_tools.map_chunks(partial(_fit_zip_slices, Emax_bounds, use_jacobian), slices, n_jobs, executor)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        # Columns are h, C, Emax
+        results = np.asarray(results, dtype=np.float64)
+        fits_21 = results[:len(D2_unique)][D2_inverse.reshape(-1)]
+        fits_12 = results[len(D2_unique):][D1_inverse.reshape(-1)]
+
+        self._h_21, self._C_21, self._Emax_21 = fits_21.T
+        self._h_12, self._C_12, self._Emax_12 = fits_12.T
+
+        self.synergy, self.reference = self._delta_score(d1, d2, E0, self.drug1_model.Emax, self.drug2_model.Emax, h1, h2, C1, C2, self._Emax_21, self._Emax_12, self._h_21, self._h_12, self._C_21, self._C_12)
 
         mask = np.where((d1==0) | (d2==0))
         self.synergy[mask]=0
@@ -136,24 +160,115 @@ class ZIP(DoseDependentModel):
 
         return self.synergy
 
+    def _score_plates(self, d1, d2, E, drug1_parameters, drug2_parameters, use_jacobian, max_iterations):
+        """Batched equivalent of fit() for a stack of plates. See DoseDependentModel.fit_plates().
+
+        Single drugs are fit for every plate in one batch. The Hill fits holding either dose constant, for every unique dose of every plate, are then also fit in one batch (see _fit_zip_slices_many()), and the delta score of every well is computed in one vectorized pass.
+        """
+        drug1_model, drug2_model = self._get_single_plates(d1, d2, E, drug1_parameters, drug2_parameters, use_jacobian, max_iterations)
+
+        # (n_plates x 1) columns of parameters
+        E0_1, Emax_1, h1, C1 = drug1_model.get_parameters()
+        E0_2, Emax_2, h2, C2 = drug2_model.get_parameters()
+
+        # As in fit(), plates whose drugs increase E have E0 and Emax swapped
+        swap = E0_1+E0_2 < Emax_1+Emax_2
+        drug1_model.E0, drug1_model.Emax = np.where(swap, Emax_1, E0_1), np.where(swap, E0_1, Emax_1)
+        drug2_model.E0, drug2_model.Emax = np.where(swap, Emax_2, E0_2), np.where(swap, E0_2, Emax_2)
+        E0 = (drug1_model.E0+drug2_model.E0)/2.
+
+        E1_alone = drug1_model.E(d1)
+        E2_alone = drug2_model.E(d2)
+
+        # Slices of every plate are fit in one batch, and index_21 (index_12) maps every well to its slice
+        slices = []
+        index_21 = np.empty(E.shape, dtype=np.intp)
+        index_12 = np.empty(E.shape, dtype=np.intp)
+        for plate in range(E.shape[0]):
+            for d, d_other, E_other, p0, index in [(d1[plate], d2[plate], E2_alone[plate], [Emax_1[plate,0], h1[plate,0], C1[plate,0]], index_21), (d2[plate], d1[plate], E1_alone[plate], [Emax_2[plate,0], h2[plate,0], C2[plate,0]], index_12)]:
+                D_unique, D_first, D_inverse = np.unique(d_other, return_index=True, return_inverse=True)
+                index[plate] = len(slices) + D_inverse.reshape(-1)
+                for D, first in zip(D_unique, D_first):
+                    mask = np.where(d_other==D)
+                    slices.append((d[mask], E[plate][mask], E_other[first], p0))
+
+        # Columns are h, C, Emax
+        results = _fit_zip_slices_many(self._get_Emax_bounds(), use_jacobian, max_iterations, slices)
+        h_21, C_21, Emax_21 = results[index_21].transpose(2,0,1)
+        h_12, C_12, Emax_12 = results[index_12].transpose(2,0,1)
+
+        synergy, reference = self._delta_score(d1, d2, E0, drug1_model.Emax, drug2_model.Emax, h1, h2, C1, C2, Emax_21, Emax_12, h_21, h_12, C_21, C_12)
+        synergy[(d1==0) | (d2==0)] = 0
+        return drug1_model, drug2_model, synergy, reference
+
+    def _get_Emax_bounds(self):
+        """Bounds of Emax in the Hill fits holding either dose constant
+        """
+        if self.synergyfinder:
+            return (-1e-6,1e-6)
+        return (0,1.5)
+
     def _delta_score(self, d1, d2, E0, E1, E2, h1, h2, C1, C2, Emax_21, Emax_12, h_21, h_12, C_21, C_12):
 
         single_drug_1 = E0 + (E1-E0) * np.power(d1,h1) / (np.power(C1,h1) + np.power(d1,h1))
 
         single_drug_2 = E0 + (E2-E0) * np.power(d2,h2) / (np.power(C2,h2) + np.power(d2,h2))
 
-        zip_fit_1 = single_drug_2 + (Emax_21-single_drug_2) * np.power(d1,h_21) / (np.power(C_21,h_21) + np.power(d1,h_21))
+        # Steep slice fits (large h) overflow to inf, which gives the correct step-function limit
+        with np.errstate(over='ignore'):
+            zip_fit_1 = single_drug_2 + (Emax_21-single_drug_2) * np.power(d1,h_21) / (np.power(C_21,h_21) + np.power(d1,h_21))
 
-        zip_fit_2 = single_drug_1 + (Emax_12-single_drug_1) * np.power(d2,h_12) / (np.power(C_12,h_12) + np.power(d2,h_12))
+            zip_fit_2 = single_drug_1 + (Emax_12-single_drug_1) * np.power(d2,h_12) / (np.power(C_12,h_12) + np.power(d2,h_12))
         
         zip_fit = (zip_fit_1+zip_fit_2)/2.
         zip_ind = single_drug_1*single_drug_2
 
-        self.reference = zip_ind
+        return zip_ind-zip_fit, zip_ind
 
-        return zip_ind-zip_fit
 
 
+def _fit_zip_slices(Emax_bounds, use_jacobian, slices):
+    """Fits a _Hill_3P to each (d, E, E0, p0) slice. This is a module-level function so it can be sent to worker processes.
+
+    Returns
+    ----------
+    results : list
+        For each slice, a tuple of the fit (h, C, Emax)
+    """
+    zip_model = _Hill_3P(Emax_bounds=Emax_bounds)
+    results = []
+    for d, E, E0, p0 in slices:
+        zip_model.E0 = E0
+        # Trial steps with extreme h or C overflow, and are rejected by the optimizer
+        with np.errstate(over='ignore'):
+            zip_model.fit(d, E, use_jacobian=use_jacobian, p0=p0)
+        results.append((zip_model.h, zip_model.C, zip_model.Emax))
+    return results
+
+def _fit_zip_slices_many(Emax_bounds, use_jacobian, max_iterations, slices):
+    """Batched equivalent of _fit_zip_slices(). Every slice is fit at once with synergy.utils.fit_tools.curve_fit_many(), from the same initial guesses as _fit_zip_slices(). Each slice's E0 is passed as a second row of doses, so it stays fixed per slice.
+
+    Returns
+    ----------
+    results : numpy.ndarray
+        (n_slices x 3) fits, with columns h, C, Emax
+    """
+    zip_model = _Hill_3P(Emax_bounds=Emax_bounds)
+    d = np.concatenate([slice_d for slice_d, _, _, _ in slices])
+    E = np.concatenate([slice_E for _, slice_E, _, _ in slices])
+    E0 = np.concatenate([np.full(len(slice_d), slice_E0) for slice_d, _, slice_E0, _ in slices])
+    group_ids = np.repeat(np.arange(len(slices)), [len(slice_d) for slice_d, _, _, _ in slices])
+    p0 = np.array([zip_model._get_initial_guess(slice_d, slice_E, p0=list(slice_p0)) for slice_d, slice_E, _, slice_p0 in slices], dtype=np.float64)
+
+    fit_function = lambda x, Emax, logh, logC: zip_model._model(x[0], x[1], Emax, np.exp(logh), np.exp(logC))
+    jac = None
+    if use_jacobian:
+        jac = lambda x, Emax, logh, logC: zip_model._model_jacobian(x[0], x[1], Emax, logh, logC)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        _, popt, _, _ = utils.fit_tools.curve_fit_many(fit_function, np.vstack((d, E0)), E, group_ids, p0, bounds=zip_model.bounds, jac=jac, max_iterations=max_iterations)
+        Emax, h, C = zip_model._transform_params_from_fit(popt.T)
+    return np.column_stack((h, C, Emax))
 
 class _Hill_3P(Hill):
     def __init__(self, E0=1, Emax=0, h=None, C=None, Emax_bounds=(-np.inf, np.inf), h_bounds=(0,np.inf), C_bounds=(0,np.inf)):
@@ -161,21 +276,22 @@ class _Hill_3P(Hill):
 
         self.fit_function = lambda d, Emax, logh, logC: self._model(d, self.E0, Emax, np.exp(logh), np.exp(logC))
 
-        self.jacobian_function = lambda d, Emax, logh, logC: self._model_jacobian(d, Emax, logh, logC)
+        self.jacobian_function = lambda d, Emax, logh, logC: self._model_jacobian(d, self.E0, Emax, logh, logC)
 
         self.bounds = tuple(zip(self.Emax_bounds, self.logh_bounds, self.logC_bounds))
 
-    def _model_jacobian(self, d, Emax, logh, logC):
+    def _model_jacobian(self, d, E0, Emax, logh, logC):
         dh = d**(np.exp(logh))
         Ch = (np.exp(logC))**(np.exp(logh))
         logd = np.log(d)
-        E0 = self.E0
 
         jEmax = dh/(Ch+dh)
 
-        jC = (E0-Emax)*dh*np.exp(logh+logC)*(np.exp(logC))**(np.exp(logh)-1) / ((Ch+dh)*(Ch+dh))
+        # Extreme h or C overflow Ch and dh. Those entries are nan, and zeroed below.
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            jC = (E0-Emax)*dh*np.exp(logh+logC)*(np.exp(logC))**(np.exp(logh)-1) / ((Ch+dh)*(Ch+dh))
 
-        jh = (Emax-E0)*dh*np.exp(logh) * ((Ch+dh)*logd - (logC*Ch + logd*dh)) / ((Ch+dh)*(Ch+dh))
+            jh = (Emax-E0)*dh*np.exp(logh) * ((Ch+dh)*logd - (logC*Ch + logd*dh)) / ((Ch+dh)*(Ch+dh))
         
         jac = np.hstack((jEmax.reshape(-1,1), jh.reshape(-1,1), jC.reshape(-1,1)))
         jac[np.isnan(jac)]=0
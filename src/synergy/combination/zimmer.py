@@ -18,6 +18,7 @@ import numpy as np
 from .. import utils
 from ..single import Hill_2P
 from .parametric_base import ParametricModel
+from .jacobians.zimmer_jacobian import jacobian
 
 class Zimmer(ParametricModel):
     """The Effective Dose Model from Zimmer et al (doi: 10.1073/pnas.1606301113). This model uses the multiplicative survival principle (i.e., Bliss), but adds a parameter for each drug describing how it affects the potency of the other. Specifically, given doses d1 and d2, this model translates them to "effective" doses using the following system of equations
@@ -65,6 +66,8 @@ class Zimmer(ParametricModel):
 
         self.fit_function = lambda d, logh1, logh2, logC1, logC2, a12, a21: self._model(d[0], d[1], np.exp(logh1), np.exp(logh2), np.exp(logC1), np.exp(logC2), a12, a21)
 
+        self.jacobian_function = lambda d, logh1, logh2, logC1, logC2, a12, a21: jacobian(d[0], d[1], logh1, logh2, logC1, logC2, a12, a21)
+
         self.bounds = tuple(zip(self.logh1_bounds, self.logh2_bounds, self.logC1_bounds, self.logC2_bounds, self.a12_bounds, self.a21_bounds))
 
 
@@ -82,10 +85,10 @@ class Zimmer(ParametricModel):
             # Fit the single drug models if they were not pre-fit by the user
             if not drug1_model.is_fit():
                 mask = np.where(d2==min(d2))
-                drug1_model.fit(d1[mask], E[mask])
+                utils.fit_cache.fit(drug1_model, d1[mask], E[mask])
             if not drug2_model.is_fit():
                 mask = np.where(d1==min(d1))
-                drug2_model.fit(d2[mask], E[mask])
+                utils.fit_cache.fit(drug2_model, d2[mask], E[mask])
             
             # Get initial guesses of E0, E1, E2, h1, h2, C1, and C2 from single-drug fits
             h1, C1 = drug1_model.get_parameters()
@@ -16,6 +16,7 @@
 import numpy as np
 
 from ..single import MarginalLinear
+from .. import utils
 from .nonparametric_base import DoseDependentHigher
 
 class Bliss(DoseDependentHigher):
@@ -28,33 +29,24 @@ class Bliss(DoseDependentHigher):
     """
 
     def fit(self, d, E, single_models=None, **kwargs):
-
-        d = np.asarray(d)
+        grid = utils.dose_tools.as_dose_grid(d)
         E = np.asarray(E)
-        n = d.shape[1]
-        super().fit(d, E, single_models=single_models, **kwargs)
-        single_models=self.single_models
+        super().fit(grid, E, single_models=single_models, **kwargs)
+        self.synergy, self.reference = self._get_synergy(grid, E, self.single_models)
+        return self.synergy
 
+    def _get_synergy(self, grid, E, single_models):
         # Get E for each single drug
-        E_singles = d*0
-        for i in range(n):
-            E_singles[:,i] = single_models[i].E(d[:,i])
-        E_bliss = np.prod(E_singles, axis=1)
+        E_bliss = 1
+        for i, single in enumerate(single_models):
+            E_bliss = E_bliss * single.E(grid.d[:,i])
         
         # Calculate synergy as excess over bliss
-        self.synergy = E_bliss - E
+        synergy = E_bliss - E
 
         # Ensure all single-drug bliss scores are 0
-        for i in range(n):
-                # Mask where all other drugs are minimum (ideally 0)
-                mask = d[:,i]>=0 # This should always be true
-                for j in range(n):
-                    if i==j: continue
-                    mask = mask & (d[:,j]==np.min(d[:,j]))
-                mask = np.where(mask)
-                self.synergy[mask] = 0
-
-        return self.synergy
+        synergy[..., grid.any_single_drug_mask()] = 0
+        return synergy, E_bliss
 
     def _get_single_drug_classes(self):
         return MarginalLinear, None
\ No newline at end of file
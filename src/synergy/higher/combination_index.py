@@ -16,6 +16,7 @@
 import numpy as np
 
 from ..single import Hill_CI
+from .. import utils
 from .nonparametric_base import DoseDependentHigher
 
 class CombinationIndex(DoseDependentHigher):
@@ -30,46 +31,25 @@ class CombinationIndex(DoseDependentHigher):
     """
 
     def fit(self, d, E, single_models=None, **kwargs):
-        
-        d = np.asarray(d)
+        grid = utils.dose_tools.as_dose_grid(d)
         E = np.asarray(E)
-        n = d.shape[1]
-
-        super().fit(d, E, single_models=single_models, **kwargs)
-        
-        # Fit single drugs
-        if single_models is None:
-            single_models = []
-            
-            for i in range(n):
-                # Mask where all other drugs are minimum (ideally 0)
-                mask = d[:,i]>=0 # This should always be true
-                for j in range(n):
-                    if i==j: continue
-                    mask = mask & (d[:,j]==np.min(d[:,j]))
-                mask = np.where(mask)
-                single = Hill_CI.create_fit(d[mask,i].flatten(), E[mask])
-                single_models.append(single)
-        self.single_models = single_models
+        super().fit(grid, E, single_models=single_models, **kwargs)
+        self.synergy, self.reference = self._get_synergy(grid, E, self.single_models)
+        return self.synergy
 
-        d_singles = d*0
+    def _get_synergy(self, grid, E, single_models):
         with np.errstate(divide='ignore', invalid='ignore'):
-            for i in range(n):
-                d_singles[:,i] = single_models[i].E_inv(E)
-
-            self.synergy = (d/d_singles).sum(axis=1)
+            synergy = 0
+            for i, single in enumerate(single_models):
+                synergy = synergy + grid.d[:,i]/single.E_inv(E)
 
         # Ensure all single-drug CI scores are 1
-        for i in range(n):
-                # Mask where all other drugs are minimum (ideally 0)
-                mask = d[:,i]>=0 # This should always be true
-                for j in range(n):
-                    if i==j: continue
-                    mask = mask & (d[:,j]==np.min(d[:,j]))
-                mask = np.where(mask)
-                self.synergy[mask] = 1
+        synergy[..., grid.any_single_drug_mask()] = 1
+        return synergy, None
 
-        return self.synergy
+    def _get_synergy_direction(self):
+        # CI is synergistic below 1
+        return 1, -1
 
     def _get_single_drug_classes(self):
         return Hill_CI, Hill_CI
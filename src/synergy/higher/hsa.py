@@ -16,6 +16,7 @@
 import numpy as np
 
 from ..single import MarginalLinear
+from .. import utils
 from .nonparametric_base import DoseDependentHigher
 
 class HSA(DoseDependentHigher):
@@ -25,47 +26,24 @@ class HSA(DoseDependentHigher):
     """
     
     def fit(self, d, E, single_models=None, **kwargs):
-        d = np.asarray(d)
+        grid = utils.dose_tools.as_dose_grid(d)
         E = np.asarray(E)
-        n = d.shape[1]
-
-        super().fit(d, E, single_models=single_models, **kwargs)
-        
-        # Fit single drugs
-        if single_models is None:
-            single_models = []
-            
-            for i in range(n):
-                # Mask where all other drugs are minimum (ideally 0)
-                mask = d[:,i]>=0 # This should always be true
-                for j in range(n):
-                    if i==j: continue
-                    mask = mask & (d[:,j]==np.min(d[:,j]))
-                mask = np.where(mask)
-                single = MarginalLinear()
-                single.fit(d[mask,i].flatten(), E[mask], **kwargs)
-                single_models.append(single)
-        self.single_models = single_models
+        super().fit(grid, E, single_models=single_models, **kwargs)
+        self.synergy, self.reference = self._get_synergy(grid, E, self.single_models)
+        return self.synergy
 
-        E_singles = d*0
-        for i in range(n):
-            E_singles[:,i] = single_models[i].E(d[:,i])
-        E_HSA = np.min(E_singles, axis=1)
+    def _get_synergy(self, grid, E, single_models):
+        # Get E for each single drug, keeping the strongest
+        E_HSA = np.inf
+        for i, single in enumerate(single_models):
+            E_HSA = np.minimum(E_HSA, single.E(grid.d[:,i]))
 
         # Calculate synergy as excess over HSA
-        self.synergy = E_HSA - E
+        synergy = E_HSA - E
 
-        # Ensure all single-drug HSA scores are 1
-        for i in range(n):
-                # Mask where all other drugs are minimum (ideally 0)
-                mask = d[:,i]>=0 # This should always be true
-                for j in range(n):
-                    if i==j: continue
-                    mask = mask & (d[:,j]==np.min(d[:,j]))
-                mask = np.where(mask)
-                self.synergy[mask] = 0
-
-        return self.synergy
+        # Ensure all single-drug HSA scores are 0
+        synergy[..., grid.any_single_drug_mask()] = 0
+        return synergy, E_HSA
 
     def _get_single_drug_classes(self):
         return MarginalLinear, None
\ No newline at end of file
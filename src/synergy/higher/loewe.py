@@ -16,6 +16,7 @@
 import numpy as np
 
 from ..single import Hill
+from .. import utils
 from .nonparametric_base import DoseDependentHigher
 
 class Loewe(DoseDependentHigher):
@@ -23,39 +24,166 @@ class Loewe(DoseDependentHigher):
     
     Loewe's model of drug combination additivity expects a linear tradeoff, such that withholding X parts of drug 1 can be compensated for by adding Y parts of drug 2. In Loewe's model, X and Y are constant (e.g., withholding 5X parts of drug 1 will be compensated for with 5Y parts of drug 2.)
 
+    As with the two-drug Loewe model, the variant may be set as
+
+        model = Loewe(..., variant="CI") (default)
+        or
+        model = Loewe(..., variant="delta")
+
+    Variant "CI" (default) calculates synergy using an equation equivalent to combination index, but allows arbitrary single-drug models.
+
+    Variant "delta" solves sum_i d_i / E_inv_i(E) = 1 for the expected effect at every dose, and defines synergy as the difference between the expected and measured values. This variant REQUIRES single-drugs be fitted using a Hill model. Variants "delta_hsa", "delta_nan", and "delta_synergyfinder" differ in how they treat doses where Loewe is undefined (see synergy.combination.Loewe).
+
     synergy : array_like, float
-        [0,1)=synergism, (1,inf)=antagonism
+        if variant=="CI":
+            [0,1)=synergism, (1,inf)=antagonism
+        if variant=="delta":
+            (0,inf)=synergism, (-inf,0)=antagonism
     """
+
+    def __init__(self, E_bounds=(-np.inf,np.inf), h_bounds=(0,np.inf), C_bounds=(0,np.inf), variant="CI"):
+
+        super().__init__(E_bounds=E_bounds, h_bounds=h_bounds, C_bounds=C_bounds)
+
+        self.variant = "CI"
+        if isinstance(variant, str):
+            self.variant = variant.lower()
     
     def fit(self, d, E, single_models=None, **kwargs):
-        d = np.asarray(d)
+        grid = utils.dose_tools.as_dose_grid(d)
         E = np.asarray(E)
+        super().fit(grid, E, single_models=single_models, **kwargs)
+        self.synergy, self.reference = self._get_synergy(grid, E, self.single_models)
+        return self.synergy
+
+    def _get_synergy(self, grid, E, single_models):
+        reference = None
+        if self.variant.startswith("delta"):
+            reference = self._E_reference(grid.d, single_models)
+            synergy = reference - E
+            single_synergy = 0
+        else:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                synergy = 0
+                for i, single in enumerate(single_models):
+                    # The dose of each drug that alone achieves E
+                    synergy = synergy + grid.d[:,i]/single.E_inv(E)
+            single_synergy = 1
+
+        # Ensure all single-drug Loewe scores are 1 (or 0 for delta)
+        synergy[..., grid.any_single_drug_mask()] = single_synergy
+        return synergy, reference
+
+    def _E_reference(self, d, single_models):
+        """Calculates the Loewe reference (null) effect for N drugs at doses d.
+
+        At each dose, the reference is the E that satisfies sum_i d_i / E_inv_i(E) = 1 over the drugs present. All doses are solved together by bisection between the single-drug effect bounds. With two drugs this gives the same reference as synergy.combination.Loewe.
+
+        single_models MUST be some form of Hill equation
+
+        Parameters
+        ----------
+        d : numpy.ndarray (M x N)
+            Doses of N drugs sampled at M points
+
+        single_models : array_like with length equal to N
+            Fit Hill models for each drug
+
+        Returns
+        ----------
+        reference : numpy.array
+            The Loewe reference at all doses d
+        """
+        d = np.asarray(d, dtype=np.float64)
         n = d.shape[1]
-        
-        super().fit(d, E, single_models=single_models, **kwargs)
-        single_models=self.single_models
 
-        d_singles = d*0 # The dose of each drug that alone achieves E
+        # (4 x ... x N) parameters. With stacked single-drug models (see bootstrap()), each parameter is (n_resamples x 1 x N), and every resample is solved at every dose as one flat set of points
+        parameters = np.stack(np.broadcast_arrays(*[np.asarray(model.get_parameters(), dtype=np.float64) for model in single_models]), axis=-1)
+        shape = np.broadcast_shapes(parameters.shape[1:-1], d.shape[:1]) + (n,)
+        d = np.broadcast_to(d, shape).reshape(-1, n)
+        E0, Emax, h, C = [np.broadcast_to(p, shape).reshape(-1, n) for p in parameters]
+        ref = np.zeros(d.shape[0])
+
+        # The Hill equation, evaluated with each point's own parameters
+        hill = Hill()._model
+
+        # Loewe becomes undefined for effects past the weakest drug's Emax (see synergy.combination.Loewe)
+        if self.variant=="delta": option=1
+        elif self.variant=="delta_hsa": option=2
+        elif self.variant=="delta_nan": option=3
+        elif self.variant=="delta_synergyfinder": option=4
+        else: option=1
+
         with np.errstate(divide='ignore', invalid='ignore'):
-            for i in range(n):
-                d_singles[:,i] = single_models[i].E_inv(E)
+            E_singles = hill(d, E0, Emax, h, C)
 
-            self.synergy = (d/d_singles).sum(axis=1)
+            present = (d != 0)
+            n_present = present.sum(axis=1)
 
-        # Ensure all single-drug Loewe scores are 1
-        for i in range(n):
-                # Mask where all other drugs are minimum (ideally 0)
-                mask = d[:,i]>=0 # This should always be true
-                for j in range(n):
-                    if i==j: continue
-                    mask = mask & (d[:,j]==np.min(d[:,j]))
-                mask = np.where(mask)
-                self.synergy[mask] = 1
+            # No drug
+            no_drug = (n_present == 0)
+            ref[no_drug] = E_singles[no_drug].mean(axis=1)
 
-        return self.synergy
+            # Single drugs
+            single_drug = (n_present == 1)
+            ref[single_drug] = E_singles[single_drug][present[single_drug]]
+
+            # If the combo E is stronger than the weakest drug is capable of, don't bother trying to fit
+            combo = (n_present > 1)
+            weakest_E = np.where(present, Emax, -np.inf).max(axis=1)
+            strongest_single_E = np.where(present, E_singles, np.inf).min(axis=1)
+            out_of_range = combo & (strongest_single_E < weakest_E)
+            if option==1:
+                ref[out_of_range] = weakest_E[out_of_range]
+            elif option==2:
+                ref[out_of_range] = strongest_single_E[out_of_range]
+            elif option==4:
+                # The stronger drug alone, at the total dose
+                rows = np.where(out_of_range)[0]
+                stronger_drug = np.where(present, Emax, np.inf)[rows].argmin(axis=1)
+                ref[rows] = hill(d[rows].sum(axis=1), E0[rows,stronger_drug], Emax[rows,stronger_drug], h[rows,stronger_drug], C[rows,stronger_drug])
+            else:
+                ref[out_of_range] = np.nan
+
+            # Numerically solve the value for Loewe
+            to_solve = combo & ~out_of_range
+            if to_solve.any():
+                d_solve = d[to_solve]
+                present_solve = present[to_solve]
+                E0_solve, Emax_solve, h_solve, C_solve = E0[to_solve], Emax[to_solve], h[to_solve], C[to_solve]
+
+                # Y_Loewe is only valid where it lies within every present drug's [E0, Emax]
+                lower = np.where(present_solve, np.minimum(E0_solve, Emax_solve), -np.inf).max(axis=1)
+                upper = np.where(present_solve, np.maximum(E0_solve, Emax_solve), np.inf).min(axis=1)
+
+                # CI - 1, which is monotonic in Y between the bounds
+                def f(Y):
+                    Y = Y[:,np.newaxis]
+                    d_alone = C_solve*np.abs((Y-E0_solve)/(Emax_solve-Y))**(1/h_solve)
+                    return np.where(present_solve, d_solve/d_alone, 0).sum(axis=1) - 1.0
+
+                Y, _ = utils.fit_tools.bisect_many(f, lower, upper)
+
+                # If the bounds do not overlap, fall back to the strongest single drug
+                Y[lower > upper] = strongest_single_E[to_solve][lower > upper]
+                ref[to_solve] = Y
+
+        return ref.reshape(shape[:-1])
+
+    def _get_synergy_direction(self):
+        if self.variant.startswith("delta"):
+            return 0, 1
+        # The CI-like variant is synergistic below 1
+        return 1, -1
 
     def _get_single_drug_classes(self):
+        # The delta model ONLY works when single drugs are fit with Hill equation
+        if self.variant.startswith("delta"):
+            return Hill, Hill
+
         return Hill, None
 
-    def plotly_isosurfaces(self, drug_axes=[0,1,2], other_drug_slices=None, cmap="PRGn", neglog=True, **kwargs):
-        super().plotly_isosurfaces(drug_axes=drug_axes, other_drug_slices=other_drug_slices, cmap=cmap, neglog=neglog, **kwargs)
\ No newline at end of file
+    def plotly_isosurfaces(self, drug_axes=[0,1,2], other_drug_slices=None, cmap="PRGn", neglog=None, **kwargs):
+        if neglog is None:
+            neglog = not self.variant.startswith("delta")
+        super().plotly_isosurfaces(drug_axes=drug_axes, other_drug_slices=other_drug_slices, cmap=cmap, neglog=neglog, **kwargs)
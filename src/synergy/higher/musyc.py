@@ -13,6 +13,8 @@
 #    You should have received a copy of the GNU General Public License
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from functools import lru_cache
+
 import numpy as np
 
 from .. import utils
@@ -20,6 +22,9 @@ from .parametric_base import ParametricHigher
 from ..single import Hill
 
 class MuSyC(ParametricHigher):
+    # _edge_index is rebuilt from the number of drugs by _build_edge_indices()
+    _transient_attributes = ("_edge_index",)
+
     def __init__(self, E_bounds=(-np.inf,np.inf), h_bounds=(0,np.inf), C_bounds=(0,np.inf), alpha_bounds=(0,np.inf), gamma_bounds=(0,np.inf), r=1., parameters=None, variant="full"):
         super().__init__(parameters=parameters)
         
@@ -42,20 +47,33 @@ class MuSyC(ParametricHigher):
 
         if variant == "no_gamma":
             self.fit_function = self._model_no_gamma
+            self.jacobian_function = self._jacobian_no_gamma
         else:
             self.fit_function = self._model
+            self.jacobian_function = self._jacobian
 
         # Given 3 drugs, there are 9 synergy edges, and so 9 synergistic potencies and cooperativities. Thus, alphas=[a,b,c,d,e,f,g,h,i]. _edge_index[2][6] will give the index of the alpha corresponding to going from state [010] to [110] (e.g., adding drug 3).
         self._edge_index = None
 
-    def fit(self, d, E, bootstrap_iterations=0, **kwargs):
-        if len(d.shape) != 2:
+        # Doses are evaluated in chunks, building at most this many transition matrix entries at once (32 MB of float64)
+        self.max_chunk_elements = 2**22
+
+    def fit(self, d, E, bootstrap_iterations=0, use_jacobian=True, **kwargs):
+        if isinstance(d, np.ndarray) and len(d.shape) != 2:
             return None
+        grid = utils.dose_tools.as_dose_grid(d)
         
-        self._build_edge_indices(d.shape[1])
-        super().fit(d, E, bootstrap_iterations=bootstrap_iterations, **kwargs)
+        self._build_edge_indices(grid.n_drugs)
+        super().fit(grid, E, bootstrap_iterations=bootstrap_iterations, use_jacobian=use_jacobian, **kwargs)
 
     def E(self, d):
+        if isinstance(d, utils.dose_tools.LazyGrid):
+            # Only one chunk of the grid's rows is held at a time
+            if d.n_drugs < 2 or not self._is_parameterized():
+                return None
+            return np.concatenate([self.E(chunk) for chunk in d.chunks()])
+        if isinstance(d, utils.dose_tools.DoseGrid):
+            d = d.d
         if len(d.shape) != 2:
             # d is not properly formatted
             return None
@@ -108,6 +126,8 @@ class MuSyC(ParametricHigher):
         return 0
 
     def _get_initial_guess(self, d, E, single_models=None, p0=None):
+        grid = utils.dose_tools.as_dose_grid(d)
+        d = grid.d
         n = d.shape[1]
 
         n_E = 2**n
@@ -138,16 +158,8 @@ class MuSyC(ParametricHigher):
         
             # Make guesses of E for each drug state
             for idx in range(2**n):
-                # state = [0,1,1] means drug3=0, drug2=1, drug1=1
-                state = MuSyC._idx_to_state(idx, n)
-                mask = d[:,0]>-1 # d is always > 0, so initializes to array of True
-                for drugnum in range(1,n+1): # 1, 2, 3, ...
-                    drugstate = state[n-drugnum] # 1->2, 2->1, 3->0
-                    if drugstate==0:
-                        mask = mask & (d[:,drugnum-1]==np.min(d[:,drugnum-1]))
-                    else:
-                        mask = mask & (d[:,drugnum-1]==np.max(d[:,drugnum-1]))
-                mask = np.where(mask)
+                # Bit i of idx is the state of drug i (see _idx_to_state())
+                mask = grid.corner_indices(idx)
                 E_params[idx] = np.median(E[mask])
 
             # Make guesses for E, h, C of undrugged and single-drugged states
@@ -166,15 +178,10 @@ class MuSyC(ParametricHigher):
                 single_drug_model = utils.sanitize_single_drug_model(_single_model, default_class, expected_superclass=expected_superclass, E0_bounds=self.E_bounds, Emax_bounds=self.E_bounds, h_bounds=self.h_bounds, C_bounds=self.C_bounds)
 
                 # Mask all other drugs at their minimum values
-                mask = d[:,0]>-1 # d is always > 0, so initializes to array of True
-                for otherdrug in range(n):
-                    if otherdrug==i:
-                        continue
-                    mask = mask & (d[:,otherdrug] == np.min(d[:,otherdrug]))
-                mask = np.where(mask)
+                mask = grid.single_drug_indices(i)
 
                 if not single_drug_model.is_fit():
-                    single_drug_model.fit(d[mask,i].flatten(), E[mask], p0=(E_params[0], E_params[i], h_params[i], C_params[i]))
+                    utils.fit_cache.fit(single_drug_model, d[mask,i].flatten(), E[mask], p0=(E_params[0], E_params[i], h_params[i], C_params[i]))
 
                 # Override initial guesses with single fits
                 if single_drug_model.converged:
@@ -273,16 +280,120 @@ class MuSyC(ParametricHigher):
                 remove_drugs.append((drug_idx, MuSyC._state_to_idx(neighbor)))
         return add_drugs, remove_drugs
     
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _get_topology(n):
+        """Returns the edges of the n-drug state hypercube as integer index arrays. Computed once per n.
+
+        Bit k of a state's index is set if drug k is active (see _idx_to_state()). Edges are ordered by source state, then by descending drug, which is the order of the synergy parameters (see _build_edge_indices()).
+
+        Returns
+        -------
+        src : numpy.array
+            State each edge starts from
+
+        dst : numpy.array
+            State reached by adding the edge's drug to src
+
+        drug : numpy.array
+            Drug added along each edge
+
+        edge : numpy.array
+            Index of the edge's synergy parameters (alpha and gamma), or -1 for edges leaving the undrugged state, which have none
+        """
+        states, drugs = np.meshgrid(np.arange(2**n), np.arange(n), indexing='ij')
+        states = states.flatten()
+        drugs = drugs.flatten()
+        valid = (states & (1 << drugs)) == 0
+        src = states[valid]
+        drug = drugs[valid]
+
+        order = np.lexsort((-drug, src))
+        src = src[order]
+        drug = drug[order]
+        dst = src | (1 << drug)
+        edge = np.where(src > 0, np.cumsum(src > 0) - 1, -1)
+
+        for a in (src, dst, drug, edge):
+            a.flags.writeable = False
+        return src, dst, drug, edge
+
     def _build_edge_indices(self, n):
+        # Every state except the undrugged and fully drugged ones has outgoing synergy edges
+        if self._edge_index is not None and len(self._edge_index) == 2**n-2:
+            return
+        src, dst, drug, edge = MuSyC._get_topology(n)
         self._edge_index = dict()
-        count = 0
-        for i in range(1,2**n): 
-            add_d, rem_d = MuSyC._get_neighbors(i,n)
-            if len(add_d) > 0:
-                self._edge_index[i] = dict()
-            for j in add_d:
-                self._edge_index[i][j[1]] = count
-                count += 1
+        for i, j, e in zip(src, dst, edge):
+            if e >= 0:
+                self._edge_index.setdefault(int(i), dict())[int(j)] = int(e)
+
+    def _jacobian_no_gamma(self, doses, *args):
+        n = doses.shape[1]
+        n_gamma = 2**(n-1)*n-n
+        loggammas = [0,]*n_gamma
+        return self._jacobian(doses, *args, *loggammas)[:,:-n_gamma]
+
+    def _jacobian(self, doses, *args):
+        """Jacobian of _model() with respect to its (log-transformed) parameters.
+
+        E is the steady state x of the linear system M(theta)*x = b, weighted by the E parameters. Differentiating gives dx/dtheta = -M^-1*(dM/dtheta)*x, so dE/dtheta = -y*(dM/dtheta)*x, where y solves M^T*y = E_params. The derivatives with respect to every parameter therefore cost just one extra (adjoint) solve.
+        """
+        n = doses.shape[1]
+
+        h_param_offset = 2**n
+        C_param_offset = h_param_offset + n
+        alpha_param_offset = C_param_offset + n
+        gamma_param_offset = alpha_param_offset + 2**(n-1)*n-n
+
+        E_params = np.asarray(args[:2**n])
+        h_params = np.exp(np.asarray(args[h_param_offset:C_param_offset]))
+        C_params = np.exp(np.asarray(args[C_param_offset:alpha_param_offset]))
+        logalpha_params = np.asarray(args[alpha_param_offset:gamma_param_offset])
+        gamma_params = np.exp(np.asarray(args[gamma_param_offset:]))
+
+        x, y = self._solve_steady_state(doses, *args, adjoint=E_params)
+        
+        # The normalization row of M does not depend on any parameters
+        y[:,-1] = 0
+
+        src, dst, drug, param = MuSyC._get_topology(n)
+        synergy_edge = param >= 0
+        h = h_params[drug]
+        logC = np.log(C_params[drug])
+        logalpha = np.where(synergy_edge, logalpha_params[param], 0)
+        gamma = np.where(synergy_edge, gamma_params[param], 1)
+        logr = np.log(self.r)
+
+        d = doses[:,drug]
+        with np.errstate(divide='ignore'):
+            logd = np.where(d > 0, np.log(np.where(d > 0, d, 1)), 0)
+
+        # Forward (drug binding) and reverse rates of every edge
+        forward = np.power(self.r*np.power(np.exp(logalpha)*d, h), gamma)
+        reverse = np.power(self.r*np.power(C_params[drug], h), gamma)
+
+        # An edge from src to dst contributes reverse*(e_src-e_dst)*e_dst^T + forward*(e_dst-e_src)*e_src^T to M
+        G_forward = -forward*(y[:,dst] - y[:,src])*x[:,src]
+        G_reverse = -reverse*(y[:,src] - y[:,dst])*x[:,dst]
+
+        j_logh_edges = G_forward*gamma*h*(logalpha + logd) + G_reverse*gamma*h*logC
+        j_logC_edges = G_reverse*gamma*h
+        j_logalpha_edges = G_forward*gamma*h
+        j_loggamma_edges = G_forward*gamma*(logr + h*(logalpha + logd)) + G_reverse*gamma*(logr + h*logC)
+
+        # Sum edges over the drug they add
+        drug_onehot = (drug[:,None] == np.arange(n)[None,:]).astype(float)
+        j_logh = np.dot(j_logh_edges, drug_onehot)
+        j_logC = np.dot(j_logC_edges, drug_onehot)
+
+        # Synergy edges are stored in the order of their parameters
+        j_logalpha = j_logalpha_edges[:,synergy_edge]
+        j_loggamma = j_loggamma_edges[:,synergy_edge]
+
+        jac = np.hstack([x, j_logh, j_logC, j_logalpha, j_loggamma])
+        jac[np.isnan(jac)] = 0
+        return jac
 
     def _model_no_gamma(self, doses, *args):
         n = doses.shape[1]
@@ -291,87 +402,109 @@ class MuSyC(ParametricHigher):
 
     def _model(self, doses, *args):
         n = doses.shape[1]
-        matrix = np.zeros((doses.shape[0],2**n,2**n))
+        x = self._solve_steady_state(doses, *args)
+        return np.dot(x, np.asarray(args[:2**n]))
+
+    def _solve_steady_state(self, doses, *args, adjoint=None):
+        """Solves for the fraction of cells in each drug state at every dose.
+
+        Doses are processed in chunks of at most max_chunk_elements matrix entries, so memory use is bounded regardless of the number of doses.
+
+        Parameters
+        ----------
+        doses : numpy.ndarray (M x n)
+            Doses of n drugs sampled at M points
+
+        args
+            Model parameters, as passed to _model()
+
+        adjoint : array_like , default=None
+            If given, also solves the transposed system M^T*y = adjoint (used by _jacobian())
+
+        Returns
+        ----------
+        x : numpy.ndarray (M x 2^n)
+            Steady-state occupancy of each state
+
+        y : numpy.ndarray (M x 2^n)
+            Only returned if adjoint is given
+        """
+        n = doses.shape[1]
+        n_samples = doses.shape[0]
+        chunk_size = max(1, self.max_chunk_elements // 4**n)
+
+        # All other rows should multiply to zero. Only the last row goes to 1.
+        b = np.zeros((1, 2**n, 1))
+        b[0,-1,0] = 1
+
+        x = np.empty((n_samples, 2**n))
+        if adjoint is not None:
+            y = np.empty((n_samples, 2**n))
+            adjoint = np.asarray(adjoint, dtype=float).reshape(1, 2**n, 1)
+
+        for start in range(0, n_samples, chunk_size):
+            chunk = slice(start, start+chunk_size)
+            matrix = self._build_matrix(doses[chunk], *args)
+            m = matrix.shape[0]
+            x[chunk] = np.linalg.solve(matrix, np.broadcast_to(b, (m, 2**n, 1)))[:,:,0]
+            if adjoint is not None:
+                y[chunk] = np.linalg.solve(np.swapaxes(matrix, 1, 2), np.broadcast_to(adjoint, (m, 2**n, 1)))[:,:,0]
+
+        if adjoint is not None:
+            return x, y
+        return x
+
+    def _build_matrix(self, doses, *args):
+        """Builds the (M x 2^n x 2^n) transition matrix for each of the M doses. The last row enforces that all states sum to 1.
+        """
+        n = doses.shape[1]
+        n_states = 2**n
+        src, dst, drug, edge = MuSyC._get_topology(n)
+        synergy_edge = edge >= 0
         
         h_param_offset = 2**n
         C_param_offset = h_param_offset + n
         alpha_param_offset = C_param_offset + n
         gamma_param_offset = alpha_param_offset + 2**(n-1)*n-n
 
-        E_params = args[:2**n]
-        logh_params = np.asarray(args[h_param_offset:C_param_offset])
-        logC_params = np.asarray(args[C_param_offset:alpha_param_offset])
-        logalpha_params = np.asarray(args[alpha_param_offset:gamma_param_offset])
-        loggamma_params = np.asarray(args[gamma_param_offset:])
-
-        h_params = np.exp(logh_params)
-        C_params = np.exp(logC_params)
-        alpha_params = np.exp(logalpha_params)
-        gamma_params = np.exp(loggamma_params)
-
-        # First do row 0, which corresponds to U
-        # All edges are non-synergistic
-
-        add_drugs, remove_drugs = MuSyC._get_neighbors(0, n)
-        for drugnum, jidx in add_drugs:
-            d = doses[:,drugnum]
-            h = h_params[drugnum]
-            C = C_params[drugnum]
-            r1r = self.r*np.power(C,h)
-            
-            matrix[:,0,0] -= self.r*np.power(d,h)
-            matrix[:,0,jidx] = r1r
-
-        # Loop over all other states/rows (except the last one)
-        for idx in range(1,2**n-1):
-            row = [0,]*(2**n)
-            add_drugs, remove_drugs = MuSyC._get_neighbors(idx, n)
-            for drugnum, jidx in add_drugs:
-                gamma = 1
-                alpha = 1
-                # If the neighbor is not 0, this is a synergy edge
-                if jidx > 0:
-                    edge_idx = self._edge_index[idx][jidx]
-                    gamma = gamma_params[edge_idx]
-                    alpha = alpha_params[edge_idx]
-                d = doses[:,drugnum]
-                h = h_params[drugnum]
-                C = C_params[drugnum]
-                r1r = self.r*np.power(C,h)
-                
-                # This state gains from reverse transitions out of jidx
-                matrix[:,idx,jidx] += r1r**gamma
-
-                # This state loses from transitions toward jidx
-                matrix[:,idx,idx] -= np.power(self.r*np.power(alpha*d,h),gamma)
-
-            for drugnum, jidx in remove_drugs:
-                gamma = 1
-                alpha = 1
-                # If the neighbor is not 0, this is a synergy edge
-                if jidx > 0:
-                    edge_idx = self._edge_index[jidx][idx]
-                    gamma = gamma_params[edge_idx]
-                    alpha = alpha_params[edge_idx]
-                d = doses[:,drugnum]
-                h = h_params[drugnum]
-                C = C_params[drugnum]
-                r1r = self.r*np.power(C,h)
-                
-                # This state loses from reverse transitions toward jidx
-                matrix[:, idx, idx] -= r1r**gamma
+        h_params = np.exp(np.asarray(args[h_param_offset:C_param_offset]))
+        C_params = np.exp(np.asarray(args[C_param_offset:alpha_param_offset]))
+        alpha_params = np.exp(np.asarray(args[alpha_param_offset:gamma_param_offset]))
+        gamma_params = np.exp(np.asarray(args[gamma_param_offset:]))
+
+        # Edges leaving the undrugged state are non-synergistic
+        h = h_params[drug]
+        alpha = np.where(synergy_edge, alpha_params[edge], 1)
+        gamma = np.where(synergy_edge, gamma_params[edge], 1)
+
+        # Rates of each edge, for each dose. forward adds the drug (src->dst), reverse removes it (dst->src)
+        forward = np.power(self.r*np.power(alpha*doses[:,drug], h), gamma)
+        reverse = np.power(self.r*np.power(C_params[drug], h), gamma)
+
+        matrix = np.zeros((doses.shape[0], n_states, n_states))
+
+        # Each state gains from transitions into it...
+        matrix[:, src, dst] = reverse
+        matrix[:, dst, src] = forward
+
+        # ... and loses from transitions out of it
+        out_rates = np.dot(forward, MuSyC._incidence(n, 0)) + np.dot(reverse, MuSyC._incidence(n, 1))
+        matrix[:, np.arange(n_states), np.arange(n_states)] = -out_rates
 
-                # This state gaines from transitions from jidx
-                matrix[:, idx, jidx] += np.power(self.r*np.power(alpha*d,h),gamma)
-            
         # The final constraint is that U+A1+A2+... = 1
         matrix[:,-1,:]=1
-        matrix_inv = np.linalg.inv(matrix)
+        return matrix
 
-        # All other rows should multiply to zero. Only the last row goes to 1.
-        b = np.zeros(2**n)
-        b[-1]=1
-        return np.dot(np.dot(matrix_inv,b), np.asarray(E_params))
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _incidence(n, endpoint):
+        """(n_edges x 2^n) matrix with a 1 where each edge starts (endpoint=0) or ends (endpoint=1). Computed once per n.
+        """
+        src, dst, drug, edge = MuSyC._get_topology(n)
+        incidence = np.zeros((len(src), 2**n))
+        incidence[np.arange(len(src)), (src, dst)[endpoint]] = 1
+        incidence.flags.writeable = False
+        return incidence
 
     @staticmethod
     def _state_to_drugstr(s, sb=None):
@@ -432,6 +565,7 @@ class MuSyC(ParametricHigher):
             return None
         
         n = self._get_n_drugs_from_params(self.parameters)
+        self._build_edge_indices(n)
         h_param_offset = 2**n
         C_param_offset = h_param_offset + n
         alpha_param_offset = C_param_offset + n
@@ -32,7 +32,11 @@ class DoseDependentHigher(ABC):
         """
         self.synergy = None
         self.d = None
+        self.grid = None
         self.single_models = None
+        self.reference = None
+        self.bootstrap_synergy = None
+        self.metrics = None
 
         self.E_bounds = E_bounds
         self.h_bounds = h_bounds
@@ -43,7 +47,7 @@ class DoseDependentHigher(ABC):
 
         Parameters
         ----------
-        d : numpy.ndarray (M x N)
+        d : numpy.ndarray (M x N) or synergy.utils.dose_tools.DoseGrid
             Doses of N drugs sampled at M points
         
         E : array_like with length equal to M
@@ -60,11 +64,21 @@ class DoseDependentHigher(ABC):
         synergy : array_like
             The synergy calculated at all doses d
         """
+        grid = utils.dose_tools.as_dose_grid(d)
+        d = grid.d
         self.d = d
+        self.grid = grid
+        self.bootstrap_synergy = None
         self.synergy = 0*E
         self.synergy[:] = np.nan
 
-        N = d.shape[1]
+        self._fit_single_models(grid, E, single_models, **kwargs)
+        return self.synergy
+
+    def _fit_single_models(self, grid, E, single_models, **kwargs):
+        """Sets single_models, fitting each drug that was not given pre-fit where all other drugs are at their minimum. See fit().
+        """
+        N = grid.n_drugs
 
         # Initialize single drug models
         
@@ -85,15 +99,219 @@ class DoseDependentHigher(ABC):
             single = self.single_models[i]
             if not single.is_fit():
                 # Mask where all other drugs are minimum (ideally 0)
-                mask = d[:,i]>=0 # This should always be true
-                for j in range(N):
-                    if i==j: continue
-                    mask = mask & (d[:,j]==np.min(d[:,j]))
-                mask = np.where(mask)
-                
-                single.fit(d[mask,i].flatten(), E[mask], **kwargs)
+                mask = grid.single_drug_indices(i)
+                utils.fit_cache.fit(single, grid.d[mask,i].flatten(), E[mask], **kwargs)
 
-        return self.synergy
+    def bootstrap(self, d, E, bootstrap_iterations=100, seed=None, use_jacobian=True, max_iterations=200):
+        """Estimates the uncertainty of the synergy at each dose by resampling replicate wells.
+
+        In each resample, every well's effect is replaced by the effect of a well drawn (with replacement) from the replicates of the same dose combination. Each drug's single-drug model is refit to every resample in one batch (using the single-drug class' fit_many()), and the synergy of every resample is computed in one vectorized pass.
+
+        Wells without replicates keep their measured effect, so only designs with replicates have resampling uncertainty. fit() clears earlier resamples, so call this after fitting.
+
+        Parameters
+        ----------
+        d : numpy.ndarray (M x N) or synergy.utils.dose_tools.DoseGrid
+            Doses of N drugs sampled at M points
+        
+        E : array_like with length equal to M
+            Dose-response at doses d
+
+        bootstrap_iterations : int , default=100
+            Number of resamples
+
+        seed : int , default=None
+            If not None, used as numpy.random.seed(seed) before resampling
+
+        use_jacobian : bool , default=True
+            Passed to the single-drug class' fit_many()
+
+        max_iterations : int , default=200
+            Passed to the single-drug class' fit_many()
+
+        Returns
+        ----------
+        bootstrap_synergy : numpy.ndarray
+            (bootstrap_iterations x M) synergy of every resample, also stored in bootstrap_synergy. See get_synergy_range() for percentile bands.
+        """
+        grid = utils.dose_tools.as_dose_grid(d)
+        E = np.asarray(E, dtype=np.float64)
+
+        if seed is not None: np.random.seed(seed)
+        E_resampled = E[utils.fit_tools.resample_within_groups(grid.replicates, utils.fit_tools.resample_seeds(bootstrap_iterations))]
+        single_models = self._fit_single_resamples(grid, E_resampled, np.arange(len(grid)), use_jacobian, max_iterations)
+
+        self.bootstrap_synergy = self._get_synergy(grid, E_resampled, single_models)[0]
+        return self.bootstrap_synergy
+
+    def _fit_single_resamples(self, grid, E_resampled, samples, use_jacobian, max_iterations):
+        """Fits each drug's single-drug model to every resample in one batch. See bootstrap().
+
+        Parameters
+        ----------
+        E_resampled : numpy.ndarray
+            (n_resamples x len(samples)) resampled effects
+
+        samples : numpy.array
+            Indices of the wells in E_resampled. These must include every well in each drug's single-drug slice.
+
+        Returns
+        ----------
+        single_models : list
+            One stacked model per drug, holding every resample at once (see the single-drug class' _from_fit_many())
+        """
+        resamples = np.broadcast_to(np.arange(E_resampled.shape[0])[:,np.newaxis], E_resampled.shape)
+
+        default_class, expected_superclass = self._get_single_drug_classes()
+        single_models = []
+        for i in range(grid.n_drugs):
+            mask = grid.single_drug_mask(i)[samples]
+            single = utils.sanitize_single_drug_model(None, default_class, expected_superclass=expected_superclass, E0_bounds=self.E_bounds, Emax_bounds=self.E_bounds, h_bounds=self.h_bounds, C_bounds=self.C_bounds)
+            d_single = np.broadcast_to(grid.d[samples[mask],i], E_resampled[:,mask].shape)
+            table = single.fit_many(d_single.flatten(), E_resampled[:,mask].flatten(), resamples[:,mask].flatten(), use_jacobian=use_jacobian, max_iterations=max_iterations)
+            single_models.append(single._from_fit_many(table))
+        return single_models
+
+    def fit_metrics(self, d, E, single_models=None, window=None, bootstrap_iterations=0, confidence_interval=95, seed=None, chunk_size=65536, use_jacobian=True, max_iterations=200, **kwargs):
+        """Fits the model and summarizes its synergy surface, without keeping the surface.
+
+        Single drugs are fit as in fit(). The reference and synergy are then computed a chunk of wells at a time, and each chunk is reduced into running summaries (see synergy.utils.surface_metrics.SurfaceMetrics) before the next is computed. Neither synergy nor any reference is stored, so large N-drug grids never hold per-well intermediates for the whole grid at once.
+
+        Parameters
+        ----------
+        d : numpy.ndarray (M x N) or synergy.utils.dose_tools.DoseGrid
+            Doses of N drugs sampled at M points
+        
+        E : array_like with length equal to M
+            Dose-response at doses d
+
+        single_models : class, array_like with length equal to N
+            See fit()
+
+        window : array_like , default=None
+            (low, high) dose bounds for each drug, within which max_synergy and max_antagonism are taken. If None, every combination well is used.
+
+        bootstrap_iterations : int , default=0
+            If greater than 0, replicate wells are resampled this many times (see bootstrap()) to count significantly synergistic wells. Single drugs are refit to every resample in one batch, and each chunk of wells is scored for every resample.
+
+        confidence_interval : int, float, default=95
+            % confidence interval a well's synergy must lie within to be significant
+
+        seed : int , default=None
+            If not None, used as numpy.random.seed(seed) before resampling. The same seed draws the same resamples as bootstrap(), whatever the chunk_size.
+
+        chunk_size : int , default=65536
+            Number of wells scored at once. With bootstrap_iterations > 0, this is split among the resamples.
+
+        use_jacobian : bool , default=True
+            Passed to the single-drug fits, including the batched refits of every resample (see bootstrap())
+
+        max_iterations : int , default=200
+            Passed to the single-drug class' fit_many() when refitting resamples
+
+        kwargs
+            kwargs to pass to Hill.fit() (or whichever single-drug model is used)
+
+        Returns
+        ----------
+        metrics : dict
+            Summaries of the synergy surface (see synergy.utils.surface_metrics.SurfaceMetrics.result()), also stored in metrics
+        """
+        grid = utils.dose_tools.as_dose_grid(d)
+        E = np.asarray(E, dtype=np.float64)
+        self.d = grid.d
+        self.grid = grid
+        self.synergy = None
+        self.reference = None
+        self.bootstrap_synergy = None
+        self._fit_single_models(grid, E, single_models, use_jacobian=use_jacobian, **kwargs)
+
+        null, sign = self._get_synergy_direction()
+        metrics = utils.surface_metrics.SurfaceMetrics(grid, null=null, sign=sign, window=window)
+
+        if bootstrap_iterations > 0:
+            # Seeds are drawn as in bootstrap(), and draws are indexed by well, so the single-drug refits and every chunk share each resample
+            if seed is not None: np.random.seed(seed)
+            seeds = utils.fit_tools.resample_seeds(bootstrap_iterations)
+            samples = np.where(grid.any_single_drug_mask())[0]
+            E_resampled = E[utils.fit_tools.resample_within_groups(grid.replicates, seeds, samples)]
+            resampled_models = self._fit_single_resamples(grid, E_resampled, samples, use_jacobian, max_iterations)
+            chunk_size = max(1, chunk_size // bootstrap_iterations)
+
+        for start in range(0, len(grid), chunk_size):
+            rows = slice(start, start+chunk_size)
+            chunk = grid[rows]
+            synergy, _ = self._get_synergy(chunk, E[rows], self.single_models)
+
+            lower, upper = None, None
+            if bootstrap_iterations > 0:
+                E_resampled = E[utils.fit_tools.resample_within_groups(grid.replicates, seeds, np.arange(start, start+len(chunk)))]
+                lower, upper = utils.fit_tools.percentile_bands(self._get_synergy(chunk, E_resampled, resampled_models)[0], confidence_interval)
+
+            metrics.update(rows, synergy, lower, upper)
+
+        self.metrics = metrics.result()
+        return self.metrics
+
+    def _get_synergy_direction(self):
+        """
+        Returns
+        -------
+        null : float
+            Synergy of an additive combination
+
+        sign : int
+            1 if larger synergy values are more synergistic, -1 if smaller values are
+        """
+        return 0, 1
+
+    def get_synergy_range(self, confidence_interval=95):
+        """Returns the lower and upper percentile bands of the synergy at each dose, from the resamples drawn by bootstrap().
+
+        Resamples in which the synergy is undefined (nan) at a dose are ignored at that dose.
+
+        Parameters
+        ----------
+        confidence_interval : int, float, default=95
+            % confidence interval to return. Must be between 0 and 100.
+
+        Returns
+        ----------
+        synergy_range : numpy.ndarray
+            (2 x M) lower and upper bounds of the synergy at each dose, or None if bootstrap() has not been run
+        """
+        if self.bootstrap_synergy is None:
+            return None
+        if confidence_interval < 0 or confidence_interval > 100:
+            return None
+        return utils.fit_tools.percentile_bands(self.bootstrap_synergy, confidence_interval)
+
+    @abstractmethod
+    def _get_synergy(self, grid, E, single_models):
+        """Calculates synergy from fit single-drug models.
+
+        E may be an (n_resamples x M) array, with single-drug models holding one set of parameters per resample (see the single-drug class' _from_fit_many()), in which case the synergy of every resample is returned at once.
+
+        Parameters
+        ----------
+        grid : synergy.utils.dose_tools.DoseGrid
+            The doses
+
+        E : array_like
+            Dose-response at doses grid.d
+
+        single_models : array_like with length equal to N
+            Fit single-drug models
+
+        Returns
+        ----------
+        synergy : array_like
+            The synergy calculated at all doses
+
+        reference : array_like
+            The reference (null) effect at all doses, or None if the model has none
+        """
+        pass
 
     @abstractmethod
     def _get_single_drug_classes(self):
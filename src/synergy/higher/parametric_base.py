@@ -20,13 +20,15 @@ from scipy.stats import norm
 
 from .. import utils
 from ..utils import plots
+from ..utils.serialization import SerializableModel
 
-class ParametricHigher(ABC):
+class ParametricHigher(SerializableModel, ABC):
     """The abstract base class for higher dimensional (3+ drug) parametric synergy models.
     """
     def __init__(self, parameters=None):
         self.bounds = None
         self.fit_function = None
+        self.jacobian_function = None
         
         self.converged = False
         self.parameters = parameters
@@ -37,22 +39,25 @@ class ParametricHigher(ABC):
         self.bic = None
         self.bootstrap_parameters = None
 
-    def _internal_fit(self, d, E, **kwargs):
+    def _internal_fit(self, d, E, use_jacobian, **kwargs):
         """Internal method to fit the model to data (d,E)
         """
         try:
-            popt, pcov = curve_fit(self.fit_function, d, E, bounds=self.bounds, **kwargs)
+            if use_jacobian and self.jacobian_function is not None:
+                popt, pcov = curve_fit(self.fit_function, d, E, bounds=self.bounds, jac=self.jacobian_function, **kwargs)
+            else:
+                popt, pcov = curve_fit(self.fit_function, d, E, bounds=self.bounds, **kwargs)
             return self._transform_params_from_fit(popt)
         except Exception as err:
             print("Exception during single drug response fit: %s"%err)
             return None
 
-    def fit(self, d, E, bootstrap_iterations=0, **kwargs):
+    def fit(self, d, E, bootstrap_iterations=0, use_jacobian=True, **kwargs):
         """Fits the model to data
 
         Parameters
         ----------
-        d : numpy.ndarray (M x N)
+        d : numpy.ndarray (M x N) or synergy.utils.dose_tools.DoseGrid
             Doses of N drugs sampled at M points
         
         E : array_like
@@ -61,21 +66,25 @@ class ParametricHigher(ABC):
         bootstrap_iterations : int , default=0
             The number of boostrap resample iterations performed to estimate parameter confidence intervals.
 
+        use_jacobian : bool , default=True
+            If True, and the model implements a Jacobian, it is used to guide the fit
+
         kwargs
             kwargs to pass to scipy.optimize.curve_fit()
         """
-        d = np.asarray(d)
+        grid = utils.dose_tools.as_dose_grid(d)
+        d = grid.d
         E = np.asarray(E)
 
         if 'p0' in kwargs:
             p0 = list(kwargs.get('p0'))
         else:
             p0 = None
-        p0 = self._get_initial_guess(d, E, p0=p0)
+        p0 = self._get_initial_guess(grid, E, p0=p0)
         kwargs['p0'] = p0
 
         with np.errstate(divide='ignore', invalid='ignore'):
-            popt = self._internal_fit(d, E, **kwargs)
+            popt = self._internal_fit(d, E, use_jacobian, **kwargs)
         
         if popt is None:
             self.converged = False
@@ -89,10 +98,10 @@ class ParametricHigher(ABC):
             if (n_samples - n_parameters - 1 > 0):
                 self._score(d, E)
                 kwargs['p0'] = self._transform_params_to_fit(popt)
-                self._bootstrap_resample(d, E, bootstrap_iterations, **kwargs)
+                self._bootstrap_resample(d, E, use_jacobian, bootstrap_iterations, **kwargs)
             
 
-    def _bootstrap_resample(self, d, E, bootstrap_iterations, **kwargs):
+    def _bootstrap_resample(self, d, E, use_jacobian, bootstrap_iterations, **kwargs):
         """Internal function to identify confidence intervals for parameters
         """
 
@@ -116,7 +125,7 @@ class ParametricHigher(ABC):
 
             # Fit noisy data
             with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
-                popt1 = self._internal_fit(d, E_iteration, **kwargs)
+                popt1 = self._internal_fit(d, E_iteration, use_jacobian, **kwargs)
             if popt1 is not None:
                 bootstrap_parameters.append(popt1)
 
@@ -183,6 +192,8 @@ class ParametricHigher(ABC):
     @abstractmethod
     def _get_initial_guess(self, d, E, p0=None):
         """Internal method to format and/or come up with initial guess for parameters
+
+        d is given as a synergy.utils.dose_tools.DoseGrid
         """
         pass
 
@@ -205,7 +216,7 @@ class ParametricHigher(ABC):
 
         Parameters
         ----------
-        d : numpy.ndarray
+        d : numpy.ndarray or synergy.utils.dose_tools.DoseGrid
             Doses, in an M x N ndarray, where M is the number of samples, and N is the number of drugs.
 
         Returns
@@ -288,7 +299,19 @@ class ParametricHigher(ABC):
     def plotly_isosurfaces(self, d, drug_axes=[0,1,2], other_drug_slices=None, cmap="YlGnBu", **kwargs):
         if not self._is_parameterized():
             return None
-        
+
+        if isinstance(d, utils.dose_tools.LazyGrid):
+            # Only build the slice being plotted
+            levels = []
+            for i, doses in enumerate(d.doses):
+                keep = np.ones(len(doses), dtype=bool)
+                if i not in drug_axes:
+                    keep = doses == (np.min(doses) if other_drug_slices is None else other_drug_slices[i])
+                if i == 0:
+                    keep = keep & (doses > 0)
+                levels.append(keep)
+            d = d.subgrid(levels)
+
         d = np.asarray(d)
         mask = d[:,0]>0
         n = d.shape[1]
@@ -16,6 +16,7 @@
 import numpy as np
 
 from ..single import Hill
+from .. import utils
 from .nonparametric_base import DoseDependentHigher
 
 class Schindler(DoseDependentHigher):
@@ -32,53 +33,46 @@ class Schindler(DoseDependentHigher):
     """
     
     def fit(self, d, E, single_models=None, **kwargs):
-        d = np.asarray(d)
+        grid = utils.dose_tools.as_dose_grid(d)
         E = np.asarray(E)
-        n = d.shape[1]
-        super().fit(d, E, single_models=single_models, **kwargs)
-        single_models=self.single_models
+        super().fit(grid, E, single_models=single_models, **kwargs)
+        self.synergy, self.reference = self._get_synergy(grid, E, self.single_models)
+        return self.synergy
+
+    def _get_synergy(self, grid, E, single_models):
         E0 = 0
-        
-        # Fit single drugs
         for single in single_models:
-            E0 += single.E0 / n
+            E0 = E0 + single.E0 / len(single_models)
 
         with np.errstate(divide='ignore', invalid='ignore'):
             # Schindler assumes drugs start at 0 and go up to Emax
             uE = E0 - E
-            uE_schindler = self._model(d, E0)
-            self.synergy = uE - uE_schindler
+            uE_schindler = self._model(grid.d, E0, single_models)
+            synergy = uE - uE_schindler
 
         # Ensure all single-drug Schindler scores are 0
-        for i in range(n):
-                # Mask where all other drugs are minimum (ideally 0)
-                mask = d[:,i]>=0 # This should always be true
-                for j in range(n):
-                    if i==j: continue
-                    mask = mask & (d[:,j]==np.min(d[:,j]))
-                mask = np.where(mask)
-                self.synergy[mask] = 0
+        synergy[..., grid.any_single_drug_mask()] = 0
+        return synergy, E0 - uE_schindler
 
-        return self.synergy
-
-
-    def _model(self, d, E0):
+    def _model(self, d, E0, single_models):
         """
         From "Theory of synergistic effects: Hill-type response surfaces as 'null-interaction' models for mixtures" - Michael Schindler
         
         E - u_hill = 0 : Additive
         E - u_hill > 0 : Synergistic
         E - u_hill < 0 : Antagonistic
+
+        The single-drug parameters may be (n_resamples x 1) arrays (see bootstrap()), in which case one surface is returned per resample.
         """
-        h = np.asarray([model.h for model in self.single_models])
-        C = np.asarray([model.C for model in self.single_models])
-        Emax = E0 - np.asarray([model.Emax for model in self.single_models])
+        h = np.stack(np.broadcast_arrays(*[model.h for model in single_models]), axis=-1)
+        C = np.stack(np.broadcast_arrays(*[model.C for model in single_models]), axis=-1)
+        Emax = np.asarray(E0)[...,np.newaxis] - np.stack(np.broadcast_arrays(*[model.Emax for model in single_models]), axis=-1)
 
         m = d/C
         
-        y = (h*m).sum(axis=1) / m.sum(axis=1)
-        u_max = (Emax*m).sum(axis=1) / m.sum(axis=1)
-        power = np.power(m.sum(axis=1), y)
+        y = (h*m).sum(axis=-1) / m.sum(axis=-1)
+        u_max = (Emax*m).sum(axis=-1) / m.sum(axis=-1)
+        power = np.power(m.sum(axis=-1), y)
         
         return u_max * power / (1. + power)
 
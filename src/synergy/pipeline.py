@@ -0,0 +1,149 @@
+#    Copyright (C) 2020 David J. Wooten
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import csv
+import os
+import warnings
+
+from . import utils
+from .combination.parametric_base import ParametricModel
+
+OUTPUT_COLUMNS = ("block_id", "model", "quantity", "value", "lower", "upper")
+
+SCORES = ("converged", "sum_of_squares_residuals", "r_squared", "aic", "bic")
+
+def process_blocks(blocks, models, output, checkpoint=None, confidence_interval=95):
+    """Fits a list of models to every block (e.g., drug combination) of a screen, writing results as each block finishes, so that memory use does not grow with the screen and an interrupted run can be resumed.
+
+    Results are appended to output as long-format CSV rows (block_id, model, quantity, value, lower, upper). Parametric models (e.g., MuSyC) write one row per parameter (with lower and upper bounds if bootstrapped) and per fit score. Dose-dependent models (e.g., Bliss) write the summaries of their synergy surface from fit_metrics(). If a model fails on a block, a warning is issued and a single "error" row holding the exception message is written instead.
+
+    After each block, its id and the size of output are appended to the checkpoint file. Calling process_blocks() again with the same output and checkpoint skips every completed block, and drops any rows written after the last checkpoint (e.g., from a block that was interrupted).
+
+    Parameters
+    ----------
+    blocks : str, synergy.utils.screen.Screen, or iterable
+        A SynergyFinder CSV file (read one block at a time, see synergy.utils.data_exchange.from_synergyfinder()), a two-drug Screen, or an iterable of (block_id, d1, d2, E)
+
+    models : list
+        Model classes (or other callables returning an unfit model, e.g., functools.partial(MuSyC, E0_bounds=(0,1))) to fit to each block. An entry may also be a (callable, kwargs) tuple, in which case kwargs are passed to the model's fit() (or fit_metrics()).
+
+    output : str
+        CSV file the results are written to
+
+    checkpoint : str , default=None
+        File recording completed blocks. Defaults to output + ".checkpoint".
+
+    confidence_interval : int, float, default=95
+        % confidence interval of bootstrapped parameters
+
+    Returns
+    ----------
+    n_blocks : int
+        Number of blocks processed by this call (not counting blocks skipped as already completed)
+    """
+    if checkpoint is None:
+        checkpoint = output + ".checkpoint"
+    models = [entry if isinstance(entry, tuple) else (entry, dict()) for entry in models]
+
+    completed, offset = _read_checkpoint(checkpoint)
+    if offset is None:
+        # No block has been completed: start over
+        with open(output, "w", newline="") as f:
+            csv.writer(f).writerow(OUTPUT_COLUMNS)
+            offset = f.tell()
+        with open(checkpoint, "w"):
+            pass
+    with open(output, "r+b") as f:
+        f.truncate(offset)
+
+    n_blocks = 0
+    with open(output, "a", newline="") as out, open(checkpoint, "a", newline="") as done:
+        writer = csv.writer(out)
+        for block_id, d1, d2, E in _iter_blocks(blocks):
+            block_id = str(block_id)
+            if block_id in completed:
+                continue
+
+            for factory, kwargs in models:
+                model = factory()
+                for row in _fit_rows(model, d1, d2, E, kwargs, confidence_interval):
+                    writer.writerow((block_id, type(model).__name__) + row)
+
+            # Results must be on disk before the checkpoint says they are
+            out.flush()
+            os.fsync(out.fileno())
+            csv.writer(done).writerow((block_id, out.tell()))
+            done.flush()
+            os.fsync(done.fileno())
+
+            completed.add(block_id)
+            n_blocks += 1
+    return n_blocks
+
+def _iter_blocks(blocks):
+    """Yields (block_id, d1, d2, E) from any input accepted by process_blocks()
+    """
+    if isinstance(blocks, str):
+        for block_id, _, _, d1, d2, E in utils.data_exchange.from_synergyfinder(blocks):
+            yield block_id, d1, d2, E
+    elif isinstance(blocks, utils.screen.Screen):
+        for block_id, d, E in blocks:
+            yield block_id, d[:,0], d[:,1], E
+    else:
+        yield from blocks
+
+def _fit_rows(model, d1, d2, E, kwargs, confidence_interval):
+    """Fits model to one block, and returns its (quantity, value, lower, upper) rows
+    """
+    rows = []
+    try:
+        if isinstance(model, ParametricModel):
+            model.fit(d1, d2, E, **kwargs)
+            parameters = model.get_parameters(confidence_interval=confidence_interval)
+            for name, entry in (parameters or dict()).items():
+                lower, upper = entry[1] if len(entry) > 1 else ("", "")
+                rows.append((name, entry[0], lower, upper))
+            for name in SCORES:
+                rows.append((name, _or_empty(getattr(model, name)), "", ""))
+        else:
+            metrics = model.fit_metrics(d1, d2, E, confidence_interval=confidence_interval, **kwargs)
+            for name, value in metrics.items():
+                rows.append((name, _or_empty(value), "", ""))
+    except Exception as err:
+        warnings.warn("Exception fitting %s: %s"%(type(model).__name__, err))
+        rows = [("error", str(err), "", "")]
+    return rows
+
+def _or_empty(value):
+    return "" if value is None else value
+
+def _read_checkpoint(checkpoint):
+    """Returns the completed block ids and the size output had after the last of them (None if no block was completed). A partially written last line is discarded.
+    """
+    if not os.path.exists(checkpoint):
+        return set(), None
+    with open(checkpoint, newline="") as f:
+        text = f.read()
+    if not text.endswith("\n"):
+        text = text[:text.rfind("\n")+1]
+        with open(checkpoint, "w", newline="") as f:
+            f.write(text)
+
+    completed = set()
+    offset = None
+    for block_id, size in csv.reader(text.splitlines()):
+        completed.add(block_id)
+        offset = int(size)
+    return completed, offset
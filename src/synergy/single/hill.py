@@ -74,6 +74,9 @@ class Hill(ParameterizedModel1D):
 
         self.bounds = tuple(zip(self.E0_bounds, self.Emax_bounds, self.logh_bounds, self.logC_bounds))
 
+        # Names of the parameters returned by get_parameters(), used to label fit_many() results
+        self._parameter_names = ("E0", "Emax", "h", "C")
+
     def E(self, d):
         """Evaluate this model at dose d. If the model is not parameterized, returns 0.
 
@@ -170,6 +173,87 @@ class Hill(ParameterizedModel1D):
         utils.sanitize_initial_guess(p0, self.bounds)
         return p0
 
+    def fit_many(self, d, E, group_ids, use_jacobian=True, max_iterations=200):
+        """Fits this model independently to many dose-response curves (e.g., one per plate) at once.
+
+        All curves are fit simultaneously with a vectorized, bounded Levenberg-Marquardt solver (synergy.utils.fit_tools.curve_fit_many), using the same initial guess as fit(). This model's bounds are used for every curve. The model's own parameters are not changed.
+
+        Parameters
+        ----------
+        d : array_like
+            Doses, for all curves
+
+        E : array_like
+            Effects measured at doses d, for all curves
+
+        group_ids : array_like
+            Label identifying which curve each sample belongs to
+
+        use_jacobian : bool , default=True
+            If True, the analytic Jacobian is used. Otherwise finite differences are used.
+
+        max_iterations : int , default=200
+            Maximum number of Levenberg-Marquardt iterations
+
+        Returns
+        ----------
+        table : dict
+            Column arrays, one row per curve: "group", each parameter returned by get_parameters() (e.g., "E0", "Emax", "h", and "C"), "converged", "sum_of_squares_residuals", and "r_squared".
+        """
+        d = np.asarray(d, dtype=np.float64)
+        E = np.asarray(E, dtype=np.float64)
+
+        groups, order, gidx, offsets = utils.fit_tools.group_indices(group_ids)
+        d = d[order]
+        E = E[order]
+
+        p0 = self._get_initial_guess_many(d, E, gidx, offsets)
+        jac = self.jacobian_function if use_jacobian else None
+        with np.errstate(divide='ignore', invalid='ignore'):
+            _, popt, converged, ssr = utils.fit_tools.curve_fit_many(self.fit_function, d, E, gidx, p0, bounds=self.bounds, jac=jac, max_iterations=max_iterations)
+
+        E_mean = np.add.reduceat(E, offsets) / np.bincount(gidx)
+        ss_tot = np.add.reduceat((E - E_mean[gidx])**2, offsets)
+
+        table = dict()
+        table['group'] = groups
+        for name, values in zip(self._parameter_names, self._transform_params_from_fit(popt.T)):
+            table[name] = np.asarray(values)
+        table['converged'] = converged
+        table['sum_of_squares_residuals'] = ssr
+        with np.errstate(divide='ignore', invalid='ignore'):
+            table['r_squared'] = 1 - ssr/ss_tot
+        return table
+
+    def _from_fit_many(self, table):
+        """Makes this model hold every curve in a fit_many() table at once. Each parameter becomes an (n_groups x 1) array, so E() and E_inv() broadcast across curves (e.g., taking an (n_groups x M) array of doses).
+
+        Returns
+        ----------
+        self : Hill
+        """
+        self._set_parameters([np.asarray(table[name], dtype=np.float64).reshape(-1,1) for name in self._parameter_names])
+        self._fit = True
+        self.converged = True
+        return self
+
+    def _get_initial_guess_many(self, d, E, gidx, offsets):
+        """Batched equivalent of _get_initial_guess() for group-sorted data. Returns an (n_groups x n_parameters) array of initial guesses in the fit scale.
+        """
+        # Same guess as _get_initial_guess(): E0=max(E), Emax=min(E), h=1, C=median(d)
+        C_guess = self._median_dose_many(d, gidx, offsets)
+        n_groups = len(offsets)
+        with np.errstate(divide='ignore'):
+            p0 = np.column_stack([np.maximum.reduceat(E, offsets), np.minimum.reduceat(E, offsets), np.zeros(n_groups), np.log(C_guess)])
+        lower, upper = np.asarray(self.bounds, dtype=np.float64)
+        return np.clip(p0, lower, upper)
+
+    def _median_dose_many(self, d, gidx, offsets):
+        """Median dose of each group, falling back to the maximum dose where the median is 0
+        """
+        C_guess = utils.fit_tools.group_median(d, gidx, len(offsets))
+        return np.where(C_guess > 0, C_guess, np.maximum.reduceat(d, offsets))
+
     def _transform_params_from_fit(self, params):
         return params[0], params[1], np.exp(params[2]), np.exp(params[3])
 
@@ -219,6 +303,8 @@ class Hill_2P(Hill):
 
         self.bounds = tuple(zip(self.logh_bounds, self.logC_bounds))
 
+        self._parameter_names = ("h", "C")
+
     def _model_jacobian(self, d, logh, logC):
         dh = d**(np.exp(logh))
         Ch = (np.exp(logC))**(np.exp(logh))
@@ -244,6 +330,14 @@ class Hill_2P(Hill):
         
         return p0
 
+    def _get_initial_guess_many(self, d, E, gidx, offsets):
+        # Same guess as _get_initial_guess(): h=1, C=median(d)
+        C_guess = self._median_dose_many(d, gidx, offsets)
+        with np.errstate(divide='ignore'):
+            p0 = np.column_stack([np.zeros(len(offsets)), np.log(C_guess)])
+        lower, upper = np.asarray(self.bounds, dtype=np.float64)
+        return np.clip(p0, lower, upper)
+
     def create_fit(d, E, E0=1, Emax=0, h_bounds=(0,np.inf), C_bounds=(0,np.inf), **kwargs):
         drug = Hill_2P(E0=E0, Emax=Emax, h_bounds=h_bounds, C_bounds=C_bounds)
         drug.fit(d, E, **kwargs)
@@ -304,6 +398,65 @@ class Hill_CI(Hill_2P):
         
         return (h, C)
 
+    def fit_many(self, d, E, group_ids, **kwargs):
+        """Fits many dose-response curves, each with the median-effect linearization used by fit().
+
+        Because the linearized fit is a linear regression, every curve is fit at once in closed form (see synergy.utils.fit_tools.linregress_many()).
+
+        Parameters
+        ----------
+        d : array_like
+            Doses, for all curves
+
+        E : array_like
+            Effects measured at doses d, for all curves
+
+        group_ids : array_like
+            Label identifying which curve each sample belongs to
+
+        Returns
+        ----------
+        table : dict
+            Column arrays, one row per curve: "group", "h", "C", "converged", "sum_of_squares_residuals", and "r_squared"
+        """
+        d = np.asarray(d, dtype=np.float64)
+        E = np.asarray(E, dtype=np.float64)
+
+        groups, gidx = np.unique(np.asarray(group_ids), return_inverse=True)
+        gidx = gidx.reshape(-1)
+        h, C = self._median_effect_fit_many(d, E, gidx, len(groups))
+
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            residuals = E - self._model(d, 1., 0., h[gidx], C[gidx])
+            ssr = np.bincount(gidx, weights=residuals**2, minlength=len(groups))
+            counts = np.bincount(gidx, minlength=len(groups))
+            E_mean = np.bincount(gidx, weights=E, minlength=len(groups)) / counts
+            ss_tot = np.bincount(gidx, weights=(E - E_mean[gidx])**2, minlength=len(groups))
+
+            table = dict()
+            table['group'] = groups
+            table['h'] = h
+            table['C'] = C
+            table['converged'] = np.isfinite(h) & np.isfinite(C)
+            table['sum_of_squares_residuals'] = np.where(table['converged'], ssr, np.nan)
+            table['r_squared'] = 1 - table['sum_of_squares_residuals']/ss_tot
+        return table
+
+    def _median_effect_fit_many(self, d, E, gidx, n_groups):
+        """Fits the median-effect line log(fA/fU) = h*log(d) - h*log(C) of every group in one pass, using the same points as _internal_fit()
+
+        Returns
+        ----------
+        h, C : numpy.array
+            Parameters of each group. Groups without enough usable points get nan.
+        """
+        mask = (E < 1) & (E > 0) & (d > 0)
+        E = E[mask]
+        with np.errstate(divide='ignore'):
+            slope, intercept = utils.fit_tools.linregress_many(np.log(d[mask]), np.log((1-E)/E), gidx[mask], n_groups)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return slope, np.exp(-intercept / slope)
+
     def create_fit(d, E):
         drug = Hill_CI()
         drug.fit(d, E)
@@ -348,9 +501,28 @@ class Hill_CI(Hill_2P):
             plt.show()
 
     def _bootstrap_resample(self, d, E, use_jacobian, bootstrap_iterations, confidence_interval, **kwargs):
-        """Bootstrap resampling is not yet implemented for CI
+        """Identifies confidence intervals for h and C by refitting noisy copies of the fit curve, as for other single-drug models.
+
+        Every iteration is refit at once with the closed-form median-effect fit (see fit_many()).
         """
-        pass
+        if not self._is_parameterized(): return
+        if not self.converged: return
+
+        n_data_points = len(E)
+        n_parameters = len(self.get_parameters())
+
+        sigma_residuals = np.sqrt(self.sum_of_squares_residuals / (n_data_points - n_parameters))
+
+        # Add random noise to model prediction, one row per iteration
+        E_iterations = self.E(d) + np.random.normal(loc=0, scale=sigma_residuals, size=(bootstrap_iterations, n_data_points))
+        iterations = np.repeat(np.arange(bootstrap_iterations), n_data_points)
+        h, C = self._median_effect_fit_many(np.tile(d, bootstrap_iterations), E_iterations.flatten(), iterations, bootstrap_iterations)
+
+        converged = np.isfinite(h) & np.isfinite(C)
+        if converged.any():
+            self.bootstrap_parameters = np.column_stack([h[converged], C[converged]])
+        else:
+            self.bootstrap_parameters = None
 
     def __repr__(self):
         if not self._is_parameterized(): return "Hill_CI()"
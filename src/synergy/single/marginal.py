@@ -15,13 +15,15 @@
 
 import numpy as np
 
+from .. import utils
+
 class MarginalLinear:
     """Some drugs' dose response may not follow some known parametric equation. In these cases, MarginalLinear() fits a piecewise linear model mapping log(d) -> E
 
     Parameters
     ----------
     aggregation_function : function, default=np.mean
-        If d contains repeated values (e.g., experimental replicates using the same dose many times), E at these repeated doses will be averaged using aggregation_function(E[d==X])
+        If d contains repeated values (e.g., experimental replicates using the same dose many times), E at these repeated doses will be averaged using aggregation_function(E[d==X]). np.mean, np.median, np.sum, np.min, and np.max are vectorized, but any function mapping an array to a scalar (e.g., a trimmed mean) may be used.
     """
 
     # NOTE on __init__() and fit(): **kwargs is only present to avoid errors
@@ -34,6 +36,9 @@ class MarginalLinear:
         self._aggregation_function = aggregation_function
         self._fit = False
 
+        # Number of doses in each row when this model holds many curves (see fit_many())
+        self._n_doses = None
+
     def fit(self, d, E, **kwargs):
         """Calls __init__(d, E, aggregation_function)
 
@@ -46,32 +51,123 @@ class MarginalLinear:
             Array of effects measured at doses d
         """
         self._fit  = True
-        if (len(d) > len(np.unique(d))):
-            self._d = []
-            self._E = []
-
-            # Given repeated dose measurements, average E for each
-            for val in np.unique(d):
-                self._d.append(val)
-                self._E.append(self._aggregation_function(E[d==val]))
+        d = np.asarray(d, dtype=np.float64).reshape(-1)
+        E = np.asarray(E, dtype=np.float64).reshape(-1)
 
-            self._d = np.asarray(self._d)
-            self._E = np.asarray(self._E)
-
-        else:
-            self._d = np.array(d,copy=True)
-            self._E = np.array(E,copy=True)
+        # Sort doses and E, then aggregate E over repeated doses
+        sorted_indices = np.argsort(d, kind='stable')
+        d = d[sorted_indices]
+        E = E[sorted_indices]
+        self._d, offsets = np.unique(d, return_index=True)
+        self._E = utils.fit_tools.reduce_groups(E, offsets, self._aggregation_function)
+        self._n_doses = None
 
         # Replace 0 doses with the minimum float value
         self._d[self._d==0] = np.nextafter(0,1)
 
-        # Sort doses and E
-        sorted_indices = np.argsort(self._d)
-        self._d = self._d[sorted_indices]
-        self._E = self._E[sorted_indices]
-        
         # Get log-transformed dose (used for interpolation)
         self._logd = np.log(self._d)
+        self._build_tables()
+
+    def fit_many(self, d, E, group_ids, **kwargs):
+        """Fits a separate marginal curve to each of many groups (e.g., one per plate) at once, using this model's aggregation_function.
+
+        Parameters
+        ----------
+        d : array_like
+            Doses, for all curves
+
+        E : array_like
+            Effects measured at doses d, for all curves
+
+        group_ids : array_like
+            Label identifying which curve each sample belongs to
+
+        Returns
+        ----------
+        table : dict
+            "group" (sorted unique group_ids), "d" and "E" ((n_groups x max_doses) padded tables of each curve's unique doses and aggregated effects), and "n_doses" (the number of valid entries in each row). See _from_fit_many().
+        """
+        d = np.asarray(d, dtype=np.float64)
+        E = np.asarray(E, dtype=np.float64)
+        groups, codes = np.unique(np.asarray(group_ids), return_inverse=True)
+        codes = codes.reshape(-1)
+        n_groups = len(groups)
+
+        # Sort by curve, then by dose, and aggregate each (curve, dose) pair
+        order = np.lexsort((d, codes))
+        d = d[order]
+        E = E[order]
+        codes = codes[order]
+        new_pair = np.ones(len(d), dtype=bool)
+        new_pair[1:] = (codes[1:] != codes[:-1]) | (d[1:] != d[:-1])
+        pair_offsets = np.where(new_pair)[0]
+
+        E_pairs = utils.fit_tools.reduce_groups(E, pair_offsets, self._aggregation_function)
+        d_pairs = d[pair_offsets]
+        g_pairs = codes[pair_offsets]
+
+        n_doses = np.bincount(g_pairs, minlength=n_groups)
+        row_offsets = np.searchsorted(g_pairs, np.arange(n_groups))
+        d_table, _ = utils.fit_tools.pad_groups(d_pairs, g_pairs, row_offsets, n_doses)
+        E_table, _ = utils.fit_tools.pad_groups(E_pairs, g_pairs, row_offsets, n_doses)
+
+        table = dict()
+        table['group'] = groups
+        table['d'] = d_table
+        table['E'] = E_table
+        table['n_doses'] = n_doses
+        return table
+
+    def _from_fit_many(self, table):
+        """Makes this model hold every curve in a fit_many() table at once. E() and E_inv() then evaluate each curve on its own row: they take and return (n_groups x M) arrays.
+
+        Returns
+        ----------
+        self : MarginalLinear
+        """
+        self._fit = True
+        self._d = np.array(table['d'], dtype=np.float64, copy=True)
+        self._E = np.array(table['E'], dtype=np.float64, copy=True)
+        self._n_doses = np.asarray(table['n_doses'])
+
+        self._d[self._d==0] = np.nextafter(0,1)
+        self._logd = np.log(self._d)
+        self._build_tables()
+        return self
+
+    def _build_tables(self):
+        """Precomputes the dose range used by E(), and the E-sorted table used by E_inv()
+        """
+        if self._n_doses is None:
+            self._logd_min = self._logd[0]
+            self._logd_max = self._logd[-1]
+            self._invertible = self._is_invertible()
+
+            # np.interp() requires increasing x-coordinates
+            if self._invertible and self._E[0] > self._E[-1]:
+                self._E_table, self._logd_by_E = self._E[::-1], self._logd[::-1]
+            else:
+                self._E_table, self._logd_by_E = self._E, self._logd
+            self._E_min = np.min(self._E)
+            self._E_max = np.max(self._E)
+            return
+
+        n_rows, width = self._E.shape
+        valid = np.arange(width)[np.newaxis,:] < self._n_doses[:,np.newaxis]
+        valid_diff = valid[:,1:] & valid[:,:-1]
+        diffs = np.diff(self._E, axis=1)
+        increasing = np.all((diffs > 0) | ~valid_diff, axis=1)
+        decreasing = np.all((diffs < 0) | ~valid_diff, axis=1)
+        self._invertible = (self._n_doses > 1) & (increasing | decreasing)
+
+        # Reverse the valid part of each decreasing row, so every E table is increasing
+        column = np.arange(width)[np.newaxis,:]
+        reverse = (self._invertible & ~increasing)[:,np.newaxis]
+        index = np.where(reverse & valid, self._n_doses[:,np.newaxis]-1-column, column)
+        rows = np.arange(n_rows)[:,np.newaxis]
+        self._E_table = self._E[rows, index]
+        self._logd_by_E = self._logd[rows, index]
 
     def E(self, d):
         """Evaluate this model at dose d
@@ -86,18 +182,17 @@ class MarginalLinear:
         effect : array_like
             Evaluate's the model at dose in d
         """
-        d = np.array(d, copy=True)
+        d = np.array(d, dtype=np.float64, copy=True)
         d[d==0] = np.nextafter(0,1)
         logd = np.log(d)
 
-        # These doses are below the minimum dose, or above the maximum, and therefore cannot be used for interpolation
-        invalid_mask = np.where((logd < min(self._logd)) | (logd > max(self._logd)))
+        if self._n_doses is not None:
+            return utils.fit_tools.interp_many(logd, self._logd, self._E, self._n_doses)
 
         E = np.interp(logd, self._logd, self._E)
 
-        E[invalid_mask] = np.nan
-
-        return E
+        # These doses are below the minimum dose, or above the maximum, and therefore cannot be used for interpolation
+        return np.where((logd < self._logd_min) | (logd > self._logd_max), np.nan, E)
 
     def E_inv(self, E):
         """Find the dose that will achieve effects in E. Only works for dose responses with strictly increasing or strictly decreasing E.
@@ -112,19 +207,22 @@ class MarginalLinear:
         doses : array_like
             Doses which achieve effects E using this model.
         """
-        if not self._is_invertible():
+        E = np.asarray(E, dtype=np.float64)
+
+        if self._n_doses is not None:
+            d = np.exp(utils.fit_tools.interp_many(E, self._E_table, self._logd_by_E, self._n_doses))
+            d[~self._invertible] = np.nan
+            return d
+
+        if not self._invertible:
             ret = 0*E
-            ret[:]=np.nan
+            ret[...]=np.nan
             return ret
         
-        # These effects are below the minimum or above the maximum, and therefore cannot be used for interpolation
-        invalid_mask = np.where((E < min(self._E)) | (E > max(self._E)))
-
-        d = np.exp(np.interp(E, self._E, self._logd))
+        d = np.exp(np.interp(E, self._E_table, self._logd_by_E))
 
-        d[invalid_mask] = np.nan
-
-        return d
+        # These effects are below the minimum or above the maximum, and therefore cannot be used for interpolation
+        return np.where((E < self._E_min) | (E > self._E_max), np.nan, d)
 
     def _is_invertible(self):
         """The dose model is only invertible if E is strictly increasing or strictly decreasing
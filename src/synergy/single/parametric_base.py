@@ -17,8 +17,9 @@ from scipy.optimize import curve_fit
 from scipy.stats import norm
 import numpy as np
 from .. import utils
+from ..utils.serialization import SerializableModel
 
-class ParameterizedModel1D:
+class ParameterizedModel1D(SerializableModel):
     def __init__(self):
         self.bounds = None
         self.fit_function = None
@@ -186,7 +187,11 @@ class ParameterizedModel1D:
     def _is_parameterized(self):
         """Internalized method to check all model parameters are set
         """
-        return not (None in self.get_parameters() or True in np.isnan(np.asarray(self.get_parameters())))
+        parameters = self.get_parameters()
+        # Parameters may be arrays (e.g., one value per plate, see synergy.combination.DoseDependentModel.fit_plates())
+        if any(p is None for p in parameters):
+            return False
+        return not any(np.isnan(p).any() for p in parameters)
 
     def _score(self, d, E):
         """Calculate goodness of fit and model quality scores, including sum-of-squares residuals, R^2, Akaike Information Criterion (AIC), and Bayesian Information Criterion (BIC).
@@ -2,4 +2,10 @@ from .base import *
 
 from . import dose_tools
 from . import data_exchange
+from . import fit_tools
+from . import fit_cache
+from . import surface_metrics
+from . import screen
+from . import serialization
+from . import bootstrap_store
 from . import plots
@@ -0,0 +1,230 @@
+#    Copyright (C) 2020 David J. Wooten
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+
+import numpy as np
+
+class BootstrapStore:
+    """On-disk store of the bootstrap_parameters of every model in a screen.
+
+    Each model's (n_iterations x n_parameters) block is appended to one preallocated, memory-mapped float64 array, and an index maps each key (e.g., combination id) to its row offsets. Blocks are returned as views of the memory map, so a model whose bootstrap_parameters come from the store (see add() and attach()) only reads its block from disk when get_parameter_range() or get_parameters() use it.
+
+    The store is a directory holding parameters.bin (the raw little-endian rows) and index.npz (keys and offsets). The index is written by flush(). Keys must be all str or all int, which the index stores as a string or integer array.
+
+    Parameters
+    ----------
+    path : str
+        Directory of the store. If it already holds a store, that store is opened.
+
+    n_parameters : int , default=None
+        Number of parameters of each bootstrap iteration. Required when creating a new store.
+
+    capacity : int , default=65536
+        Number of rows to preallocate. The file is grown (doubling its capacity) when it fills up.
+
+    mode : str , default="a"
+        "a" to open for appending (creating the store if needed), or "r" to open an existing store read-only
+    """
+    def __init__(self, path, n_parameters=None, capacity=65536, mode="a"):
+        if mode not in ("a", "r"):
+            raise ValueError("mode must be \"a\" or \"r\"")
+        self.path = path
+        self.mode = mode
+
+        index = os.path.join(path, "index.npz")
+        if os.path.exists(index):
+            with np.load(index) as f:
+                stored_parameters = int(f["n_parameters"])
+                self._keys = f["keys"].tolist()
+                self._offsets = f["offsets"].tolist()
+            if n_parameters is not None and n_parameters != stored_parameters:
+                raise ValueError("Store at %s holds %d parameters, not %d"%(path, stored_parameters, n_parameters))
+            n_parameters = stored_parameters
+        elif mode == "r":
+            raise FileNotFoundError("No bootstrap store at %s"%path)
+        elif n_parameters is None:
+            raise ValueError("n_parameters is required to create a new store")
+        else:
+            os.makedirs(path, exist_ok=True)
+            self._keys = []
+            self._offsets = [0]
+
+        self.n_parameters = n_parameters
+        self._positions = {key: i for i, key in enumerate(self._keys)}
+
+        self._data = None
+        self.capacity = 0
+        if mode == "r":
+            if self.n_rows > 0:
+                self._data = np.memmap(self._filename, dtype="<f8", mode="r", shape=(self.n_rows, n_parameters))
+                self.capacity = self.n_rows
+        else:
+            on_disk = 0
+            if os.path.exists(self._filename):
+                on_disk = os.path.getsize(self._filename) // (8*n_parameters)
+            self._resize(max(capacity, on_disk, self.n_rows, 1))
+
+    @property
+    def _filename(self):
+        return os.path.join(self.path, "parameters.bin")
+
+    @property
+    def n_rows(self):
+        """Number of rows (bootstrap iterations) stored across every key"""
+        return self._offsets[-1]
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    def keys(self):
+        """Keys in the order they were stored"""
+        return list(self._keys)
+
+    def __getitem__(self, key):
+        """Returns the block stored under key, as an (n_iterations x n_parameters) view of the memory map
+        """
+        i = self._positions[key]
+        start, end = self._offsets[i], self._offsets[i+1]
+        if start == end:
+            return np.empty((0, self.n_parameters))
+        return np.asarray(self._data[start:end])
+
+    def append(self, key, parameters):
+        """Appends a block of bootstrap parameters
+
+        Parameters
+        ----------
+        key : str or int
+            Identifier of the block (e.g., combination id). Every key of a store must have the same type, so that keys read back from the index compare equal to the ones stored.
+
+        parameters : array_like
+            (n_iterations x n_parameters) bootstrap parameters
+
+        Returns
+        ----------
+        block : numpy.ndarray
+            View of the stored block
+        """
+        if self.mode == "r":
+            raise ValueError("Store at %s is read-only"%self.path)
+        if not isinstance(key, (str, int, np.integer)):
+            raise TypeError("Keys must be str or int, not %s"%type(key).__name__)
+        if self._keys and isinstance(key, str) != isinstance(self._keys[0], str):
+            raise TypeError("Keys of a store must all be str or all be int, got %r after %r"%(key, self._keys[0]))
+        if not isinstance(key, str):
+            key = int(key)
+        if key in self._positions:
+            raise ValueError("%s is already stored"%key)
+        parameters = np.asarray(parameters, dtype=np.float64)
+        if parameters.ndim != 2 or parameters.shape[1] != self.n_parameters:
+            raise ValueError("Expected an (n_iterations x %d) array, got shape %s"%(self.n_parameters, parameters.shape))
+
+        start = self.n_rows
+        end = start + parameters.shape[0]
+        if end > self.capacity:
+            self._resize(max(end, 2*self.capacity))
+        self._data[start:end] = parameters
+
+        self._positions[key] = len(self._keys)
+        self._keys.append(key)
+        self._offsets.append(end)
+        return self[key]
+
+    def add(self, key, model):
+        """Moves a fit model's bootstrap_parameters into the store, replacing them with a view of the stored block. Models that were not bootstrapped are left unchanged.
+
+        Returns
+        ----------
+        model : the same model
+        """
+        if model.bootstrap_parameters is not None:
+            model.bootstrap_parameters = self.append(key, model.bootstrap_parameters)
+        return model
+
+    def attach(self, key, model):
+        """Sets a model's bootstrap_parameters to a view of the block stored under key (or None if there is none), e.g., after the model was restored with synergy.utils.serialization.
+
+        Returns
+        ----------
+        model : the same model
+        """
+        model.bootstrap_parameters = self[key] if key in self._positions else None
+        return model
+
+    def parameter_ranges(self, confidence_interval=95, chunk_rows=2**20):
+        """Percentile bands of every stored block, computed while reading at most chunk_rows rows at a time.
+
+        Parameters
+        ----------
+        confidence_interval : int, float, default=95
+            % confidence interval. Must be between 0 and 100.
+
+        chunk_rows : int , default=2**20
+            Maximum number of rows read at once (a block larger than this is read on its own)
+
+        Returns
+        ----------
+        ranges : numpy.ndarray
+            (n_keys x 2 x n_parameters) lower and upper bounds of each block, in the order of keys(). Empty blocks are nan.
+        """
+        lb = (100-confidence_interval)/2.
+        ub = 100-lb
+
+        offsets = np.asarray(self._offsets)
+        lengths = np.diff(offsets)
+        n = len(self._keys)
+        ranges = np.full((n, 2, self.n_parameters), np.nan)
+
+        first = 0
+        while first < n:
+            last = np.searchsorted(offsets, offsets[first]+chunk_rows, side='right') - 1
+            last = min(max(last, first+1), n)
+            chunk = np.array(self._data[offsets[first]:offsets[last]]) if offsets[last] > offsets[first] else None
+
+            # Blocks of equal length are stacked, so their percentiles are taken in one call
+            for length in np.unique(lengths[first:last]):
+                if length == 0:
+                    continue
+                blocks = first + np.flatnonzero(lengths[first:last] == length)
+                rows = (offsets[blocks] - offsets[first])[:,np.newaxis] + np.arange(length)
+                ranges[blocks] = np.percentile(chunk[rows], [lb, ub], axis=1).transpose(1, 0, 2)
+            first = last
+        return ranges
+
+    def flush(self):
+        """Writes the stored blocks and the index to disk
+        """
+        if self.mode == "r":
+            return
+        if self._data is not None:
+            self._data.flush()
+        # Write to a temporary file first, so a partially written index is never read
+        filename = os.path.join(self.path, "index.tmp.npz")
+        np.savez(filename, keys=np.asarray(self._keys), offsets=np.asarray(self._offsets, dtype=np.int64), n_parameters=self.n_parameters)
+        os.replace(filename, os.path.join(self.path, "index.npz"))
+
+    def _resize(self, capacity):
+        """Grows the data file to hold capacity rows. Views of the old memory map remain valid.
+        """
+        if self._data is not None:
+            self._data.flush()
+        with open(self._filename, "ab") as f:
+            f.truncate(capacity*8*self.n_parameters)
+        self._data = np.memmap(self._filename, dtype="<f8", mode="r+", shape=(capacity, self.n_parameters))
+        self.capacity = capacity
@@ -12,18 +12,143 @@
 #
 #    You should have received a copy of the GNU General Public License
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import csv
+import itertools
+import operator
+
+import numpy as np
+
 try:
     import pandas as pd
     pandas_installed = True
 except:
     pandas_installed = False
 
-def to_synergyfinder(d1, d2, E, d1_name="drug1", d2_name="drug2", d1_unit="uM", d2_unit="uM"):
-    if not pandas_installed:
-        ret = [",".join(["block_id", "drug_col", "drug_row", "conc_c", "conc_r", "response", "conc_c_unit", "conc_r_unit"])]
-        for D1, D2, EE in zip(d1, d2, E):
-            ret.append(",".join(["1", d1_name, d2_name, "%f"%D1, "%f"%D2,"%f"%EE, d1_unit, d2_unit]))
-        return "\n".join(ret)
-    else:
-        return pd.DataFrame(dict(block_id=1, drug_col=d1_name, drug_row=d2_name, conc_c=d1, conc_r=d2, response=E, conc_c_unit=d1_unit, conc_r_unit=d2_unit))
+SYNERGYFINDER_COLUMNS = ("block_id", "drug_col", "drug_row", "conc_c", "conc_r", "response", "conc_c_unit", "conc_r_unit")
+
+def to_synergyfinder(d1, d2, E, d1_name="drug1", d2_name="drug2", d1_unit="uM", d2_unit="uM", block_id=1):
+    """Formats dose-response data as a SynergyFinder table. Drug 1 is the column drug, and drug 2 the row drug.
+
+    Many blocks (e.g., every combination of a screen) can be written at once by passing arrays for block_id, and for the drug names and units, with one value per row.
+
+    Parameters
+    ----------
+    d1, d2 : array_like
+        Doses of drugs 1 and 2
+
+    E : array_like
+        Dose-response at doses d1 and d2
+
+    d1_name, d2_name : str or array_like , default="drug1", "drug2"
+        Drug names
+
+    d1_unit, d2_unit : str or array_like , default="uM"
+        Dose units
+
+    block_id : int, str, or array_like , default=1
+        Block of each row
+
+    Returns
+    ----------
+    table : pandas.DataFrame or str
+        A DataFrame if pandas is installed, otherwise CSV text. Doses and responses are written with 12 significant digits, and text columns are quoted.
+    """
+    columns = [block_id, d1_name, d2_name, d1, d2, E, d1_unit, d2_unit]
+    if pandas_installed:
+        return pd.DataFrame(dict(zip(SYNERGYFINDER_COLUMNS, columns)))
+
+    # Every row is formatted by one % operation on a repeated row template. Columns with a single value are written into the template itself.
+    # Text columns are quoted (with embedded quotes doubled), so names may contain the delimiter.
+    row = []
+    values = []
+    for column, fmt in zip(columns, ('"%s"', '"%s"', '"%s"', "%.12g", "%.12g", "%.12g", '"%s"', '"%s"')):
+        column = np.asarray(column)
+        quoted = fmt == '"%s"'
+        if column.ndim == 0:
+            value = column.item()
+            if quoted:
+                value = str(value).replace('"', '""')
+            row.append((fmt%value).replace("%", "%%"))
+        else:
+            row.append(fmt)
+            if quoted:
+                values.append([str(value).replace('"', '""') for value in column.tolist()])
+            else:
+                values.append(column.tolist())
+    body = ("\n" + ",".join(row))*len(E) % tuple(itertools.chain.from_iterable(zip(*values)))
+    return ",".join(SYNERGYFINDER_COLUMNS) + body
+
+def from_synergyfinder(f, chunk_size=65536, delimiter=","):
+    """Reads a SynergyFinder CSV file one block at a time, so files with many blocks can be processed in bounded memory.
+
+    The file is read chunk_size lines at a time. Rows of each block must be contiguous (as written by to_synergyfinder()). Units are not converted.
+
+    Parameters
+    ----------
+    f : str or file
+        Path or open text file with a block_id, drug_col, drug_row, conc_c, conc_r, response header
+
+    chunk_size : int , default=65536
+        Number of lines parsed at once
+
+    delimiter : str , default=","
+        Field delimiter
+
+    Yields
+    ----------
+    block_id : str
+
+    d1_name, d2_name : str
+        The column and row drugs
+
+    d1, d2 : numpy.array
+        Doses of the column and row drugs
+
+    E : numpy.array
+        Dose-response at doses d1 and d2
+    """
+    if isinstance(f, str):
+        with open(f, newline="") as handle:
+            yield from from_synergyfinder(handle, chunk_size=chunk_size, delimiter=delimiter)
+        return
+
+    header = next(csv.reader([f.readline()], delimiter=delimiter))
+    try:
+        get_columns = operator.itemgetter(*[header.index(name) for name in SYNERGYFINDER_COLUMNS[:6]])
+    except ValueError:
+        raise ValueError("SynergyFinder files must have %s columns"%", ".join(SYNERGYFINDER_COLUMNS[:6]))
+
+    finished = set()
+    pending_labels = np.empty((0, 3), dtype=str)
+    pending_values = np.empty((0, 3))
+    while True:
+        lines = list(itertools.islice(f, chunk_size))
+        labels, values = pending_labels, pending_values
+        if len(lines) > 0:
+            rows = [get_columns(row) for row in csv.reader(lines, delimiter=delimiter) if row]
+            if len(rows) == 0:
+                continue
+            fields = list(zip(*rows))
+            new_labels = np.column_stack([np.array(column, dtype=str) for column in fields[:3]])
+            new_values = np.column_stack([np.asarray(column, dtype=np.float64) for column in fields[3:]])
+            labels = np.concatenate([labels, new_labels])
+            values = np.concatenate([values, new_values])
+        elif len(labels) == 0:
+            return
+
+        # Every block but the last is complete. The last may continue in the next chunk.
+        starts = np.append(0, np.flatnonzero(labels[1:,0] != labels[:-1,0]) + 1)
+        ends = np.append(starts[1:], len(labels))
+        if len(lines) > 0:
+            pending_labels, pending_values = labels[starts[-1]:], values[starts[-1]:]
+            starts, ends = starts[:-1], ends[:-1]
+
+        for start, end in zip(starts, ends):
+            block_id = str(labels[start,0])
+            if block_id in finished:
+                raise ValueError("Rows of block %s are not contiguous"%block_id)
+            finished.add(block_id)
+            yield block_id, str(labels[start,1]), str(labels[start,2]), values[start:end,0], values[start:end,1], values[start:end,2]
 
+        if len(lines) == 0:
+            return
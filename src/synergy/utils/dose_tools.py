@@ -40,7 +40,30 @@ def grid(d1min, d1max, d2min, d2max, n_points1, n_points2, replicates=1, logscal
 
     return D1, D2
 
-def grid_multi(dmin, dmax, npoints, logscale=True, include_zero=False):
+def grid_multi(dmin, dmax, npoints, logscale=True, include_zero=False, lazy=False):
+    """Full-factorial grid of doses of N drugs.
+
+    Rows are ordered as the flattened np.meshgrid(*doses): drug 2 varies slowest, then drug 1, then drugs 3, 4, ..., with the last drug varying fastest.
+
+    Parameters
+    ----------
+    dmin, dmax, npoints : array_like
+        Minimum dose, maximum dose, and number of dose levels of each drug
+
+    logscale : bool , default=True
+        If True, dose levels are log-spaced, otherwise linearly spaced
+
+    include_zero : bool , default=False
+        If True, a dose of 0 is added to every drug whose minimum dose is above 0
+
+    lazy : bool , default=False
+        If True, returns a LazyGrid, which computes rows only when they are used, instead of the dense array
+
+    Returns
+    ----------
+    d : numpy.ndarray (M x N) or LazyGrid
+        Doses of the N drugs at each of the M grid points
+    """
     if not (len(dmin)==len(dmax) and len(dmin)==len(npoints)):
         return None
     doses = []
@@ -54,19 +77,266 @@ def grid_multi(dmin, dmax, npoints, logscale=True, include_zero=False):
         if include_zero and Dmin > 0:
             d = np.append(0, d)
         doses.append(d)
-    dosegrid = np.meshgrid(*doses)
-    
-    if include_zero:
-        total_length = np.prod([i+1 for i in npoints])
-    else:
-        total_length = np.prod(npoints)
-    n = len(dmin)
-    return_d = np.zeros((total_length, n))
-    
-    for i in range(n):
-        return_d[:,i] = dosegrid[i].flatten()
 
-    return return_d
+    grid = LazyGrid(doses)
+    if lazy:
+        return grid
+    return np.asarray(grid)
+
+class LazyGrid:
+    """Full-factorial grid of doses of N drugs that only stores each drug's dose levels, computing rows (dose combinations) when they are used.
+
+    A LazyGrid can be used like the (M x N) array returned by grid_multi(): it has a len() and shape, rows can be taken by flat index, slice, or mask (d[k], d[a:b], d[mask], d[:,i]), and np.asarray() builds the dense array. Large grids are better evaluated a chunk of rows at a time (see chunks()), or restricted to a subgrid() first.
+
+    Parameters
+    ----------
+    doses : list of array_like
+        Dose levels of each drug
+
+    Attributes
+    ----------
+    doses : list of numpy.array
+        Dose levels of each drug
+    """
+    def __init__(self, doses):
+        self.doses = [np.asarray(d, dtype=float) for d in doses]
+        n = len(self.doses)
+        # Grid axis of each drug, matching np.meshgrid()'s default "xy" indexing, which swaps the first two drugs
+        self._axes = [1, 0] + list(range(2, n)) if n > 1 else [0]
+        self._shape = tuple(len(self.doses[i]) for i in np.argsort(self._axes))
+
+    @property
+    def n_drugs(self):
+        return len(self.doses)
+
+    @property
+    def shape(self):
+        return (len(self), self.n_drugs)
+
+    @property
+    def ndim(self):
+        return 2
+
+    def __len__(self):
+        return int(np.prod(self._shape))
+
+    def rows(self, indices):
+        """Doses at the given flat indices
+
+        Parameters
+        ----------
+        indices : array_like of int
+            Row indices, each in [0, len(self))
+
+        Returns
+        ----------
+        d : numpy.ndarray
+            indices.shape + (N,) doses
+        """
+        indices = np.asarray(indices)
+        positions = np.unravel_index(indices, self._shape)
+        d = np.empty(indices.shape + (self.n_drugs,))
+        for i, levels in enumerate(self.doses):
+            d[..., i] = levels[positions[self._axes[i]]]
+        return d
+
+    def chunks(self, chunk_size=65536):
+        """Yields the rows in order, as dense (chunk_size x N) arrays (the last may be shorter)
+        """
+        for start in range(0, len(self), chunk_size):
+            yield self.rows(np.arange(start, min(start+chunk_size, len(self))))
+
+    def __getitem__(self, key):
+        columns = ()
+        if isinstance(key, tuple):
+            key, columns = key[0], key[1:]
+        if isinstance(key, slice):
+            indices = np.arange(*key.indices(len(self)))
+        else:
+            indices = np.asarray(key)
+            if indices.dtype == bool:
+                indices = np.flatnonzero(indices)
+            indices = np.where(indices < 0, indices + len(self), indices)
+        return self.rows(indices)[(Ellipsis,) + columns]
+
+    def subgrid(self, levels):
+        """Grid of a subset of each drug's dose levels
+
+        Parameters
+        ----------
+        levels : list
+            For each drug, the dose levels to keep, as a slice, index array, or boolean mask into doses[i]. None keeps every level.
+
+        Returns
+        ----------
+        grid : LazyGrid
+        """
+        return LazyGrid([d if keep is None else np.atleast_1d(d[keep]) for d, keep in zip(self.doses, levels)])
+
+    def __array__(self, dtype=None, copy=None):
+        d = np.empty(self._shape + (self.n_drugs,), dtype=float if dtype is None else dtype)
+        for i, levels in enumerate(self.doses):
+            shape = [1]*len(self._shape)
+            shape[self._axes[i]] = len(levels)
+            d[..., i] = levels.reshape(shape)
+        return d.reshape(len(self), self.n_drugs)
+
+class DoseGrid:
+    """Index of the doses of N drugs sampled at M points, built once from d and shared by everything that needs to know which samples sit on which dose levels.
+
+    Every higher-order model accepts a DoseGrid wherever it accepts d, so a grid that will be fit with several models (or fit many times, with different E) only has to be indexed once.
+
+    Parameters
+    ----------
+    d : numpy.ndarray (M x N)
+        Doses of N drugs sampled at M points
+
+    Attributes
+    ----------
+    d : numpy.ndarray (M x N)
+        The doses
+
+    levels : list of numpy.array
+        Sorted unique dose levels of each drug
+
+    codes : numpy.ndarray (M x N) of int
+        Index of each dose into levels, so d[k,i] == levels[i][codes[k,i]]
+
+    combinations : numpy.ndarray (K x N)
+        Unique dose combinations, in lexicographic order of their codes
+
+    replicates : numpy.array of int
+        Replicate map: for each of the M samples, the row of combinations it replicates
+
+    n_replicates : numpy.array of int
+        Number of samples at each of the K unique combinations
+    """
+    def __init__(self, d):
+        d = np.asarray(d, dtype=float)
+        if d.ndim != 2 or d.shape[1] < 1:
+            raise ValueError("d must be an (M x N) array of doses, got shape %s"%(d.shape,))
+        self.d = d
+
+        M, N = d.shape
+        self.levels = []
+        self.codes = np.empty((M, N), dtype=np.intp)
+        for i in range(N):
+            levels, codes = np.unique(d[:,i], return_inverse=True)
+            self.levels.append(levels)
+            self.codes[:,i] = codes
+
+        n_levels = [len(levels) for levels in self.levels]
+        self._replicate_map = None
+
+        # Single-drug slices: a sample belongs to drug i's slice when every other drug is at its minimum
+        at_min = self.codes == 0
+        n_above_min = N - at_min.sum(axis=1)
+        self._single_masks = [n_above_min - (~at_min[:,i]) == 0 for i in range(N)]
+
+        # Hypercube corners: every drug at its minimum (bit 0) or maximum (bit 1). Bit i of a corner's index is drug i's state, as in higher.MuSyC._idx_to_state()
+        self._at_min = at_min
+        self._at_max = self.codes == np.asarray(n_levels) - 1
+        self._corner_masks = dict()
+
+    @property
+    def combinations(self):
+        return self._get_replicate_map()[0]
+
+    @property
+    def replicates(self):
+        return self._get_replicate_map()[1]
+
+    @property
+    def n_replicates(self):
+        return self._get_replicate_map()[2]
+
+    def _get_replicate_map(self):
+        """Finds the unique dose combinations the first time they are needed, since the models themselves only use levels and slices
+        """
+        if self._replicate_map is None:
+            n_levels = [len(levels) for levels in self.levels]
+            if np.prod(n_levels, dtype=float) < 2**62:
+                # One integer per combination, so replicates are found with a 1D unique
+                keys = np.ravel_multi_index(tuple(self.codes.T), n_levels)
+                _, first, replicates, n_replicates = np.unique(keys, return_index=True, return_inverse=True, return_counts=True)
+            else:
+                _, first, replicates, n_replicates = np.unique(self.codes, axis=0, return_index=True, return_inverse=True, return_counts=True)
+            self._replicate_map = (self.d[first], replicates.reshape(-1), n_replicates)
+        return self._replicate_map
+
+    @property
+    def n_drugs(self):
+        return self.d.shape[1]
+
+    @property
+    def n_samples(self):
+        return self.d.shape[0]
+
+    @property
+    def shape(self):
+        return self.d.shape
+
+    def __len__(self):
+        return self.d.shape[0]
+
+    def __getitem__(self, rows):
+        """Sub-grid of the samples selected by rows (a slice, index array, or boolean mask).
+
+        The sub-grid keeps the full grid's levels, so its single-drug slices and corners are still defined by each drug's minimum and maximum over the full grid. Its replicate map only covers its own samples.
+        """
+        grid = object.__new__(DoseGrid)
+        grid.d = self.d[rows]
+        grid.levels = self.levels
+        grid.codes = self.codes[rows]
+        grid._replicate_map = None
+        grid._single_masks = [mask[rows] for mask in self._single_masks]
+        grid._at_min = self._at_min[rows]
+        grid._at_max = self._at_max[rows]
+        grid._corner_masks = dict()
+        return grid
+
+    def __array__(self, dtype=None, copy=None):
+        # Lets np.asarray() treat a DoseGrid as its doses
+        if dtype is None:
+            return self.d
+        return self.d.astype(dtype)
+
+    def single_drug_mask(self, i):
+        """Boolean mask of the samples at which every drug other than drug i is at its minimum dose (ideally 0)
+        """
+        return self._single_masks[i]
+
+    def single_drug_indices(self, i):
+        """Indices of the samples at which every drug other than drug i is at its minimum dose
+        """
+        return np.where(self._single_masks[i])
+
+    def any_single_drug_mask(self):
+        """Boolean mask of the samples in any single-drug slice (including the sample(s) with no drug)
+        """
+        return np.logical_or.reduce(self._single_masks)
+
+    def corner_mask(self, idx):
+        """Boolean mask of the samples at hypercube corner idx.
+
+        Bit i of idx is 0 if drug i is at its minimum dose, and 1 if it is at its maximum (see higher.MuSyC._idx_to_state()).
+        """
+        if idx not in self._corner_masks:
+            bits = (idx >> np.arange(self.n_drugs)) & 1
+            self._corner_masks[idx] = np.where(bits==1, self._at_max, self._at_min).all(axis=1)
+        return self._corner_masks[idx]
+
+    def corner_indices(self, idx):
+        """Indices of the samples at hypercube corner idx (see corner_mask())
+        """
+        return np.where(self.corner_mask(idx))
+
+def as_dose_grid(d):
+    """Returns d if it is already a DoseGrid, otherwise builds a DoseGrid from it
+    """
+    if isinstance(d, DoseGrid):
+        return d
+    return DoseGrid(d)
 
 
 def get_num_replicates(d1, d2):
@@ -0,0 +1,206 @@
+#    Copyright (C) 2020 David J. Wooten
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from collections import OrderedDict
+import copy
+import hashlib
+import os
+import pickle
+
+import numpy as np
+
+_cache = None
+
+class FitCache:
+    """Least-recently-used cache of fit single-drug models, keyed by the content of the data they were fit to.
+
+    Synergy models that share a plate all fit the same single-drug models to the same monotherapy wells. With a cache enabled (see enable()), each of these fits is only done once, and is reused by every later fit of the same model class, with the same bounds and fit kwargs, to the same doses and effects - including fits from other plates that share the same control wells.
+
+    Parameters
+    ----------
+    max_size : int , default=1024
+        Maximum number of fits kept in memory. The least recently used fits are evicted first.
+
+    path : str , default=None
+        If given, fits are also saved to (and loaded from) this directory, so they persist across sessions. Disk entries are never evicted.
+    """
+    def __init__(self, max_size=1024, path=None):
+        self.max_size = max_size
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    def key(self, model, d, E, kwargs):
+        """Hashes a model's class and configuration (e.g., bounds), the data, and fit kwargs.
+
+        The model must not be fit yet, so that its attributes only describe its configuration.
+
+        Returns
+        ----------
+        key : str
+            Hex digest identifying this fit
+        """
+        h = hashlib.sha256()
+        h.update(("%s.%s"%(type(model).__module__, type(model).__qualname__)).encode())
+        for name in sorted(vars(model)):
+            h.update(name.encode())
+            _hash_value(h, vars(model)[name])
+        for values in (d, E):
+            _hash_value(h, np.asarray(values, dtype=np.float64))
+        for name in sorted(kwargs):
+            h.update(name.encode())
+            _hash_value(h, kwargs[name])
+        return h.hexdigest()
+
+    def get(self, key):
+        """Returns the fit state stored under key, or None
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+        if self.path is not None:
+            filename = os.path.join(self.path, "%s.pkl"%key)
+            if os.path.exists(filename):
+                with open(filename, "rb") as f:
+                    state = pickle.load(f)
+                self._store(key, state)
+                self.hits += 1
+                return state
+
+        self.misses += 1
+        return None
+
+    def put(self, key, state):
+        """Stores a fit state under key (and on disk if this cache has a path)
+        """
+        self._store(key, state)
+        if self.path is not None:
+            filename = os.path.join(self.path, "%s.pkl"%key)
+            # Write to a temporary file first, so a partially written entry is never read
+            with open(filename + ".tmp", "wb") as f:
+                pickle.dump(state, f)
+            os.replace(filename + ".tmp", filename)
+
+    def clear(self):
+        """Removes all in-memory entries (entries on disk are kept)
+        """
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def _store(self, key, state):
+        self._entries[key] = state
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+def enable(max_size=1024, path=None):
+    """Turns on caching of single-drug fits for every synergy model.
+
+    Parameters
+    ----------
+    max_size : int , default=1024
+        Maximum number of fits kept in memory
+
+    path : str , default=None
+        Optional directory in which fits are persisted
+
+    Returns
+    ----------
+    cache : FitCache
+        The active cache
+    """
+    global _cache
+    _cache = FitCache(max_size=max_size, path=path)
+    return _cache
+
+def disable():
+    """Turns off caching of single-drug fits
+    """
+    global _cache
+    _cache = None
+
+def active_cache():
+    """Returns the active FitCache, or None if caching is disabled
+    """
+    return _cache
+
+def fit(model, d, E, **kwargs):
+    """Fits a single-drug model to (d, E), reusing an identical earlier fit if caching is enabled.
+
+    Fits that draw bootstrap samples are random, and are never cached.
+
+    Parameters
+    ----------
+    model : single-drug model
+        An unfit single-drug model (e.g., Hill() or MarginalLinear())
+
+    d : array_like
+        Doses
+
+    E : array_like
+        Effects measured at doses d
+
+    kwargs
+        kwargs passed to model.fit()
+
+    Returns
+    ----------
+    model : single-drug model
+        The same model, now fit
+    """
+    cache = _cache
+    if cache is None or kwargs.get("bootstrap_iterations", 0) > 0:
+        model.fit(d, E, **kwargs)
+        return model
+
+    key = cache.key(model, d, E, kwargs)
+    state = cache.get(key)
+    if state is None:
+        model.fit(d, E, **kwargs)
+        cache.put(key, _get_fit_state(model))
+    else:
+        vars(model).update(copy.deepcopy(state))
+    return model
+
+def _get_fit_state(model):
+    """Everything a fit sets on a model. Callables (e.g., fit_function lambdas) are left out, since the model being restored already has its own.
+    """
+    return copy.deepcopy({name: value for name, value in vars(model).items() if not callable(value)})
+
+def _hash_value(h, value):
+    """Feeds value into the hash h. Arrays are hashed by content, callables by name.
+    """
+    if isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value)
+        h.update(("%s%s"%(value.dtype.str, value.shape)).encode())
+        h.update(value.tobytes())
+    elif callable(value):
+        h.update(("%s.%s"%(getattr(value, "__module__", ""), getattr(value, "__qualname__", type(value).__name__))).encode())
+    elif isinstance(value, (list, tuple)):
+        h.update(("%s%d"%(type(value).__name__, len(value))).encode())
+        for item in value:
+            _hash_value(h, item)
+    else:
+        h.update(repr(value).encode())
@@ -0,0 +1,623 @@
+#    Copyright (C) 2020 David J. Wooten
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import warnings
+
+import numpy as np
+
+
+def group_indices(group_ids):
+    """Sorts samples by group and returns the bookkeeping needed to reduce over groups.
+
+    Parameters
+    ----------
+    group_ids : array_like
+        Group label of each sample. Any type understood by numpy.unique() may be used.
+
+    Returns
+    ----------
+    groups : numpy.array
+        The unique group labels, in sorted order
+
+    order : numpy.array
+        Indices that sort the samples by group. Sorting is stable, so samples within a group keep their original order.
+
+    gidx : numpy.array
+        For each sorted sample, the index (into groups) of the group it belongs to
+
+    offsets : numpy.array
+        Index of the first sorted sample of each group (suitable for numpy.ufunc.reduceat())
+    """
+    groups, codes = np.unique(np.asarray(group_ids), return_inverse=True)
+    codes = codes.reshape(-1)
+    order = np.argsort(codes, kind='stable')
+    gidx = codes[order]
+    offsets = np.searchsorted(gidx, np.arange(len(groups)))
+    return groups, order, gidx, offsets
+
+def group_median(values, gidx, n_groups):
+    """Median of values within each group.
+
+    Parameters
+    ----------
+    values : array_like
+        Values to take the median of
+
+    gidx : array_like
+        Group index (0 to n_groups-1) of each value. Every group must have at least one value.
+
+    n_groups : int
+        Number of groups
+
+    Returns
+    ----------
+    median : numpy.array
+        The median of each group
+    """
+    values = np.asarray(values, dtype=np.float64)
+    order = np.lexsort((values, gidx))
+    counts = np.bincount(gidx, minlength=n_groups)
+    offsets = np.cumsum(counts) - counts
+    lo = values[order[offsets + (counts-1)//2]]
+    hi = values[order[offsets + counts//2]]
+    return (lo + hi)/2.
+
+def linregress_many(x, y, gidx, n_groups):
+    """Ordinary least-squares line through the (x, y) points of each group, all groups at once.
+
+    Parameters
+    ----------
+    x : array_like
+        Independent values
+
+    y : array_like
+        Dependent values
+
+    gidx : array_like
+        Group index (0 to n_groups-1) of each point. Groups may be empty.
+
+    n_groups : int
+        Number of groups
+
+    Returns
+    ----------
+    slope : numpy.array
+        Slope of each group's line. Groups with fewer than two distinct x values get nan.
+
+    intercept : numpy.array
+        Intercept of each group's line
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    gidx = np.asarray(gidx, dtype=np.intp)
+
+    counts = np.bincount(gidx, minlength=n_groups)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_mean = np.bincount(gidx, weights=x, minlength=n_groups) / counts
+        y_mean = np.bincount(gidx, weights=y, minlength=n_groups) / counts
+
+        # Centering within each group first keeps the sums well conditioned
+        dx = x - x_mean[gidx]
+        dy = y - y_mean[gidx]
+        sxx = np.bincount(gidx, weights=dx*dx, minlength=n_groups)
+        sxy = np.bincount(gidx, weights=dx*dy, minlength=n_groups)
+
+        slope = np.where(sxx > 0, sxy / sxx, np.nan)
+    return slope, y_mean - slope*x_mean
+
+def pad_groups(values, gidx, offsets, counts):
+    """Scatters group-sorted samples into a padded (n_groups x max(counts)) array.
+
+    Padding slots are filled with the first sample of their group, so any model evaluated on the padded array stays finite. Use the returned mask to ignore them.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        Group-sorted values. The last axis indexes samples.
+
+    gidx : numpy.array
+        Group index of each sorted sample
+
+    offsets : numpy.array
+        Index of the first sample of each group
+
+    counts : numpy.array
+        Number of samples in each group
+
+    Returns
+    ----------
+    padded : numpy.ndarray
+        Array with the sample axis replaced by (n_groups, max(counts))
+
+    mask : numpy.ndarray
+        (n_groups x max(counts)) boolean array, True for real samples
+    """
+    n_groups = len(offsets)
+    width = np.max(counts)
+    position = np.arange(len(gidx)) - offsets[gidx]
+    mask = np.zeros((n_groups, width), dtype=bool)
+    mask[gidx, position] = True
+
+    padded = np.repeat(values[..., offsets, None], width, axis=-1)
+    padded[..., gidx, position] = values
+    return padded, mask
+
+def reduce_groups(values, offsets, function=np.mean):
+    """Reduces contiguous groups of values (e.g., replicate measurements sorted by dose) with function.
+
+    np.mean, np.median, np.sum, np.min, and np.max are computed in a single vectorized pass. Any other function (e.g., a trimmed mean) is called once per group with more than one value. Groups with a single value always reduce to that value.
+
+    Parameters
+    ----------
+    values : array_like
+        Group-sorted values
+
+    offsets : array_like
+        Index of the first value of each group
+
+    function : callable , default=np.mean
+        Reducer mapping a 1D array to a scalar
+
+    Returns
+    ----------
+    reduced : numpy.array
+        One value per group
+    """
+    values = np.asarray(values, dtype=np.float64)
+    offsets = np.asarray(offsets)
+    counts = np.diff(np.append(offsets, len(values)))
+
+    if function is np.mean:
+        return np.add.reduceat(values, offsets) / counts
+    if function is np.sum:
+        return np.add.reduceat(values, offsets)
+    if function is np.min:
+        return np.minimum.reduceat(values, offsets)
+    if function is np.max:
+        return np.maximum.reduceat(values, offsets)
+    if function is np.median:
+        return group_median(values, np.repeat(np.arange(len(offsets)), counts), len(offsets))
+
+    reduced = values[offsets].copy()
+    for i in np.where(counts > 1)[0]:
+        reduced[i] = function(values[offsets[i]:offsets[i]+counts[i]])
+    return reduced
+
+def interp_many(x, xp, fp, n_points):
+    """Row-wise linear interpolation, equivalent to calling numpy.interp() on each row, but with np.nan outside of each row's table.
+
+    Parameters
+    ----------
+    x : array_like
+        (n_rows x M) points to evaluate. A single row of M points is used for every row.
+
+    xp : numpy.ndarray
+        (n_rows x K) padded tables of increasing x-coordinates. Only the first n_points[i] entries of row i are used.
+
+    fp : numpy.ndarray
+        (n_rows x K) padded tables of y-coordinates
+
+    n_points : array_like
+        Number of valid entries in each row of xp and fp
+
+    Returns
+    ----------
+    y : numpy.ndarray
+        (n_rows x M) interpolated values
+    """
+    xp = np.asarray(xp, dtype=np.float64)
+    fp = np.asarray(fp, dtype=np.float64)
+    n_rows, K = xp.shape
+    x = np.asarray(x, dtype=np.float64)
+    n_points = np.asarray(n_points)
+    rows = np.arange(n_rows)[:,np.newaxis]
+
+    # A row-wise searchsorted. Values are replaced by their rank among all table values, which preserves every
+    # comparison exactly. The count of row i's table entries at or below x is then the number with rank <= rank(x).
+    valid = np.arange(K)[np.newaxis,:] < n_points[:,np.newaxis]
+    levels = np.unique(xp[valid])
+    n_levels = len(levels) + 1
+    table_rows = np.nonzero(valid)[0]
+    table_ranks = np.searchsorted(levels, xp[valid], side='right')
+    query_ranks = np.searchsorted(levels, x, side='right') # Ranked before broadcasting, in case rows share x
+    query_ranks = np.broadcast_to(query_ranks, (n_rows, np.shape(x)[-1]))
+    x = np.broadcast_to(x, query_ranks.shape)
+
+    if n_rows*n_levels <= 4*x.size:
+        # Few distinct table values (e.g., rows share a dose layout): look counts up in a cumulative histogram
+        cumulative_counts = np.zeros((n_rows, n_levels), dtype=np.intp)
+        np.add.at(cumulative_counts, (table_rows, table_ranks), 1)
+        count = np.cumsum(cumulative_counts, axis=1)[rows, query_ranks]
+    else:
+        # Otherwise combine rows and ranks into integer keys that sort by row first, and do one global searchsorted
+        table_keys = table_rows*n_levels + table_ranks
+        row_start = np.cumsum(n_points) - n_points
+        count = np.searchsorted(table_keys, rows*n_levels + query_ranks, side='right') - row_start[:,np.newaxis]
+
+    lo = np.clip(count-1, 0, np.maximum(n_points-2, 0)[:,np.newaxis])
+    hi = np.minimum(lo+1, (n_points-1)[:,np.newaxis])
+    x0, x1 = xp[rows, lo], xp[rows, hi]
+    f0, f1 = fp[rows, lo], fp[rows, hi]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(x1 > x0, (x-x0)/(x1-x0), 0.)
+    y = f0 + t*(f1-f0)
+
+    x_max = xp[rows[:,0], n_points-1][:,np.newaxis]
+    y[(x < xp[:,:1]) | (x > x_max) | np.isnan(x)] = np.nan
+    return y
+
+def latin_hypercube(n_samples, n_dimensions):
+    """Draws a Latin hypercube sample from the unit cube using numpy's global random state.
+
+    Each dimension is split into n_samples equal strata, and every stratum is sampled exactly once.
+
+    Parameters
+    ----------
+    n_samples : int
+        Number of points
+
+    n_dimensions : int
+        Number of dimensions
+
+    Returns
+    ----------
+    samples : numpy.ndarray
+        (n_samples x n_dimensions) array of points in [0, 1)
+    """
+    strata = np.argsort(np.random.rand(n_samples, n_dimensions), axis=0)
+    return (strata + np.random.rand(n_samples, n_dimensions)) / max(n_samples, 1)
+
+def resample_seeds(n_resamples):
+    """Spawns one seed per bootstrap resample, derived from numpy's global random state (so numpy.random.seed() makes them reproducible).
+
+    Parameters
+    ----------
+    n_resamples : int
+        Number of resamples
+
+    Returns
+    ----------
+    seeds : list
+        One numpy.random.SeedSequence per resample. See resample_within_groups().
+    """
+    return np.random.SeedSequence(np.random.randint(0, 2**31, size=4)).spawn(n_resamples)
+
+def resample_within_groups(gidx, seeds, samples=None):
+    """Draws bootstrap resamples in which every sample is replaced by a random sample (with replacement) of its own group.
+
+    Each resample draws from its own seed, and the replacement of a sample depends only on that seed and the sample's index. Drawing replacements for any subset of samples (e.g., one chunk of a large experiment) therefore gives the same replacements as drawing them for all M samples at once.
+
+    Parameters
+    ----------
+    gidx : array_like
+        Group index (0 to n_groups-1) of each of the M samples
+
+    seeds : list
+        One numpy.random.SeedSequence per resample (see resample_seeds())
+
+    samples : array_like , default=None
+        Strictly increasing indices of the samples to draw replacements for. Replacements are still drawn from each sample's whole group. If None, replacements are drawn for all M samples.
+
+    Returns
+    ----------
+    indices : numpy.ndarray
+        (len(seeds) x len(samples)) indices into the M samples. Samples that are alone in their group always map to themselves.
+    """
+    gidx = np.asarray(gidx, dtype=np.intp)
+    order = np.argsort(gidx, kind='stable')
+    counts = np.bincount(gidx)
+    starts = np.cumsum(counts) - counts
+
+    if samples is None:
+        samples = np.arange(len(gidx))
+    samples = np.asarray(samples, dtype=np.intp)
+    if np.any(np.diff(samples) <= 0):
+        raise ValueError("samples must be strictly increasing")
+
+    # Sample i takes the i-th uniform of its resample's stream. Each run of consecutive samples is drawn at once, skipping the stream ahead over samples that are not needed.
+    bounds = np.concatenate([[0], np.flatnonzero(np.diff(samples) != 1) + 1, [len(samples)]])
+    uniforms = np.empty((len(seeds), len(samples)))
+    for resample, seed in enumerate(seeds):
+        bit_generator = np.random.PCG64(seed)
+        generator = np.random.Generator(bit_generator)
+        position = 0
+        for first, last in zip(bounds[:-1], bounds[1:]):
+            bit_generator.advance(int(samples[first] - position))
+            uniforms[resample, first:last] = generator.random(last-first)
+            position = samples[first] + last - first
+
+    gidx = gidx[samples]
+    draws = (uniforms * counts[gidx]).astype(np.intp)
+    return order[starts[gidx] + draws]
+
+def percentile_bands(samples, confidence_interval=95):
+    """Lower and upper percentiles of bootstrap samples, taken over the first axis. nan samples are ignored.
+
+    Parameters
+    ----------
+    samples : array_like
+        (n_resamples x ...) bootstrap samples
+
+    confidence_interval : int, float, default=95
+        % confidence interval. Must be between 0 and 100.
+
+    Returns
+    ----------
+    bands : numpy.ndarray
+        (2 x ...) lower and upper bounds. Positions where every sample is nan are nan.
+    """
+    lb = (100-confidence_interval)/2.
+    ub = 100-lb
+    with warnings.catch_warnings():
+        # All-nan positions are expected (e.g., CI where E is out of range)
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanpercentile(samples, [lb, ub], axis=0)
+
+def bisect_many(f, lower, upper, xtol=1e-12, max_iterations=200):
+    """Finds roots of many scalar equations at once by bisection, run in lockstep.
+
+    Each element i solves f(x)[i] = 0 within [lower[i], upper[i]]. Elements whose bracket does not contain a sign change instead return whichever endpoint has the smaller |f| (for monotonic f, the point closest to a root).
+
+    Parameters
+    ----------
+    f : callable
+        Vectorized function. f(x) must return an array of the same shape as x, and element i may only depend on x[i].
+
+    lower : array_like
+        Lower end of each bracket
+
+    upper : array_like
+        Upper end of each bracket
+
+    xtol : float , default=1e-12
+        Bisection stops once every bracket is narrower than xtol*max(1, |x|)
+
+    max_iterations : int , default=200
+        Maximum number of bisection steps
+
+    Returns
+    ----------
+    x : numpy.array
+        The root (or closest endpoint) of each equation
+
+    bracketed : numpy.array
+        Boolean array, True where the bracket contained a sign change
+    """
+    lower, upper = np.broadcast_arrays(np.asarray(lower, dtype=np.float64), np.asarray(upper, dtype=np.float64))
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        f_lower = f(lower)
+        f_upper = f(upper)
+
+        bracketed = (np.sign(f_lower)*np.sign(f_upper) <= 0)
+        closest_endpoint = np.where(np.abs(f_lower) <= np.abs(f_upper), lower, upper)
+
+        lo = lower.copy()
+        hi = upper.copy()
+        lo_positive = f_lower > 0
+        for iteration in range(max_iterations):
+            if np.all(~bracketed | (np.abs(hi-lo) <= xtol*np.maximum(1., np.abs(lo)))):
+                break
+            mid = (lo+hi)/2.
+
+            # Keep the half whose endpoints have opposite signs
+            move_lo = (f(mid) > 0) == lo_positive
+            lo = np.where(move_lo, mid, lo)
+            hi = np.where(move_lo, hi, mid)
+
+    return np.where(bracketed, (lo+hi)/2., closest_endpoint), bracketed
+
+def _finite_difference_jacobian(f, xdata, P, y0, eps=1.49e-8):
+    """Forward-difference Jacobian of f with respect to each column of the (n_groups x n_parameters) parameter matrix P.
+    """
+    n_parameters = P.shape[1]
+    jac = np.zeros(y0.shape + (n_parameters,))
+    for j in range(n_parameters):
+        step = eps*np.maximum(np.abs(P[:,j]), 1.)
+        Pj = P.copy()
+        Pj[:,j] += step
+        jac[...,j] = (f(xdata, *Pj.T[:,:,None]) - y0) / step[:,None]
+    return jac
+
+def curve_fit_many(f, xdata, ydata, group_ids, p0, bounds=None, jac=None, max_iterations=200, ftol=1e-8, xtol=1e-8):
+    """Fits f to many independent groups of data at once using a bounded, vectorized Levenberg-Marquardt solver.
+
+    Every group gets its own parameters, but all groups are advanced in lockstep: the model, Jacobian, normal equations, and damped steps are evaluated as stacked numpy arrays rather than one scipy.optimize.curve_fit() call per group. Data are laid out as an (n_groups x max_samples_per_group) array, and each parameter is passed to f as an (n_groups x 1) column, so f (and jac) must only rely on numpy broadcasting between doses and parameters.
+
+    Bounds are enforced by projecting each step back into the feasible box.
+
+    Parameters
+    ----------
+    f : callable
+        Model function f(xdata, *params), with the same signature used for scipy.optimize.curve_fit()
+
+    xdata : array_like
+        Independent variable(s). The last axis indexes samples (e.g., shape (M,) or (2, M)).
+
+    ydata : array_like
+        Dependent data, of length M
+
+    group_ids : array_like
+        Group label of each of the M samples
+
+    p0 : array_like
+        Initial guess. Either a single parameter vector used for every group, or an array of shape (n_groups, n_parameters) ordered by the sorted unique group labels.
+
+    bounds : tuple , default=None
+        (lower, upper) bounds, as given to scipy.optimize.curve_fit(). If None, parameters are unbounded.
+
+    jac : callable , default=None
+        Jacobian jac(xdata, *params), returning an array with one row per (padded) sample and one column per parameter. If None, forward finite differences are used.
+
+    max_iterations : int , default=200
+        Maximum number of Levenberg-Marquardt iterations
+
+    ftol : float , default=1e-8
+        A group is converged once an accepted step reduces its sum of squared residuals by less than ftol (relative)
+
+    xtol : float , default=1e-8
+        A group is converged once an accepted step is smaller than xtol (relative to the parameter norm)
+
+    Returns
+    ----------
+    groups : numpy.array
+        The unique group labels, in sorted order
+
+    popt : numpy.ndarray
+        (n_groups x n_parameters) fitted parameters
+
+    converged : numpy.array
+        Boolean convergence flag for each group. Groups that reach max_iterations, or stall (their damping grows past 1e16 without an accepted step), are not converged.
+
+    sum_of_squares_residuals : numpy.array
+        Sum of squared residuals of each group at popt
+    """
+    xdata = np.asarray(xdata, dtype=np.float64)
+    ydata = np.asarray(ydata, dtype=np.float64)
+
+    groups, order, gidx, offsets = group_indices(group_ids)
+    n_groups = len(groups)
+    counts = np.bincount(gidx, minlength=n_groups)
+
+    X, mask = pad_groups(xdata[..., order], gidx, offsets, counts)
+    Y, _ = pad_groups(ydata[order], gidx, offsets, counts)
+
+    P = np.array(p0, dtype=np.float64, ndmin=2)
+    if P.shape[0] == 1:
+        P = np.repeat(P, n_groups, axis=0)
+    n_parameters = P.shape[1]
+
+    if bounds is None:
+        lower = np.full(n_parameters, -np.inf)
+        upper = np.full(n_parameters, np.inf)
+    else:
+        lower = np.asarray(bounds[0], dtype=np.float64)
+        upper = np.asarray(bounds[1], dtype=np.float64)
+    P = np.clip(P, lower, upper)
+
+    def _residuals(P, rows):
+        """Masked residuals (padding set to 0) for the groups in rows
+        """
+        residuals = f(X[..., rows, :], *P.T[:,:,None]) - Y[rows]
+        return np.where(mask[rows], residuals, 0.)
+
+    def _ssr(residuals):
+        ssr = (residuals*residuals).sum(axis=1)
+        ssr[~np.isfinite(ssr)] = np.inf
+        return ssr
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        ssr = _ssr(_residuals(P, np.arange(n_groups)))
+
+        lam = np.full(n_groups, 1e-3)
+        converged = np.zeros(n_groups, dtype=bool)
+        active = np.isfinite(ssr)
+
+        for iteration in range(max_iterations):
+            if not active.any():
+                break
+
+            # Restrict all work to groups that are still being fit
+            rows = np.where(active)[0]
+            P_active = P[rows]
+            r = _residuals(P_active, rows)
+            if jac is None:
+                J = _finite_difference_jacobian(f, X[..., rows, :], P_active, r + Y[rows])
+            else:
+                J = np.asarray(jac(X[..., rows, :], *P_active.T[:,:,None]))
+            J = J.reshape(len(rows), -1, n_parameters)
+            J = np.where(mask[rows,:,None] & np.isfinite(J), J, 0.)
+            r[~np.isfinite(r)] = 0
+
+            # Per-group normal equations
+            JTJ = np.einsum('gmi,gmj->gij', J, J)
+            JTr = np.einsum('gmi,gm->gi', J, r)
+
+            diag = np.einsum('gii->gi', JTJ)
+            A = JTJ.copy()
+            A[:, np.arange(n_parameters), np.arange(n_parameters)] += lam[rows,None]*np.maximum(diag, 1e-12)
+            try:
+                step = -np.linalg.solve(A, JTr[:,:,None])[:,:,0]
+            except np.linalg.LinAlgError:
+                step = -np.stack([np.linalg.lstsq(a, b, rcond=None)[0] for a, b in zip(A, JTr)])
+            step[~np.isfinite(step)] = 0
+
+            P_trial = np.clip(P_active + step, lower, upper)
+            actual_step = P_trial - P_active
+
+            ssr_trial = _ssr(_residuals(P_trial, rows))
+            ssr_old = ssr[rows]
+            accept = ssr_trial < ssr_old
+
+            step_norm = np.sqrt((actual_step*actual_step).sum(axis=1))
+            P_norm = np.sqrt((P_active*P_active).sum(axis=1))
+            # Only accepted steps count: a rejected step may be small only because the damping has grown, which is a stall rather than convergence
+            small_step = accept & (step_norm <= xtol*(P_norm + xtol))
+            small_gain = accept & ((ssr_old - ssr_trial) <= ftol*ssr_old)
+
+            # Update accepted groups, and adapt damping
+            P[rows[accept]] = P_trial[accept]
+            ssr[rows[accept]] = ssr_trial[accept]
+            lam[rows[accept]] = np.maximum(lam[rows[accept]]/10., 1e-12)
+            lam[rows[~accept]] = lam[rows[~accept]]*10.
+
+            done = small_step | small_gain
+            converged[rows[done]] = True
+            active[rows[done]] = False
+
+            # Groups whose damping explodes cannot make progress, and are reported as not converged
+            active[rows[lam[rows] > 1e16]] = False
+
+    return groups, P, converged, ssr
+
+def map_chunks(chunk_function, items, n_jobs, executor):
+    """Runs chunk_function over items, either serially or split into chunks on an executor (e.g., a process pool).
+
+    Items are dealt round-robin into n_jobs chunks, so chunks hold a similar mix of items even if items are sorted by cost.
+
+    Parameters
+    ----------
+    chunk_function : callable
+        Maps a list of items to a list of results, one per item. To run on a process pool, it must be picklable (e.g., a module-level function or a functools.partial of one).
+
+    items : list
+        Items to process
+
+    n_jobs : int
+        Number of chunks. If None or <= 1, uses the number of CPUs.
+
+    executor : concurrent.futures.Executor
+        Executor the chunks are submitted to. If None, chunk_function is called once, on all items, in this process.
+
+    Returns
+    ----------
+    results : list
+        Results in the same order as items
+    """
+    if executor is None:
+        return chunk_function(items)
+
+    if n_jobs is None or n_jobs <= 1:
+        n_jobs = os.cpu_count()
+    n_chunks = min(n_jobs, len(items))
+    chunks = [items[i::n_chunks] for i in range(n_chunks)]
+    chunk_results = list(executor.map(chunk_function, chunks))
+
+    # Restore the original order
+    results = [None,]*len(items)
+    for i, chunk_result in enumerate(chunk_results):
+        results[i::n_chunks] = chunk_result
+    return results
@@ -0,0 +1,208 @@
+#    Copyright (C) 2020 David J. Wooten
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import csv
+import operator
+import os
+
+import numpy as np
+
+from . import fit_tools
+
+try:
+    import pandas as pd
+    pandas_installed = True
+except ImportError:
+    pandas_installed = False
+
+try:
+    import pyarrow.parquet as pq
+    pyarrow_installed = True
+except ImportError:
+    pyarrow_installed = False
+
+class Screen:
+    """A long-format screen (one row per well: group id, doses of N drugs, effect), held as contiguous numpy columns sorted by group.
+
+    Rows are sorted by group once, so every group (e.g., one drug combination or plate) is a contiguous block. Blocks are returned as views into the sorted columns, without copying, in a form every model's fit() accepts. The bookkeeping arrays (group_index and offsets) can also be passed straight to batch fits such as fit_many().
+
+    Parameters
+    ----------
+    group_ids : array_like
+        Group label of each row
+
+    d : array_like
+        (M x N) doses of N drugs in each of M rows. A 1D array is treated as a single drug.
+
+    E : array_like
+        Effect in each row
+
+    Attributes
+    ----------
+    groups : numpy.array
+        Unique group labels, in sorted order
+
+    offsets : numpy.array of int
+        (n_groups + 1) row boundaries: group k is rows offsets[k]:offsets[k+1]
+
+    group_index : numpy.array of int
+        Index into groups of every (sorted) row
+
+    doses : numpy.ndarray
+        (N x M) sorted doses, one contiguous row per drug
+
+    E : numpy.array
+        Sorted effects
+    """
+    def __init__(self, group_ids, d, E):
+        d = np.asarray(d, dtype=np.float64)
+        if d.ndim == 1:
+            d = d[:,np.newaxis]
+        E = np.asarray(E, dtype=np.float64)
+
+        self.groups, order, self.group_index, offsets = fit_tools.group_indices(group_ids)
+        self.offsets = np.append(offsets, len(order))
+        self.doses = np.ascontiguousarray(d[order].T)
+        self.E = E[order]
+
+    @property
+    def d(self):
+        """(M x N) view of the sorted doses"""
+        return self.doses.T
+
+    @property
+    def n_drugs(self):
+        return self.doses.shape[0]
+
+    @property
+    def n_rows(self):
+        return len(self.E)
+
+    @property
+    def sizes(self):
+        """Number of rows in each group"""
+        return np.diff(self.offsets)
+
+    def __len__(self):
+        return len(self.groups)
+
+    def __iter__(self):
+        """Yields (group, d, E) for each group, in sorted order. d is an (n_rows x N) view, E an (n_rows) view."""
+        for k in range(len(self.groups)):
+            yield (self.groups[k],) + self.block(k)
+
+    def block(self, k):
+        """Returns (d, E) views of the k'th group
+
+        Returns
+        ----------
+        d : numpy.ndarray
+            (n_rows x N) doses. For two-drug models, d[:,0] and d[:,1] are d1 and d2.
+
+        E : numpy.array
+            Effects
+        """
+        start, end = self.offsets[k], self.offsets[k+1]
+        return self.doses[:,start:end].T, self.E[start:end]
+
+    def get(self, group):
+        """Returns (d, E) views of the group labelled group (see block())
+        """
+        k = np.searchsorted(self.groups, group)
+        if k >= len(self.groups) or self.groups[k] != group:
+            raise KeyError(group)
+        return self.block(k)
+
+    def as_plates(self):
+        """Returns every group as one row of a stack of plates, for fit_plates(). All groups must have the same number of rows.
+
+        Returns
+        ----------
+        doses : numpy.ndarray
+            (N x n_groups x n_rows) view of the doses. For two-drug models, doses[0] and doses[1] are d1 and d2.
+
+        E : numpy.ndarray
+            (n_groups x n_rows) view of the effects
+        """
+        sizes = self.sizes
+        if len(sizes) == 0 or np.any(sizes != sizes[0]):
+            raise ValueError("as_plates() requires every group to have the same number of rows")
+        return self.doses.reshape(self.n_drugs, len(sizes), sizes[0]), self.E.reshape(len(sizes), sizes[0])
+
+def read_screen(path, group_column="combination_id", dose_columns=("drug1.conc", "drug2.conc"), effect_column="effect", delimiter=",", file_format=None):
+    """Reads a long-format screen into a Screen.
+
+    Only the named columns are read. CSV files are parsed with pandas' reader when pandas is installed, and with numpy otherwise. Either way, empty dose and effect cells are read as nan. Parquet files require pyarrow.
+
+    Parameters
+    ----------
+    path : str
+        File to read
+
+    group_column : str , default="combination_id"
+        Column identifying the group (e.g., drug combination) of each row. Group labels in CSV files are read as strings.
+
+    dose_columns : list of str , default=("drug1.conc", "drug2.conc")
+        Dose column of each drug
+
+    effect_column : str , default="effect"
+        Effect column
+
+    delimiter : str , default=","
+        CSV field delimiter
+
+    file_format : str , default=None
+        "csv" or "parquet". If None, files ending in .parquet or .pq are read as Parquet, and anything else as CSV.
+
+    Returns
+    ----------
+    screen : Screen
+    """
+    dose_columns = list(dose_columns)
+    if file_format is None:
+        file_format = "parquet" if os.path.splitext(path)[1].lower() in (".parquet", ".pq") else "csv"
+
+    if file_format == "parquet":
+        if not pyarrow_installed:
+            raise ImportError("Reading Parquet files requires pyarrow")
+        table = pq.read_table(path, columns=[group_column] + dose_columns + [effect_column])
+        group_ids = table.column(group_column).to_numpy()
+        d = np.column_stack([table.column(name).to_numpy() for name in dose_columns])
+        E = table.column(effect_column).to_numpy()
+        return Screen(group_ids, d, E)
+
+    if pandas_installed:
+        df = pd.read_csv(path, sep=delimiter, usecols=[group_column] + dose_columns + [effect_column], dtype={group_column: str})
+        return Screen(df[group_column].to_numpy(dtype=str), df[dose_columns].to_numpy(dtype=np.float64), df[effect_column].to_numpy(dtype=np.float64))
+
+    with open(path, newline="") as f:
+        reader = csv.reader(f, delimiter=delimiter)
+        header = next(reader)
+        get_columns = operator.itemgetter(*[header.index(name) for name in [group_column] + dose_columns + [effect_column]])
+        columns = list(zip(*[get_columns(row) for row in reader if row]))
+    if len(columns) == 0:
+        columns = [()]*(len(dose_columns)+2)
+
+    group_ids = np.array(columns[0], dtype=str)
+    values = np.column_stack([_parse_floats(column) for column in columns[1:]])
+    return Screen(group_ids, values[:,:-1], values[:,-1])
+
+def _parse_floats(column):
+    """Converts a column of CSV fields to floats. Empty cells are read as nan, as pandas does.
+    """
+    try:
+        return np.asarray(column, dtype=np.float64)
+    except ValueError:
+        return np.asarray([value if value.strip() else "nan" for value in column], dtype=np.float64)
@@ -0,0 +1,370 @@
+#    Copyright (C) 2020 David J. Wooten
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import importlib
+import inspect
+import json
+import struct
+
+import numpy as np
+
+MAGIC = b"SYNM"
+VERSION = 1
+
+# magic, version, header length
+_PREAMBLE = struct.Struct("<4sHI")
+
+class SerializableModel:
+    """Mixin giving parametric models a portable serialized form.
+
+    A model's state (its bounds, variant, parameters, fit scores, bootstrap_parameters, and anything else it stores) is written without the fit_function and jacobian_function lambdas, which cannot be pickled or shared across versions. Restored models rebuild these lambdas the first time they are used, so loading a model (or many at once, see to_bytes()) never re-runs a fit or even __init__().
+    """
+
+    # Cached attributes that are not serialized. They are restored as None, and must be rebuilt by the model when needed.
+    _transient_attributes = ()
+
+    def __getstate__(self):
+        """fit_function and jacobian_function are lambdas, which cannot be pickled. They are dropped here and rebuilt by __setstate__().
+        """
+        state = self.__dict__.copy()
+        state.pop('fit_function', None)
+        state.pop('jacobian_function', None)
+        return state
+
+    def __setstate__(self, state):
+        """Rebuilds fit_function and jacobian_function by re-running __init__() with the stored constructor arguments (every model stores its constructor arguments as attributes of the same name), then restores the pickled state.
+        """
+        init_parameters = inspect.signature(self.__class__.__init__).parameters
+        init_kwargs = {key: state[key] for key in init_parameters if key in state}
+        self.__init__(**init_kwargs)
+        self.__dict__.update(state)
+
+    def __getattr__(self, name):
+        """Only called for missing attributes: rebuilds fit_function and jacobian_function of a deserialized model on first use.
+        """
+        if name in ('fit_function', 'jacobian_function'):
+            self.__setstate__(self.__getstate__())
+            return self.__dict__.get(name)
+        raise AttributeError("'%s' object has no attribute '%s'"%(type(self).__name__, name))
+
+    def to_dict(self):
+        """Returns this model as a JSON-compatible dict (see synergy.utils.serialization.to_dict())
+        """
+        return to_dict(self)
+
+    def to_json(self):
+        """Returns this model as a JSON string (see synergy.utils.serialization.to_dict())
+        """
+        return json.dumps(to_dict(self))
+
+    def to_bytes(self):
+        """Returns this model in the compact binary layout of synergy.utils.serialization.to_bytes()
+        """
+        return to_bytes(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Restores a model written by to_dict()
+        """
+        return _check_class(from_dict(data), cls)
+
+    @classmethod
+    def from_json(cls, text):
+        """Restores a model written by to_json()
+        """
+        return _check_class(from_dict(json.loads(text)), cls)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Restores a model written by to_bytes()
+        """
+        return _check_class(from_bytes(data), cls)
+
+def to_dict(model):
+    """Returns a model's state as a JSON-compatible dict.
+
+    Tuples (e.g., bounds) are written as lists and numpy arrays as {"array", "dtype", "shape"} dicts. Infinite bounds are written as floats, which json.dumps() writes as Infinity.
+
+    Parameters
+    ----------
+    model : SerializableModel
+        A (fit or unfit) model
+
+    Returns
+    ----------
+    data : dict
+        {"version", "class", "state"}
+    """
+    return {"version": VERSION, "class": _class_path(type(model)), "state": {name: _encode(value) for name, value in _get_state(model).items()}}
+
+def from_dict(data):
+    """Restores a model from to_dict()
+
+    Parameters
+    ----------
+    data : dict
+        Output of to_dict()
+
+    Returns
+    ----------
+    model : SerializableModel
+    """
+    _check_version(data["version"])
+    cls = _resolve_class(data["class"])
+    return _restore(cls, {name: _decode(value) for name, value in data["state"].items()})
+
+def to_bytes(models):
+    """Serializes one model, or many models of the same class, in a compact, versioned binary layout.
+
+    The layout is a preamble (magic b"SYNM", uint16 version, uint32 header length), a JSON header describing every attribute, and a body of little-endian arrays, each aligned to 8 bytes. Across many models, each numeric attribute is written as one column (e.g., E0 of every model is one float64 array), attributes that are the same for every model (e.g., bounds) are written once, and arrays (e.g., bootstrap_parameters) are concatenated along their first axis with an offset index. Loading 100,000 models therefore costs a handful of numpy reads and one Python object per model.
+
+    Parameters
+    ----------
+    models : SerializableModel or list of SerializableModel
+        Models to write. All must be of the same class and have the same attributes.
+
+    Returns
+    ----------
+    data : bytes
+    """
+    single = isinstance(models, SerializableModel)
+    if single:
+        models = [models]
+    if len(models) == 0:
+        raise ValueError("No models to serialize")
+
+    cls = type(models[0])
+    states = [_get_state(model) for model in models]
+    names = list(states[0])
+    for model, state in zip(models, states):
+        if type(model) is not cls:
+            raise ValueError("All models must be of the same class (found %s and %s)"%(cls.__name__, type(model).__name__))
+        if state.keys() != states[0].keys():
+            raise ValueError("All models must have the same attributes")
+
+    n = len(models)
+    body = []
+    body_length = [0]
+    def write(array):
+        array = np.ascontiguousarray(array)
+        offset = body_length[0]
+        padding = -array.nbytes % 8
+        body.append(array.tobytes() + b"\0"*padding)
+        body_length[0] += array.nbytes + padding
+        return offset
+
+    fields = []
+    for name in names:
+        values = [state[name] for state in states]
+        field = {"name": name}
+        present = [value for value in values if value is not None]
+        nulls = np.array([value is None for value in values], dtype=np.uint8)
+        types = set(map(type, present))
+
+        if types == {np.ndarray} and all(_is_numeric_array(value) for value in present) and len(set((value.dtype.str, value.shape[1:]) for value in present)) == 1:
+            lengths = np.array([0 if value is None else len(value) for value in values], dtype=np.int64)
+            field["kind"] = "ragged"
+            field["dtype"] = present[0].dtype.newbyteorder("<").str
+            field["shape"] = list(present[0].shape[1:])
+            field["data"] = write(np.concatenate(present).astype(field["dtype"]))
+            field["offsets"] = write(np.append(0, np.cumsum(lengths)))
+        elif types and all(issubclass(t, (bool, np.bool_)) for t in types):
+            field["kind"] = "column"
+            field["dtype"] = "|b1"
+            field["data"] = write(np.array([bool(value) for value in values], dtype=np.bool_))
+        elif types and all(_is_number_type(t) for t in types):
+            field["kind"] = "column"
+            integer = all(issubclass(t, (int, np.integer)) for t in types)
+            field["dtype"] = "<i8" if integer else "<f8"
+            fill = 0 if integer else np.nan
+            field["data"] = write(np.array([fill if value is None else value for value in values], dtype=field["dtype"]))
+        else:
+            if _is_constant(values):
+                field["kind"] = "constant"
+                field["value"] = _encode(values[0])
+            else:
+                field["kind"] = "values"
+                field["values"] = [_encode(value) for value in values]
+
+        if field["kind"] in ("ragged", "column"):
+            field["nulls"] = write(nulls) if nulls.any() else None
+        fields.append(field)
+
+    header = json.dumps({"class": _class_path(cls), "n_models": n, "single": single, "fields": fields}).encode()
+    preamble = _PREAMBLE.pack(MAGIC, VERSION, len(header))
+    padding = -(len(preamble) + len(header)) % 8
+    return b"".join([preamble, header, b"\0"*padding] + body)
+
+def from_bytes(data):
+    """Restores models written by to_bytes().
+
+    Parameters
+    ----------
+    data : bytes-like
+        Output of to_bytes(). Any object supporting the buffer protocol (e.g., a memoryview or mmap) may be used.
+
+    Returns
+    ----------
+    models : SerializableModel or list of SerializableModel
+        A single model if to_bytes() was given a single model, otherwise a list
+    """
+    if len(data) < _PREAMBLE.size:
+        raise ValueError("Data is not a serialized synergy model")
+    magic, version, header_length = _PREAMBLE.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Data is not a serialized synergy model")
+    _check_version(version)
+
+    header_start = _PREAMBLE.size
+    header = json.loads(bytes(data[header_start:header_start+header_length]))
+    body_start = header_start + header_length
+    body_start += -body_start % 8
+
+    cls = _resolve_class(header["class"])
+    n = header["n_models"]
+
+    def read(offset, dtype, count):
+        return np.frombuffer(data, dtype=dtype, count=count, offset=body_start+offset)
+
+    names = []
+    columns = []
+    constants = dict()
+    for field in header["fields"]:
+        kind = field["kind"]
+        if kind == "constant":
+            constants[field["name"]] = _decode(field["value"])
+            continue
+
+        if kind == "values":
+            values = [_decode(value) for value in field["values"]]
+        elif kind == "column":
+            values = read(field["data"], field["dtype"], n).tolist()
+        elif kind == "ragged":
+            offsets = read(field["offsets"], np.int64, n+1)
+            shape = tuple(field["shape"])
+            array = read(field["data"], field["dtype"], int(offsets[-1])*int(np.prod(shape))).reshape((-1,)+shape).copy()
+            offsets = offsets.tolist()
+            values = [array[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+        else:
+            raise ValueError("Unknown field kind %s"%kind)
+
+        if field.get("nulls") is not None:
+            for i in np.flatnonzero(read(field["nulls"], np.uint8, n)):
+                values[i] = None
+        names.append(field["name"])
+        columns.append(values)
+
+    models = [cls.__new__(cls) for i in range(n)]
+    for model, row in zip(models, zip(*columns) if columns else [()]*n):
+        state = constants.copy()
+        state.update(zip(names, row))
+        model.__dict__ = state
+
+    if header["single"]:
+        return models[0]
+    return models
+
+def _get_state(model):
+    """A model's serializable attributes
+    """
+    state = model.__getstate__()
+    for name in model._transient_attributes:
+        state[name] = None
+    return state
+
+def _restore(cls, state):
+    """Creates a model from its state, without calling __init__() (fit_function and jacobian_function are rebuilt on first use)
+    """
+    model = cls.__new__(cls)
+    model.__dict__ = state
+    return model
+
+def _class_path(cls):
+    return "%s:%s"%(cls.__module__, cls.__qualname__)
+
+def _resolve_class(path):
+    """Imports the class named by _class_path(). Only SerializableModel subclasses may be restored, and only synergy's own modules are imported, so that data cannot import arbitrary modules.
+    """
+    module, _, qualname = path.partition(":")
+    if module != "synergy" and not module.startswith("synergy."):
+        raise ValueError("%s is not a serializable synergy model"%path)
+    cls = importlib.import_module(module)
+    for name in qualname.split("."):
+        cls = getattr(cls, name)
+    if not (inspect.isclass(cls) and issubclass(cls, SerializableModel)):
+        raise ValueError("%s is not a serializable synergy model"%path)
+    return cls
+
+def _check_version(version):
+    if version > VERSION:
+        raise ValueError("Serialized with format version %d, but this version of synergy only reads up to version %d"%(version, VERSION))
+
+def _check_class(model, cls):
+    if not isinstance(model, cls):
+        raise TypeError("Serialized model is a %s, not a %s"%(type(model).__name__, cls.__name__))
+    return model
+
+def _is_number_type(t):
+    return issubclass(t, (int, float, np.integer, np.floating)) and not issubclass(t, (bool, np.bool_))
+
+def _is_numeric_array(value):
+    return isinstance(value, np.ndarray) and value.ndim > 0 and value.dtype.kind in "biuf"
+
+def _is_constant(values):
+    """True if every value equals the first, and the first is immutable (so one copy can be shared by every restored model)
+    """
+    first = values[0]
+    if not _is_immutable(first):
+        return False
+    try:
+        return all(value is first or (type(value) is type(first) and value == first) for value in values)
+    except ValueError:
+        # e.g., a tuple holding arrays
+        return False
+
+def _is_immutable(value):
+    if isinstance(value, tuple):
+        return all(_is_immutable(item) for item in value)
+    return value is None or isinstance(value, (str, bool, np.bool_)) or _is_number_type(type(value))
+
+def _encode(value):
+    """Converts a value to JSON-compatible types. Tuples become lists, while lists and arrays become tagged dicts.
+    """
+    if value is None or isinstance(value, (str, bool)):
+        return value
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return float(value)
+    if isinstance(value, tuple):
+        return [_encode(item) for item in value]
+    if isinstance(value, list):
+        return {"list": [_encode(item) for item in value]}
+    if isinstance(value, np.ndarray) and value.dtype.kind in "biuf":
+        return {"array": value.ravel().tolist(), "dtype": value.dtype.newbyteorder("<").str, "shape": list(value.shape)}
+    raise TypeError("Cannot serialize values of type %s"%type(value).__name__)
+
+def _decode(value):
+    """Inverse of _encode()
+    """
+    if isinstance(value, list):
+        return tuple(_decode(item) for item in value)
+    if isinstance(value, dict):
+        if "list" in value:
+            return [_decode(item) for item in value["list"]]
+        return np.array(value["array"], dtype=value["dtype"]).reshape(value["shape"])
+    return value
@@ -0,0 +1,134 @@
+#    Copyright (C) 2020 David J. Wooten
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+
+class SurfaceMetrics:
+    """Accumulates scalar summaries of a synergy surface, one chunk of wells at a time, so the surface itself never has to be held in memory.
+
+    Only combination wells (every drug above its minimum dose) are summarized. Wells whose synergy is nan are skipped.
+
+    Parameters
+    ----------
+    grid : synergy.utils.dose_tools.DoseGrid
+        Doses of every well
+
+    null : float , default=0
+        Synergy of an additive combination (e.g., 0 for Bliss, 1 for the combination index)
+
+    sign : int , default=1
+        1 if larger synergy values are more synergistic, -1 if smaller values are (e.g., the combination index)
+
+    window : array_like , default=None
+        (low, high) dose bounds for each drug. max_synergy and max_antagonism are only taken over wells in this window. If None, every combination well is used.
+    """
+    def __init__(self, grid, null=0, sign=1, window=None):
+        self.grid = grid
+        self.null = null
+        self.sign = sign
+        self.window = None if window is None else np.asarray(window, dtype=np.float64)
+
+        self._log_dose_widths = [_log_dose_widths(levels) for levels in grid.levels]
+
+        self.n_wells = 0
+        self.total = 0.
+        self.volume = 0.
+        self.max_synergy = np.nan
+        self.max_antagonism = np.nan
+        self.n_synergistic = 0
+        self.n_significant = None
+
+    def update(self, rows, synergy, lower=None, upper=None):
+        """Adds a chunk of wells
+
+        Parameters
+        ----------
+        rows : slice or array_like
+            Which wells of the grid this chunk holds
+
+        synergy : array_like
+            Synergy of each well in the chunk
+
+        lower, upper : array_like , default=None
+            Bootstrap percentile bands of each well's synergy (see get_synergy_range()). If given, wells whose whole band is synergistic are counted as significantly synergistic.
+        """
+        synergy = np.asarray(synergy, dtype=np.float64)
+        codes = self.grid.codes[rows]
+        scored = (codes > 0).all(axis=1) & ~np.isnan(synergy)
+        if not scored.any():
+            return
+
+        values = synergy[scored]
+        self.n_wells += len(values)
+        self.total += values.sum()
+
+        # Each dose combination covers a cell of log-dose space, which is shared between its replicates
+        weights = 1. / self.grid.n_replicates[self.grid.replicates[rows][scored]]
+        for i, widths in enumerate(self._log_dose_widths):
+            weights = weights * widths[codes[scored,i]]
+        self.volume += (weights*values).sum()
+
+        in_window = np.ones(len(values), dtype=bool)
+        if self.window is not None:
+            d = self.grid.d[rows][scored]
+            in_window = ((d >= self.window[:,0]) & (d <= self.window[:,1])).all(axis=1)
+        if in_window.any():
+            oriented = self.sign*values[in_window]
+            self.max_synergy = np.nanmax([self.sign*self.max_synergy, oriented.max()])*self.sign
+            self.max_antagonism = np.nanmin([self.sign*self.max_antagonism, oriented.min()])*self.sign
+
+        self.n_synergistic += int(self._is_synergistic(values).sum())
+        if lower is not None and upper is not None:
+            significant = self._is_synergistic(np.asarray(lower)[scored]) & self._is_synergistic(np.asarray(upper)[scored])
+            self.n_significant = (self.n_significant or 0) + int(significant.sum())
+
+    def result(self):
+        """Returns the summaries of every well added so far
+
+        Returns
+        ----------
+        metrics : dict
+            "n_wells": number of combination wells summarized
+            "mean": mean synergy
+            "volume": synergy integrated over log10-dose space (the sum of each combination's mean synergy times the log-dose area or volume it covers)
+            "max_synergy": the most synergistic value (in the window, if given)
+            "max_antagonism": the most antagonistic value (in the window, if given)
+            "fraction_synergistic": fraction of wells more synergistic than null
+            "fraction_significant": fraction of wells whose whole bootstrap band is more synergistic than null, or None if no bands were given
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            n_wells = np.float64(self.n_wells)
+            metrics = dict()
+            metrics['n_wells'] = self.n_wells
+            metrics['mean'] = float(self.total / n_wells)
+            metrics['volume'] = float(self.volume)
+            metrics['max_synergy'] = float(self.max_synergy)
+            metrics['max_antagonism'] = float(self.max_antagonism)
+            metrics['fraction_synergistic'] = float(self.n_synergistic / n_wells)
+            metrics['fraction_significant'] = None if self.n_significant is None else float(self.n_significant / n_wells)
+        return metrics
+
+    def _is_synergistic(self, synergy):
+        with np.errstate(invalid='ignore'):
+            return self.sign*(synergy - self.null) > 0
+
+def _log_dose_widths(levels):
+    """Width in log10-dose of the cell around each dose level, with cell edges halfway between neighboring levels. The minimum (control) level gets width 0, and a drug with a single level above its minimum gets width 1.
+    """
+    x = np.log10(levels[1:])
+    if len(x) < 2:
+        return np.append(0., np.ones(len(x)))
+    edges = np.concatenate([[1.5*x[0]-0.5*x[1]], (x[1:]+x[:-1])/2., [1.5*x[-1]-0.5*x[-2]]])
+    return np.append(0., np.diff(edges))
@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+@pytest.fixture
+def check_jacobian():
+    """Returns a function that asserts a model's analytic jacobian_function matches central differences of its fit_function
+    """
+    def check(model, d, p, eps=1e-6, atol=1e-6):
+        p = np.asarray(p, dtype=np.float64)
+        jac = model.jacobian_function(d, *p)
+
+        fd = []
+        for i in range(len(p)):
+            pp, pm = p.copy(), p.copy()
+            pp[i] += eps
+            pm[i] -= eps
+            with np.errstate(divide='ignore'):
+                fd.append((model.fit_function(d, *pp) - model.fit_function(d, *pm))/(2*eps))
+
+        assert np.allclose(jac, np.array(fd).T, atol=atol)
+    return check
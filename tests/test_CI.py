@@ -50,3 +50,29 @@ def test_CI_msp_3():
     synergy = model.fit(d, E)
     assert np.nanmax(np.abs(np.log(synergy)))>1
 
+
+def test_hill_ci_fit_many():
+    import numpy as np
+    from synergy.single import Hill, Hill_CI
+
+    np.random.seed(0)
+    d = np.logspace(-3, 1, 12)
+    n_curves = 50
+    D = np.tile(d, n_curves)
+    groups = np.repeat(np.arange(n_curves), len(d))
+    E = Hill(E0=1, Emax=0, h=1.3, C=0.1).E(D) + np.random.normal(0, 0.05, len(D))
+
+    table = Hill_CI().fit_many(D, E, groups)
+    for i in range(n_curves):
+        model = Hill_CI()
+        model.fit(D[groups==i], E[groups==i])
+        assert np.isclose(table['h'][i], model.h)
+        assert np.isclose(table['C'][i], model.C)
+        assert np.isclose(table['r_squared'][i], model.r_squared)
+
+    # Bootstrapped confidence intervals contain the fit
+    model = Hill_CI()
+    model.fit(d, E[:len(d)], bootstrap_iterations=200)
+    assert model.bootstrap_parameters.shape[1] == 2
+    lower, upper = model.get_parameter_range()
+    assert np.all((lower < [model.h, model.C]) & ([model.h, model.C] < upper))
@@ -47,3 +47,171 @@ def test_bliss_msp_3():
     synergy = model.fit(d, E)
     assert np.nanmax(np.abs(synergy))<0.11
 
+
+def test_bliss_plates():
+    import numpy as np
+    from synergy.combination import Bliss
+    from synergy.datasets import bliss_independent
+
+    d1, d2, E = bliss_independent()
+    E = np.vstack([E, E + np.random.normal(0, 0.05, len(E))])
+
+    synergy = Bliss().fit_plates(d1, d2, E)
+    for plate in range(E.shape[0]):
+        assert np.allclose(synergy[plate], Bliss().fit(d1, d2, E[plate]), equal_nan=True)
+
+def test_dose_grid_higher():
+    import numpy as np
+    from synergy.higher import Bliss, HSA, Loewe, Schindler, CombinationIndex
+    from synergy.datasets import bliss_independent_3
+    from synergy.utils.dose_tools import DoseGrid
+
+    d, E = bliss_independent_3()
+    # Replicate every well, so the grid has to map each combination to two samples
+    d = np.vstack([d, d])
+    np.random.seed(0)
+    E = np.hstack([E, E]) + 0.001*np.random.randn(2*len(E))
+
+    grid = DoseGrid(d)
+    n = d.shape[1]
+    assert np.allclose(grid.combinations[grid.replicates], d)
+    assert np.all(grid.n_replicates == 2)
+    for i in range(n):
+        assert np.allclose(grid.levels[i][grid.codes[:,i]], d[:,i])
+
+        # Same slice as masking every other drug at its minimum
+        mask = np.ones(len(d), dtype=bool)
+        for j in range(n):
+            if i != j:
+                mask = mask & (d[:,j]==np.min(d[:,j]))
+        assert np.array_equal(grid.single_drug_mask(i), mask)
+
+    for idx in range(2**n):
+        mask = np.ones(len(d), dtype=bool)
+        for i in range(n):
+            mask = mask & (d[:,i]==(np.max(d[:,i]) if (idx >> i) & 1 else np.min(d[:,i])))
+        assert np.array_equal(grid.corner_mask(idx), mask)
+
+    for model_class in [Bliss, HSA, Loewe, Schindler, CombinationIndex]:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            synergy_raw = model_class().fit(d, E)
+            synergy_grid = model_class().fit(grid, E)
+        assert np.allclose(synergy_raw, synergy_grid, equal_nan=True)
+
+def test_bliss_bootstrap():
+    import numpy as np
+    from synergy.combination import Bliss, ZIP
+    from synergy.single import Hill
+    from synergy.utils.dose_tools import grid
+
+    d1, d2 = grid(1e-3, 10, 1e-3, 10, 6, 6, include_zero=True)
+    E = Hill(E0=1, Emax=0.1, h=1.2, C=0.1).E(d1) * Hill(E0=1, Emax=0.2, h=0.9, C=0.5).E(d2)
+
+    # Without replicates, every resample is the plate itself
+    model = Bliss()
+    synergy = model.fit(d1, d2, E)
+    assert model.bootstrap(d1, d2, E, bootstrap_iterations=5).shape == (5, len(E))
+    assert np.allclose(model.get_synergy_range(), synergy)
+
+    # With replicates, the bands are reproducible with a seed and contain the fit
+    d1, d2, E = np.tile(d1, 3), np.tile(d2, 3), np.tile(E, 3)
+    np.random.seed(0)
+    E = E + np.random.normal(0, 0.03, len(E))
+    synergy = model.fit(d1, d2, E)
+    bootstrap_synergy = model.bootstrap(d1, d2, E, bootstrap_iterations=100, seed=1)
+    assert np.allclose(bootstrap_synergy, Bliss().bootstrap(d1, d2, E, bootstrap_iterations=100, seed=1))
+
+    lower, upper = model.get_synergy_range(95)
+    assert np.all(upper >= lower)
+    assert np.any(upper > lower)
+    assert np.all((synergy >= lower - 1e-9) & (synergy <= upper + 1e-9))
+
+    # ZIP scores resamples with its own batched slice fits
+    assert ZIP().bootstrap(d1, d2, E, bootstrap_iterations=2, seed=1).shape == (2, len(E))
+
+def test_bliss_fit_metrics():
+    import numpy as np
+    from synergy.combination import Bliss
+    from synergy import higher
+    from synergy.single import Hill
+    from synergy.utils.dose_tools import grid, grid_multi
+
+    d1, d2 = grid(1e-3, 10, 1e-3, 10, 5, 5, include_zero=True)
+    np.random.seed(0)
+    E = Hill(E0=1, Emax=0.1, h=1.2, C=0.1).E(d1) * Hill(E0=1, Emax=0.2, h=0.9, C=0.5).E(d2) + np.random.normal(0, 0.03, len(d1))
+
+    # Summaries streamed in small chunks match those of the full surface
+    synergy = Bliss().fit(d1, d2, E)
+    combination = (d1 > 0) & (d2 > 0)
+    metrics = Bliss().fit_metrics(d1, d2, E, chunk_size=7)
+    assert metrics['n_wells'] == combination.sum()
+    assert np.isclose(metrics['mean'], synergy[combination].mean())
+    assert np.isclose(metrics['max_synergy'], synergy[combination].max())
+    assert np.isclose(metrics['fraction_synergistic'], (synergy[combination] > 0).mean())
+    assert metrics['fraction_significant'] is None
+
+    # Doses are evenly spaced by 1 log10 unit, so each well covers a unit of log-dose area
+    assert np.isclose(metrics['volume'], synergy[combination].sum())
+
+    window = [(1e-2, 1), (1e-2, 1)]
+    in_window = combination & (d1 >= 1e-2) & (d1 <= 1) & (d2 >= 1e-2) & (d2 <= 1)
+    assert np.isclose(Bliss().fit_metrics(d1, d2, E, window=window)['max_synergy'], synergy[in_window].max())
+
+    d = grid_multi((1e-3,)*3, (1,)*3, (4,)*3, include_zero=True)
+    d = np.vstack([d, d])
+    E = np.prod([Hill(E0=1, Emax=0.1, h=1, C=0.1).E(d[:,i]) for i in range(3)], axis=0) + np.random.normal(0, 0.02, len(d))
+    synergy = higher.Bliss().fit(d, E)
+    combination = (d > 0).all(axis=1)
+    metrics = higher.Bliss().fit_metrics(d, E, chunk_size=10, bootstrap_iterations=20, seed=0)
+    assert np.isclose(metrics['mean'], synergy[combination].mean())
+    assert 0 <= metrics['fraction_significant'] <= metrics['fraction_synergistic']
+
+def test_bliss_fit_metrics_bootstrap(monkeypatch):
+    import numpy as np
+    from synergy.combination import Bliss
+    from synergy import higher
+    from synergy.single import Hill
+    from synergy.utils import surface_metrics
+    from synergy.utils.dose_tools import grid, grid_multi
+
+    # Record the bands of every chunk
+    bands = []
+    update = surface_metrics.SurfaceMetrics.update
+    def recording_update(self, rows, synergy, lower=None, upper=None):
+        bands.append((rows, lower, upper))
+        return update(self, rows, synergy, lower, upper)
+    monkeypatch.setattr(surface_metrics.SurfaceMetrics, "update", recording_update)
+
+    def streamed_bands(n_wells):
+        streamed = np.full((2, n_wells), np.nan)
+        for rows, lower, upper in bands:
+            streamed[:, rows] = lower, upper
+        del bands[:]
+        return streamed
+
+    d1, d2 = grid(1e-3, 10, 1e-3, 10, 5, 5, include_zero=True)
+    d1, d2 = np.tile(d1, 3), np.tile(d2, 3)
+    np.random.seed(0)
+    E = Hill(E0=1, Emax=0.1, h=1.2, C=0.1).E(d1) * Hill(E0=1, Emax=0.2, h=0.9, C=0.5).E(d2) + np.random.normal(0, 0.03, len(d1))
+
+    # The same seed gives the bands of bootstrap(), whatever the chunk size
+    model = Bliss()
+    model.fit(d1, d2, E)
+    model.bootstrap(d1, d2, E, bootstrap_iterations=20, seed=1)
+    expected = model.get_synergy_range()
+    combination = (d1 > 0) & (d2 > 0)
+    for chunk_size in [20, 140, 65536]:
+        Bliss().fit_metrics(d1, d2, E, bootstrap_iterations=20, seed=1, chunk_size=chunk_size)
+        assert np.allclose(streamed_bands(len(E))[:, combination], expected[:, combination])
+
+    d = grid_multi((1e-3,)*3, (1,)*3, (4,)*3, include_zero=True)
+    d = np.vstack([d, d])
+    E = np.prod([Hill(E0=1, Emax=0.1, h=1, C=0.1).E(d[:,i]) for i in range(3)], axis=0) + np.random.normal(0, 0.02, len(d))
+    model = higher.Bliss()
+    model.fit(d, E)
+    model.bootstrap(d, E, bootstrap_iterations=20, seed=1)
+    expected = model.get_synergy_range()
+    combination = (d > 0).all(axis=1)
+    for chunk_size in [20, 200, 65536]:
+        higher.Bliss().fit_metrics(d, E, bootstrap_iterations=20, seed=1, chunk_size=chunk_size)
+        assert np.allclose(streamed_bands(len(E))[:, combination], expected[:, combination])
@@ -0,0 +1,64 @@
+def test_bootstrap_store():
+    import numpy as np
+    import tempfile
+    from synergy import utils
+    from synergy.single import Hill
+
+    np.random.seed(0)
+    d = np.logspace(-3, 1, 10)
+    models = dict()
+    for i in range(6):
+        model = Hill()
+        model.fit(d, Hill(E0=1, Emax=0, h=1+0.2*i, C=0.1).E(d) + np.random.normal(0, 0.05, len(d)), bootstrap_iterations=10+i%2)
+        models["pair_%d"%i] = model
+    models["unfit"] = Hill(E0=1, Emax=0, h=1, C=0.1)
+
+    path = tempfile.mkdtemp()
+    # A small capacity forces the file to grow
+    store = utils.bootstrap_store.BootstrapStore(path, n_parameters=4, capacity=8)
+    expected = dict()
+    for key, model in models.items():
+        expected[key] = model.get_parameter_range()
+        store.add(key, model)
+        if expected[key] is not None:
+            assert np.array_equal(model.get_parameter_range(), expected[key])
+    assert "unfit" not in store and len(store) == 6
+    store.flush()
+
+    # Restored models read their blocks from the store
+    store = utils.bootstrap_store.BootstrapStore(path, mode="r")
+    for key, model in models.items():
+        restored = store.attach(key, Hill.from_bytes(model.to_bytes()))
+        if expected[key] is None:
+            assert restored.bootstrap_parameters is None
+        else:
+            assert np.shares_memory(restored.bootstrap_parameters, store._data)
+            assert np.allclose(restored.get_parameter_range(), expected[key])
+
+    # Screen-wide percentiles are computed chunk by chunk
+    ranges = store.parameter_ranges(chunk_rows=15)
+    assert ranges.shape == (6, 2, 4)
+    for key, bands in zip(store.keys(), ranges):
+        assert np.allclose(bands, expected[key])
+
+def test_bootstrap_store_int_keys():
+    import numpy as np
+    import pytest
+    import tempfile
+    from synergy import utils
+
+    path = tempfile.mkdtemp()
+    store = utils.bootstrap_store.BootstrapStore(path, n_parameters=2)
+    for key in range(1, 4):
+        store.append(np.int64(key), np.full((3, 2), key))
+
+    # Mixing key types would not survive the index
+    with pytest.raises(TypeError):
+        store.append("a", np.zeros((3, 2)))
+    store.flush()
+
+    # Integer keys come back as integers
+    store = utils.bootstrap_store.BootstrapStore(path, mode="r")
+    assert store.keys() == [1, 2, 3]
+    assert all(type(key) is int for key in store.keys())
+    assert np.array_equal(store[3], np.full((3, 2), 3))
@@ -76,4 +76,46 @@ def test_braid_both():
 
     model.fit(D1, D2, Efit)
 
-    assert model.r_squared > 0.9
\ No newline at end of file
+    assert model.r_squared > 0.9
+
+def test_braid_jacobian(check_jacobian):
+    import numpy as np
+    from synergy.combination import BRAID
+    from synergy.utils.dose_tools import grid
+
+    D1, D2 = grid(1e-3,1e0,1e-2,1e1,8,12, include_zero=True)
+
+    # E1 and E3 in turn set the maximum effect
+    for params in [[1, 0.2, 0.1, 0, np.log(2.3), np.log(0.8), np.log(1e-2), np.log(1e-1), 1, np.log(0.5)], \
+                   [1, 0, 0.5, 0.2, np.log(0.7), np.log(2.), np.log(1e-2), np.log(1e-1), -0.5, np.log(1.5)]]:
+        for variant, idx in [("kappa", list(range(9))), ("delta", list(range(8))+[9]), ("both", list(range(10)))]:
+            model = BRAID(variant=variant)
+            p = np.asarray(params, dtype=float)[idx]
+
+            check_jacobian(model, (D1, D2), p)
+
+def test_braid_multistart():
+    import numpy as np
+    from synergy.combination import BRAID
+    from synergy.utils.dose_tools import grid
+
+    model = BRAID(E0=1, E1=0.2, E2=0.1, E3=0, h1=2.3, h2=0.8, C1=1e-2, C2=1e-1, kappa=1, variant="kappa")
+
+    D1, D2 = grid(1e-3,1e0,1e-2,1e1,6,6)
+
+    np.random.seed(0)
+    E = model.E(D1, D2)
+    Efit = E*(1+(np.random.rand(len(D1))-0.5)/10.)
+
+    single = BRAID(variant="kappa")
+    single.fit(D1, D2, Efit)
+
+    # The first start is the usual initial guess, so multi-start can only improve the fit
+    model = BRAID(variant="kappa")
+    model.fit(D1, D2, Efit, n_starts=6, seed=0)
+    assert model.converged
+    assert model.n_starts == 6
+    assert model.sum_of_squares_residuals <= single.sum_of_squares_residuals*(1+1e-6)
+
+    model.fit(D1, D2, Efit, n_starts=20, n_starts_agree=2, seed=0)
+    assert model.n_starts < 20
@@ -0,0 +1,41 @@
+def test_synergyfinder_round_trip():
+    import io
+    import numpy as np
+    from synergy.utils import data_exchange
+    from synergy.utils.dose_tools import grid
+
+    d1, d2 = grid(1e-3, 10, 1e-3, 10, 5, 5)
+    n_blocks = 7
+    block_id = np.repeat(np.arange(n_blocks), len(d1))
+    names = np.repeat(["drug_%d"%i for i in range(n_blocks)], len(d1))
+    D1, D2 = np.tile(d1, n_blocks), np.tile(d2, n_blocks)
+    E = np.random.uniform(0, 1, len(D1))
+
+    table = data_exchange.to_synergyfinder(D1, D2, E, d1_name=names, block_id=block_id)
+    if data_exchange.pandas_installed:
+        table = table.to_csv(index=False)
+
+    # A small chunk_size splits blocks across chunks
+    blocks = list(data_exchange.from_synergyfinder(io.StringIO(table), chunk_size=12))
+    assert [block[0] for block in blocks] == [str(i) for i in range(n_blocks)]
+    for i, (bid, d1_name, d2_name, b1, b2, bE) in enumerate(blocks):
+        rows = block_id == i
+        assert (d1_name, d2_name) == ("drug_%d"%i, "drug2")
+        assert np.allclose(b1, D1[rows], rtol=1e-10) and np.allclose(b2, D2[rows], rtol=1e-10)
+        assert np.allclose(bE, E[rows], rtol=1e-10)
+
+def test_synergyfinder_quoted_names(monkeypatch):
+    import io
+    import numpy as np
+    from synergy.utils import data_exchange
+
+    d1 = np.array([0, 1, 0, 1.])
+    d2 = np.array([0, 0, 1, 1.])
+    E = np.array([1, 0.5, 0.6, 0.2])
+
+    # Names containing the delimiter or quotes survive the CSV writer without pandas
+    monkeypatch.setattr(data_exchange, "pandas_installed", False)
+    table = data_exchange.to_synergyfinder(d1, d2, E, d1_name="a,b", d2_name=np.repeat(['say "x"'], 4), d1_unit="%")
+    (block,) = data_exchange.from_synergyfinder(io.StringIO(table))
+    assert block[:3] == ("1", "a,b", 'say "x"')
+    assert np.allclose(np.column_stack(block[3:]), np.column_stack([d1, d2, E]))
@@ -0,0 +1,30 @@
+def test_fit_cache():
+    import numpy as np
+    import tempfile
+    from synergy import utils
+    from synergy.combination import Loewe, Schindler, Bliss
+    from synergy.datasets import bliss_independent
+
+    d1, d2, E = bliss_independent()
+
+    uncached = [Loewe().fit(d1, d2, E), Schindler().fit(d1, d2, E)]
+
+    path = tempfile.mkdtemp()
+    cache = utils.fit_cache.enable(max_size=2, path=path)
+    try:
+        # Schindler reuses Loewe's Hill fits
+        cached = [Loewe().fit(d1, d2, E), Schindler().fit(d1, d2, E)]
+        assert (cache.hits, cache.misses) == (2, 2)
+        for a, b in zip(uncached, cached):
+            assert np.allclose(a, b, equal_nan=True)
+
+        # MarginalLinear fits are cached separately, evicting the Hill fits from memory
+        Bliss().fit(d1, d2, E)
+        assert cache.misses == 4 and len(cache) == 2
+
+        # ... but the Hill fits are still on disk
+        cache = utils.fit_cache.enable(path=path)
+        assert np.allclose(Loewe().fit(d1, d2, E), uncached[0], equal_nan=True)
+        assert (cache.hits, cache.misses) == (2, 0)
+    finally:
+        utils.fit_cache.disable()
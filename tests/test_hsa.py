@@ -22,3 +22,28 @@ def test_HSA_sham_3():
     synergy = model.fit(d, E)
     assert np.nanmean(synergy)>0.08
 
+
+def test_marginal_linear_many():
+    import numpy as np
+    from synergy.single import MarginalLinear
+
+    np.random.seed(0)
+    groups = np.repeat(np.arange(20), 24)
+    d = np.tile(np.repeat([0, 0.01, 0.1, 1, 10, 100], 4), 20)
+    E = 1 - np.log1p(d)/10 + np.random.normal(0, 0.0001, len(d))
+
+    stacked = MarginalLinear(aggregation_function=np.median)
+    stacked._from_fit_many(stacked.fit_many(d, E, groups))
+
+    doses = np.array([0, 0.05, 5, 100, 200])
+    effects = np.linspace(0.6, 0.95, 5)
+    E_stacked = stacked.E(doses)
+    d_stacked = stacked.E_inv(effects)
+    for group in range(20):
+        model = MarginalLinear(aggregation_function=np.median)
+        model.fit(d[groups==group], E[groups==group])
+        assert np.allclose(model.E(doses), E_stacked[group], equal_nan=True)
+        assert np.allclose(model.E_inv(effects), d_stacked[group], equal_nan=True)
+
+        # E_inv works for decreasing dose responses
+        assert np.allclose(model.E(model.E_inv(effects)), effects)
@@ -62,4 +62,83 @@ def test_loewe_delta_variant():
     model = Loewe(variant="delta")
 
     synergy = model.fit(d1, d2, E)
-    assert np.nanmax(np.abs(synergy))<0.1
\ No newline at end of file
+    assert np.nanmax(np.abs(synergy))<0.1
+
+def test_loewe_delta_reference():
+    import numpy as np
+    from synergy.combination import Loewe
+    from synergy.single import Hill
+    from synergy.utils.dose_tools import grid
+
+    d1, d2 = grid(1e-3, 10, 1e-3, 10, 8, 8)
+    drug1_model = Hill(E0=1, Emax=0.3, h=1.2, C=0.05)
+    drug2_model = Hill(E0=1, Emax=0.5, h=0.8, C=0.3)
+
+    for variant in ["delta", "delta_hsa", "delta_nan", "delta_synergyfinder"]:
+        model = Loewe(variant=variant)
+        assert model._get_single_drug_classes() == (Hill, Hill)
+
+        ref = model._E_reference(d1, d2, drug1_model, drug2_model)
+
+        # Wherever Loewe is defined, the reference lies on the isobole
+        solved = (drug1_model.E(d1) >= 0.5) & (drug2_model.E(d2) >= 0.5)
+        CI = d1/drug1_model.E_inv(ref) + d2/drug2_model.E_inv(ref)
+        assert np.allclose(CI[solved], 1)
+
+    assert np.isnan(ref).sum() == 0
+    assert np.isnan(Loewe(variant="delta_nan")._E_reference(d1, d2, drug1_model, drug2_model)).any()
+
+def test_loewe_delta_sham_3():
+    import numpy as np
+    from synergy.higher import Loewe
+    from synergy.datasets import sham_3
+
+    d, E = sham_3(noise=0.01)
+
+    model = Loewe(variant="delta")
+
+    synergy = model.fit(d, E)
+    assert np.nanmax(np.abs(synergy))<0.1
+
+def test_loewe_delta_higher_matches_combination():
+    import numpy as np
+    from synergy.combination import Loewe as Loewe2
+    from synergy.higher import Loewe
+    from synergy.single import Hill
+    from synergy.utils.dose_tools import grid
+
+    d1, d2 = grid(1e-3, 10, 1e-3, 10, 8, 8, include_zero=True)
+    drug1_model = Hill(E0=1, Emax=0.3, h=1.2, C=0.05)
+    drug2_model = Hill(E0=1, Emax=0.5, h=0.8, C=0.3)
+
+    for variant in ["delta", "delta_hsa", "delta_nan", "delta_synergyfinder"]:
+        ref_2 = Loewe2(variant=variant)._E_reference(d1, d2, drug1_model, drug2_model)
+        ref_n = Loewe(variant=variant)._E_reference(np.vstack([d1, d2]).T, [drug1_model, drug2_model])
+        assert np.allclose(ref_2, ref_n, equal_nan=True)
+
+def test_loewe_delta_higher_bootstrap():
+    import numpy as np
+    from synergy.higher import Loewe
+    from synergy.single import Hill
+    from synergy.utils import dose_tools
+    from synergy.utils.fit_tools import resample_within_groups, resample_seeds
+
+    d = dose_tools.grid_multi((1e-3,)*3, (10,)*3, (5,)*3, include_zero=True)
+    d = np.vstack([d, d])
+    np.random.seed(0)
+    E = np.prod([Hill(E0=1, Emax=0.1, h=1, C=0.1*(i+1)).E(d[:,i]) for i in range(3)], axis=0) + np.random.normal(0, 0.02, len(d))
+
+    model = Loewe(variant="delta")
+    model.fit(d, E)
+    reference = model.reference
+    bootstrap_synergy = model.bootstrap(d, E, bootstrap_iterations=20, seed=1)
+    assert bootstrap_synergy.shape == (20, len(E))
+    assert np.allclose(model.reference, reference)
+
+    # Each resample is scored as if it were fit on its own
+    np.random.seed(1)
+    resample = resample_within_groups(dose_tools.DoseGrid(d).replicates, resample_seeds(20))[3]
+    assert np.allclose(bootstrap_synergy[3], Loewe(variant="delta").fit(d, E[resample]), atol=1e-3, equal_nan=True)
+
+    lower, upper = model.get_synergy_range()
+    assert np.all(upper >= lower)
@@ -51,6 +51,58 @@ def test_musyc_no_gamma():
 
     assert model.r_squared > 0.9
 
+def test_musyc_model_matches_expanded_form():
+    import numpy as np
+    from synergy.combination import MuSyC
+    from synergy.utils.dose_tools import grid
+
+    # The fully expanded steady state of the four-state model, as MuSyC._model computed it before it was simplified
+    def expanded_model(d1, d2, E0, E1, E2, E3, h1, h2, C1, C2, r1r, r2r, alpha12, alpha21, gamma12, gamma21):
+        d1h1 = np.power(d1,h1)
+        d2h2 = np.power(d2,h2)
+
+        C1h1 = np.power(C1,h1)
+        C2h2 = np.power(C2,h2)
+
+        r1 = r1r/C1h1
+        r2 = r2r/C2h2
+
+        alpha21d1gamma21h1 = np.power(alpha21*d1, gamma21*h1)
+        alpha12d2gamma12h2 = np.power(alpha12*d2, gamma12*h2)
+
+        C12h1 = np.power(C1,2*h1)
+        C22h2 = np.power(C2,2*h2)
+
+        # ********** U ********
+
+        U=(r1*r2*np.power((r1*C1h1),gamma21)*C1h1*C2h2+r1*r2*np.power((r2*C2h2),gamma12)*C1h1*C2h2+np.power(r1,(gamma21+1))*alpha21d1gamma21h1*np.power((r2*C2h2),gamma12)*C1h1+np.power(r2,(gamma12+1))*alpha12d2gamma12h2*np.power((r1*C1h1),gamma21)*C2h2)/(d1h1*r1*r2*np.power((r1*C1h1),gamma21)*C2h2+d1h1*r1*r2*np.power((r2*C2h2),gamma12)*C2h2+d1h1*r1*np.power(r2,(gamma12+1))*alpha12d2gamma12h2*C2h2+d1h1*r1*np.power(r2,gamma12)*alpha12d2gamma12h2*np.power((r1*C1h1),gamma21)+d1h1*np.power(r1,(gamma21+1))*np.power(r2,gamma12)*alpha21d1gamma21h1*alpha12d2gamma12h2+d1h1*np.power(r1,(gamma21+1))*alpha21d1gamma21h1*np.power((r2*C2h2),gamma12)+d2h2*r1*r2*np.power((r1*C1h1),gamma21)*C1h1+d2h2*r1*r2*np.power((r2*C2h2),gamma12)*C1h1+d2h2*np.power(r1,(gamma21+1))*r2*alpha21d1gamma21h1*C1h1+d2h2*np.power(r1,gamma21)*r2*alpha21d1gamma21h1*np.power((r2*C2h2),gamma12)+d2h2*np.power(r1,gamma21)*np.power(r2,(gamma12+1))*alpha21d1gamma21h1*alpha12d2gamma12h2+d2h2*np.power(r2,(gamma12+1))*alpha12d2gamma12h2*np.power((r1*C1h1),gamma21)+r1*r2*np.power((r1*C1h1),gamma21)*C1h1*C2h2+r1*r2*np.power((r2*C2h2),gamma12)*C1h1*C2h2+np.power(r1,(gamma21+1))*alpha21d1gamma21h1*np.power((r2*C2h2),gamma12)*C1h1+np.power(r2,(gamma12+1))*alpha12d2gamma12h2*np.power((r1*C1h1),gamma21)*C2h2)
+
+        #**********E1********
+
+        A1=(d1h1*r1*r2*np.power((r1*C1h1),gamma21)*C2h2+d1h1*r1*r2*np.power((r2*C2h2),gamma12)*C2h2+d1h1*np.power(r1,(gamma21+1))*alpha21d1gamma21h1*np.power((r2*C2h2),gamma12)+d2h2*np.power(r1,gamma21)*r2*alpha21d1gamma21h1*np.power((r2*C2h2),gamma12))/(d1h1*r1*r2*np.power((r1*C1h1),gamma21)*C2h2+d1h1*r1*r2*np.power((r2*C2h2),gamma12)*C2h2+d1h1*r1*np.power(r2,(gamma12+1))*alpha12d2gamma12h2*C2h2+d1h1*r1*np.power(r2,gamma12)*alpha12d2gamma12h2*np.power((r1*C1h1),gamma21)+d1h1*np.power(r1,(gamma21+1))*np.power(r2,gamma12)*alpha21d1gamma21h1*alpha12d2gamma12h2+d1h1*np.power(r1,(gamma21+1))*alpha21d1gamma21h1*np.power((r2*C2h2),gamma12)+d2h2*r1*r2*np.power((r1*C1h1),gamma21)*C1h1+d2h2*r1*r2*np.power((r2*C2h2),gamma12)*C1h1+d2h2*np.power(r1,(gamma21+1))*r2*alpha21d1gamma21h1*C1h1+d2h2*np.power(r1,gamma21)*r2*alpha21d1gamma21h1*np.power((r2*C2h2),gamma12)+d2h2*np.power(r1,gamma21)*np.power(r2,(gamma12+1))*alpha21d1gamma21h1*alpha12d2gamma12h2+d2h2*np.power(r2,(gamma12+1))*alpha12d2gamma12h2*np.power((r1*C1h1),gamma21)+r1*r2*np.power((r1*C1h1),gamma21)*C1h1*C2h2+r1*r2*np.power((r2*C2h2),gamma12)*C1h1*C2h2+np.power(r1,(gamma21+1))*alpha21d1gamma21h1*np.power((r2*C2h2),gamma12)*C1h1+np.power(r2,(gamma12+1))*alpha12d2gamma12h2*np.power((r1*C1h1),gamma21)*C2h2)
+
+        #**********E2********
+
+        A2=(d1h1*r1*np.power(r2,gamma12)*alpha12d2gamma12h2*np.power((r1*C1h1),gamma21)+d2h2*r1*r2*np.power((r1*C1h1),gamma21)*C1h1+d2h2*r1*r2*np.power((r2*C2h2),gamma12)*C1h1+d2h2*np.power(r2,(gamma12+1))*alpha12d2gamma12h2*np.power((r1*C1h1),gamma21))/(d1h1*r1*r2*np.power((r1*C1h1),gamma21)*C2h2+d1h1*r1*r2*np.power((r2*C2h2),gamma12)*C2h2+d1h1*r1*np.power(r2,(gamma12+1))*alpha12d2gamma12h2*C2h2+d1h1*r1*np.power(r2,gamma12)*alpha12d2gamma12h2*np.power((r1*C1h1),gamma21)+d1h1*np.power(r1,(gamma21+1))*np.power(r2,gamma12)*alpha21d1gamma21h1*alpha12d2gamma12h2+d1h1*np.power(r1,(gamma21+1))*alpha21d1gamma21h1*np.power((r2*C2h2),gamma12)+d2h2*r1*r2*np.power((r1*C1h1),gamma21)*C1h1+d2h2*r1*r2*np.power((r2*C2h2),gamma12)*C1h1+d2h2*np.power(r1,(gamma21+1))*r2*alpha21d1gamma21h1*C1h1+d2h2*np.power(r1,gamma21)*r2*alpha21d1gamma21h1*np.power((r2*C2h2),gamma12)+d2h2*np.power(r1,gamma21)*np.power(r2,(gamma12+1))*alpha21d1gamma21h1*alpha12d2gamma12h2+d2h2*np.power(r2,(gamma12+1))*alpha12d2gamma12h2*np.power((r1*C1h1),gamma21)+r1*r2*np.power((r1*C1h1),gamma21)*C1h1*C2h2+r1*r2*np.power((r2*C2h2),gamma12)*C1h1*C2h2+np.power(r1,(gamma21+1))*alpha21d1gamma21h1*np.power((r2*C2h2),gamma12)*C1h1+np.power(r2,(gamma12+1))*alpha12d2gamma12h2*np.power((r1*C1h1),gamma21)*C2h2)
+
+
+        return U*E0 + A1*E1 + A2*E2 + (1-(U+A1+A2))*E3
+
+    E0, E1, E2, E3 = 1, 0.6, 0.4, 0.1
+    h1, h2 = 2.3, 0.8
+    C1, C2 = 1e-2, 1e-1
+    alpha12, alpha21 = 3.2, 0.4
+    gamma12, gamma21 = 0.6, 1.7
+    r = 5.
+
+    d1, d2 = grid(1e-4,1e1,1e-4,1e1,10,10, include_zero=True)
+
+    model = MuSyC()
+    E = model._model(d1, d2, E0, E1, E2, E3, h1, h2, C1, C2, r*C1**h1, r*C2**h2, alpha12, alpha21, gamma12, gamma21)
+    E_expanded = expanded_model(d1, d2, E0, E1, E2, E3, h1, h2, C1, C2, r*C1**h1, r*C2**h2, alpha12, alpha21, gamma12, gamma21)
+
+    assert np.allclose(E, E_expanded, rtol=1e-10, atol=1e-12)
+
 def test_musyc_higher():
     import numpy as np
     from synergy.utils import dose_tools
@@ -82,4 +134,151 @@ def test_musyc_higher():
     model = MuSyC(E_bounds=(0,2), h_bounds=(1e-3,1e3), alpha_bounds=(1e-5, 1e5), gamma_bounds=(1e-5,1e5))
     model.fit(d, E_fit)
 
-    assert model.r_squared > 0.9
\ No newline at end of file
+    assert model.r_squared > 0.9
+
+def test_musyc_higher_dose_grid():
+    import numpy as np
+    from synergy.utils import dose_tools
+    from synergy.higher import MuSyC
+
+    truemodel = MuSyC()
+    truemodel.parameters = [1,0.5,0.4,0.2,0.3,0.1,0.1,0] + [1,1.5,0.8] + [0.1,0.01,0.1] + [1,]*18
+
+    d = dose_tools.grid_multi((1e-3,1e-3,1e-3),(1,1,1),(4,4,4), include_zero=True)
+    E = truemodel.E(d)
+    grid = dose_tools.DoseGrid(d)
+
+    # The initial guess (from corner and single-drug slices) is the same whether given the grid or the raw doses
+    p0_raw = MuSyC()._get_initial_guess(d, E)
+    p0_grid = MuSyC()._get_initial_guess(grid, E)
+    assert np.allclose(p0_raw, p0_grid)
+    assert np.allclose(truemodel.E(grid), E)
+
+def test_musyc_higher_lazy_grid():
+    import numpy as np
+    from synergy.utils import dose_tools
+    from synergy.higher import MuSyC
+
+    truemodel = MuSyC()
+    truemodel.parameters = [1,0.5,0.4,0.2,0.3,0.1,0.1,0] + [1,1.5,0.8] + [0.1,0.01,0.1] + [1,]*18
+
+    d = dose_tools.grid_multi((1e-3,1e-3,1e-3),(1,1,1),(5,6,7), include_zero=True)
+    lazy = dose_tools.grid_multi((1e-3,1e-3,1e-3),(1,1,1),(5,6,7), include_zero=True, lazy=True)
+    assert len(lazy) == len(d) and lazy.shape == d.shape
+    assert np.array_equal(np.asarray(lazy), d)
+    assert np.array_equal(np.concatenate(list(lazy.chunks(50))), d)
+    assert np.array_equal(lazy[17], d[17]) and np.array_equal(lazy[-3:], d[-3:]) and np.array_equal(lazy[:,2], d[:,2])
+
+    # A subgrid holds the rows of the selected dose levels, in the same order
+    sub = lazy.subgrid([slice(1, None), [0, 2], None])
+    rows = (d[:,0] > 0) & np.isin(d[:,1], lazy.doses[1][[0, 2]])
+    assert np.array_equal(np.asarray(sub), d[rows])
+
+    truemodel.max_chunk_elements = 2**10
+    assert np.allclose(truemodel.E(lazy), truemodel.E(d))
+
+def test_musyc_higher_jacobian(check_jacobian):
+    from synergy.utils import dose_tools
+    from synergy.higher import MuSyC
+
+    d = dose_tools.grid_multi((1e-3,1e-3,1e-3),(1,1,1),(4,4,4), include_zero=True)
+
+    E_params = [2,1,1,1,1,0,0,0]
+    h_params = [2,1,0.8]
+    C_params = [0.1,0.01,0.1]
+    alpha_params = [2,3,1,1,0.7,0.5,2,1,1]
+    gamma_params = [0.4,2,1,2,0.7,3,2,0.5,2]
+
+    for variant in ["full", "no_gamma"]:
+        model = MuSyC(variant=variant, r=0.5)
+        if variant == "full":
+            params = E_params + h_params + C_params + alpha_params + gamma_params
+        else:
+            params = E_params + h_params + C_params + alpha_params
+        model._build_edge_indices(3)
+        check_jacobian(model, d, model._transform_params_to_fit(params))
+
+def test_musyc_fit_many():
+    import numpy as np
+    from synergy.combination import MuSyC
+    from synergy.utils.dose_tools import grid
+
+    D1, D2 = grid(1e-3,1e0,1e-2,1e1,8,12)
+
+    np.random.seed(0)
+    d1, d2, E, group_ids = [], [], [], []
+    for group, alpha12 in enumerate([0.3, 1., 3.2]):
+        model = MuSyC(E0=1, E1=0.2, E2=0.1, E3=0, h1=2.3, h2=0.8, C1=1e-2, C2=1e-1, alpha12=alpha12, alpha21=1.1, gamma12=4.1, gamma21=0.5)
+        Egroup = model.E(D1, D2)
+        d1.append(D1)
+        d2.append(D2)
+        E.append(Egroup*(1+(np.random.rand(len(D1))-0.5)/10.))
+        group_ids.append(["pair_%d"%group,]*len(D1))
+
+    table = MuSyC().fit_many(np.hstack(d1), np.hstack(d2), np.hstack(E), np.hstack(group_ids))
+
+    assert list(table['group']) == ["pair_0", "pair_1", "pair_2"]
+    assert np.all(table['r_squared'] > 0.9)
+    assert table['alpha12'][0] < table['alpha12'][2]
+
+def test_musyc_fit_many_matches_fit():
+    import numpy as np
+    from synergy.combination import MuSyC
+    from synergy.utils.dose_tools import grid
+
+    D1, D2 = grid(1e-3,1e0,1e-2,1e1,8,8)
+
+    np.random.seed(0)
+    d1, d2, E, group_ids = [], [], [], []
+    for group in range(6):
+        model = MuSyC(E0=1, E1=np.random.uniform(0.1,0.5), E2=np.random.uniform(0.1,0.5), E3=np.random.uniform(0,0.1), h1=np.random.uniform(0.8,2), h2=np.random.uniform(0.8,2), C1=10**np.random.uniform(-2.5,-1), C2=10**np.random.uniform(-1.5,0), alpha12=10**np.random.uniform(-0.5,0.5), alpha21=10**np.random.uniform(-0.5,0.5), gamma12=10**np.random.uniform(-0.3,0.3), gamma21=10**np.random.uniform(-0.3,0.3))
+        d1.append(D1)
+        d2.append(D2)
+        E.append(model.E(D1, D2) + np.random.normal(0, 0.02, len(D1)))
+        group_ids.append(np.full(len(D1), group))
+
+    table = MuSyC().fit_many(np.hstack(d1), np.hstack(d2), np.hstack(E), np.hstack(group_ids))
+
+    for group in range(6):
+        model = MuSyC()
+        model.fit(D1, D2, E[group])
+        assert table['converged'][group] == model.converged
+        assert table['sum_of_squares_residuals'][group] <= model.sum_of_squares_residuals*(1+1e-6)
+
+    # Groups that run out of iterations are not reported as converged
+    table = MuSyC().fit_many(np.hstack(d1), np.hstack(d2), np.hstack(E), np.hstack(group_ids), max_iterations=1)
+    assert not np.any(table['converged'])
+
+def test_musyc_jacobian(check_jacobian):
+    import numpy as np
+    from synergy.combination import MuSyC
+    from synergy.utils.dose_tools import grid
+
+    d = np.vstack(grid(1e-3,1e0,1e-2,1e1,6,6))
+
+    params = [1, 0.3, 0.2, 0.05, 1.7, 0.8, 2e-2, 1e-1, 2.5, 0.4, 1.6, 0.7]
+    for variant in ["full", "no_gamma"]:
+        model = MuSyC(variant=variant)
+        check_jacobian(model, d, model._transform_params_to_fit(params if variant == "full" else params[:10]))
+
+def test_musyc_parallel_bootstrap():
+    import numpy as np
+    from synergy.combination import MuSyC
+    from synergy.utils.dose_tools import grid
+
+    model = MuSyC(E0=1, E1=0.2, E2=0.1, E3=0, h1=2.3, h2=0.8, C1=1e-2, C2=1e-1, alpha12=3.2, alpha21=1.1, gamma12=4.1, gamma21=0.5)
+
+    D1, D2 = grid(1e-3,1e0,1e-2,1e1,8,12)
+
+    np.random.seed(0)
+    E = model.E(D1, D2)
+    Efit = E*(1+(np.random.rand(len(D1))-0.5)/10.)
+
+    serial = MuSyC()
+    serial.fit(D1, D2, Efit, bootstrap_iterations=6, seed=1)
+
+    parallel = MuSyC()
+    parallel.fit(D1, D2, Efit, bootstrap_iterations=6, seed=1, n_jobs=2)
+
+    assert serial.bootstrap_parameters.shape[0] > 0
+    assert np.array_equal(serial.bootstrap_parameters, parallel.bootstrap_parameters)
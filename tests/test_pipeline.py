@@ -0,0 +1,47 @@
+def test_process_blocks_resume():
+    import csv
+    import os
+    import tempfile
+    import numpy as np
+    import pytest
+    from synergy import pipeline
+    from synergy.combination import Bliss, Zimmer
+    from synergy.utils.dose_tools import grid
+
+    np.random.seed(0)
+    d1, d2 = grid(1e-2, 10, 1e-2, 10, 6, 6)
+    blocks = []
+    for i in range(4):
+        E = Zimmer(h1=1, h2=1.2, C1=0.1, C2=0.3, a12=0.5*i, a21=0).E(d1, d2) + np.random.normal(0, 0.01, len(d1))
+        blocks.append(("combo_%d"%i, d1, d2, E))
+    models = [Bliss, (Zimmer, dict(bootstrap_iterations=3))]
+
+    path = tempfile.mkdtemp()
+    expected = os.path.join(path, "expected.csv")
+    np.random.seed(1)
+    assert pipeline.process_blocks(blocks, models, expected) == 4
+
+    def crash_after(n):
+        for block in blocks[:n]:
+            yield block
+        raise RuntimeError("crashed")
+
+    output = os.path.join(path, "output.csv")
+    np.random.seed(1)
+    with pytest.raises(RuntimeError):
+        pipeline.process_blocks(crash_after(2), models, output)
+    # Rows written after the last checkpoint (e.g., an interrupted block) are dropped on resume
+    with open(output, "a") as f:
+        f.write("combo_2,Bliss,mean,0.5")
+    assert pipeline.process_blocks(blocks, models, output) == 2
+    assert pipeline.process_blocks(blocks, models, output) == 0
+
+    with open(expected) as f:
+        expected_rows = list(csv.reader(f))
+    with open(output) as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == list(pipeline.OUTPUT_COLUMNS)
+    # Bootstrap intervals differ between runs, but every row and fit parameter is the same
+    assert [row[:4] for row in rows if row[3] != "" and row[4] == ""] == [row[:4] for row in expected_rows if row[3] != "" and row[4] == ""]
+    assert [row[:3] for row in rows] == [row[:3] for row in expected_rows]
+    assert {row[0] for row in rows[1:]} == {"combo_%d"%i for i in range(4)}
@@ -51,3 +51,24 @@ def test_schindler_msp_3():
     synergy = model.fit(d, E)
     assert np.nanmax(np.abs(synergy))>0.1
 
+
+def test_schindler_plates():
+    import numpy as np
+    from synergy.combination import Schindler
+    from synergy.datasets import linear_isobole, bliss_independent
+
+    d1, d2, E_linear = linear_isobole()
+    _, _, E_bliss = bliss_independent()
+    E = np.vstack([E_linear, E_bliss])
+
+    model = Schindler()
+    synergy = model.fit_plates(d1, d2, E)
+    assert synergy.shape == E.shape
+
+    for plate in range(E.shape[0]):
+        assert np.allclose(synergy[plate], Schindler().fit(d1, d2, E[plate]), atol=1e-4, equal_nan=True)
+
+    # Pre-fit single-drug parameters are used as given
+    parameters = np.column_stack(model.drug1_model.get_parameters())
+    synergy_given = Schindler().fit_plates(d1, d2, E, drug1_parameters=parameters, drug2_parameters=np.column_stack(model.drug2_model.get_parameters()))
+    assert np.allclose(synergy, synergy_given, equal_nan=True)
@@ -0,0 +1,61 @@
+def test_read_screen():
+    import numpy as np
+    import os
+    import tempfile
+    from synergy import utils
+    from synergy.combination import Bliss
+    from synergy.datasets import bliss_independent
+
+    d1, d2, E = bliss_independent()
+    n = len(E)
+    names = ["plate_b", "plate_a", "plate,c"]
+    rng = np.random.RandomState(0)
+    perm = rng.permutation(3*n)
+    rows = [(names[k], float(d1[i]), float(d2[i]), float(E[i]) + 0.01*k) for k in range(3) for i in range(n)]
+    rows = [rows[i] for i in perm]
+
+    path = os.path.join(tempfile.mkdtemp(), "screen.csv")
+    with open(path, "w") as f:
+        f.write("effect,combination_id,drug1.conc,drug2.conc\n")
+        for name, a, b, e in rows:
+            f.write('%r,"%s",%r,%r\n' % (e, name, a, b))
+
+    screen = utils.screen.read_screen(path)
+    assert len(screen) == 3 and screen.n_drugs == 2
+    assert list(screen.groups) == sorted(names)
+    assert np.array_equal(screen.offsets, [0, n, 2*n, 3*n])
+
+    # Blocks are views of the sorted columns, with rows in file order within each group
+    d, E_block = screen.get("plate_b")
+    assert np.shares_memory(d, screen.doses) and np.shares_memory(E_block, screen.E)
+    in_file_order = [(a, b, e) for name, a, b, e in rows if name == "plate_b"]
+    assert np.allclose(np.column_stack([d, E_block]), in_file_order)
+    for group, d, E_block in screen:
+        assert d.shape == (n, 2) and len(E_block) == n
+
+    # Equal-sized groups can be fit as a stack of plates
+    doses, E_plates = screen.as_plates()
+    model = Bliss()
+    synergy = model.fit_plates(doses[0], doses[1], E_plates)
+    for k, (group, d, E_block) in enumerate(screen):
+        assert np.allclose(synergy[k], Bliss().fit(d[:,0], d[:,1], E_block), equal_nan=True)
+
+def test_read_screen_missing_values(monkeypatch):
+    import numpy as np
+    import os
+    import tempfile
+    from synergy.utils import screen
+
+    path = os.path.join(tempfile.mkdtemp(), "screen.csv")
+    with open(path, "w") as f:
+        f.write("combination_id,drug1.conc,drug2.conc,effect\n")
+        f.write('a,0,0,1\n"a",1,,0.5\nb,0,1,\nb,1,1,0.25\n')
+
+    # With and without pandas, empty cells are nan
+    readers = [False, True] if screen.pandas_installed else [False]
+    for pandas_installed in readers:
+        monkeypatch.setattr(screen, "pandas_installed", pandas_installed)
+        result = screen.read_screen(path)
+        assert list(result.groups) == ["a", "b"]
+        assert np.array_equal(result.d, [[0, 0], [1, np.nan], [0, 1], [1, 1]], equal_nan=True)
+        assert np.array_equal(result.E, [1, 0.5, np.nan, 0.25], equal_nan=True)
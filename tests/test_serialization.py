@@ -0,0 +1,57 @@
+def test_serialization():
+    import numpy as np
+    import pickle
+    import pytest
+    import sys
+    from synergy import utils
+    from synergy.combination import MuSyC, Zimmer
+    from synergy.single import Hill
+    from synergy.higher import MuSyC as MuSyCHigher
+    from synergy.utils.dose_tools import grid, grid_multi
+
+    np.random.seed(0)
+    d1, d2 = grid(1e-2, 10, 1e-2, 10, 6, 6)
+    truth = MuSyC(E0=1, E1=0.5, E2=0.3, E3=0, h1=1, h2=1.5, C1=0.1, C2=0.3, alpha12=2, alpha21=1, gamma12=1, gamma21=1)
+    E = truth.E(d1, d2) + np.random.normal(0, 0.01, len(d1))
+
+    model = MuSyC(E0_bounds=(0, 2))
+    model.fit(d1, d2, E, bootstrap_iterations=5)
+    for restored in (MuSyC.from_bytes(model.to_bytes()), MuSyC.from_json(model.to_json()), pickle.loads(pickle.dumps(model))):
+        assert np.allclose(restored.E(d1, d2), model.E(d1, d2))
+        assert np.array_equal(restored.bootstrap_parameters, model.bootstrap_parameters)
+        assert (restored.E0_bounds, restored.variant, restored.r_squared) == (model.E0_bounds, model.variant, model.r_squared)
+        assert restored.summary() == model.summary()
+
+    # Restored models can be refit
+    restored = MuSyC.from_bytes(model.to_bytes())
+    restored.fit(d1, d2, E)
+    assert restored.converged
+
+    # Many models of one class are written together
+    hills = [Hill(E0=1, Emax=0, h=h, C=0.1) for h in np.linspace(0.5, 2, 20)]
+    hills[3].fit(d1[d2==d2.min()], E[d2==d2.min()], bootstrap_iterations=3)
+    restored = utils.serialization.from_bytes(utils.serialization.to_bytes(hills))
+    assert len(restored) == len(hills)
+    for a, b in zip(hills, restored):
+        assert np.allclose(a.E(d1), b.E(d1))
+        assert (a.bootstrap_parameters is None) == (b.bootstrap_parameters is None)
+    assert np.array_equal(restored[3].bootstrap_parameters, hills[3].bootstrap_parameters)
+
+    with pytest.raises(ValueError):
+        utils.serialization.to_bytes([hills[0], Zimmer()])
+    with pytest.raises(TypeError):
+        Zimmer.from_bytes(model.to_bytes())
+
+    # Modules outside synergy are never imported
+    data = model.to_dict()
+    data["class"] = "antigravity:Hill"
+    with pytest.raises(ValueError):
+        utils.serialization.from_dict(data)
+    assert "antigravity" not in sys.modules
+
+    d = grid_multi((1e-2,)*3, (10,)*3, (4,)*3)
+    model = MuSyCHigher(E_bounds=(0, 1.5))
+    model.fit(d, np.prod(1/(1+d/0.5), axis=1) + np.random.normal(0, 0.01, len(d)))
+    restored = MuSyCHigher.from_bytes(model.to_bytes())
+    assert np.allclose(restored.E(d), model.E(d))
+    assert restored.summary() == model.summary()
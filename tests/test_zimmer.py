@@ -20,4 +20,54 @@ def test_zimmer():
 
     model.fit(D1, D2, Efit)
 
-    assert model.r_squared > 0.9
\ No newline at end of file
+    assert model.r_squared > 0.9
+
+def test_zimmer_adaptive_bootstrap():
+    import numpy as np
+    from synergy.combination import Zimmer
+    from synergy.utils.dose_tools import grid
+
+    model = Zimmer(h1=2.3, h2=0.8, C1=1e-2, C2=1e-1, a12=-0.5, a21=1.2)
+
+    D1, D2 = grid(1e-3,1e0,1e-2,1e1,8,12)
+
+    np.random.seed(0)
+    E = model.E(D1, D2)
+    Efit = E*(1+(np.random.rand(len(D1))-0.5)/10.)
+
+    # A very loose tolerance converges after the second chunk
+    model.fit(D1, D2, Efit, bootstrap_iterations=100, bootstrap_tol=10., bootstrap_chunk_size=5, seed=0)
+    assert model.bootstrap_iterations == 10
+    assert model.get_parameter_range() is not None
+
+def test_zimmer_fit_keeps_random_state():
+    import numpy as np
+    from synergy.combination import Zimmer
+    from synergy.utils.dose_tools import grid
+
+    model = Zimmer(h1=2.3, h2=0.8, C1=1e-2, C2=1e-1, a12=-0.5, a21=1.2)
+
+    D1, D2 = grid(1e-3,1e0,1e-2,1e1,8,12)
+
+    np.random.seed(0)
+    E = model.E(D1, D2)
+    Efit = E*(1+(np.random.rand(len(D1))-0.5)/10.)
+
+    # Without bootstrapping, fitting does not consume the global random state
+    np.random.seed(1)
+    expected = np.random.rand()
+    np.random.seed(1)
+    Zimmer().fit(D1, D2, Efit, p0=[2, 1, 1e-2, 1e-1, 0, 0])
+    assert np.random.rand() == expected
+
+def test_zimmer_jacobian(check_jacobian):
+    import numpy as np
+    from synergy.combination import Zimmer
+    from synergy.utils.dose_tools import grid
+
+    D1, D2 = grid(1e-3,1e0,1e-2,1e1,8,12, include_zero=True)
+
+    model = Zimmer()
+    for p in [np.array([np.log(2.3), np.log(0.8), np.log(1e-2), np.log(1e-1), -0.5, 1.2]), \
+              np.array([np.log(0.7), np.log(2.), np.log(1e-1), np.log(1e-2), 1., -0.3])]:
+        check_jacobian(model, (D1, D2), p)
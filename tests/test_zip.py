@@ -15,4 +15,45 @@ def test_zip():
     model2 = ZIP()
 
     synergy = model2.fit(D1, D2, E)
-    assert np.max(synergy)>0.15
\ No newline at end of file
+    assert np.max(synergy)>0.15
+
+def test_zip_parallel():
+    import numpy as np
+    from synergy.combination import ZIP
+    from synergy.single import Hill_2P
+    from synergy.utils import sham
+
+    drug = Hill_2P(h=2.3, C=1e-2)
+    d = np.logspace(-3,1,num=6)
+    D1, D2, E = sham(d, drug)
+
+    np.random.seed(0)
+    E = E + np.random.normal(0, 0.02, len(E))
+
+    serial = ZIP()
+    synergy = serial.fit(D1, D2, E)
+
+    parallel = ZIP()
+    synergy_parallel = parallel.fit(D1, D2, E, n_jobs=2)
+
+    assert np.allclose(synergy, synergy_parallel, equal_nan=True)
+    assert np.allclose(serial._C_21, parallel._C_21, equal_nan=True)
+
+def test_zip_fit_plates():
+    import numpy as np
+    from synergy.combination import ZIP
+    from synergy.single import Hill_2P
+    from synergy.utils import sham
+
+    drug = Hill_2P(h=2.3, C=1e-2)
+    d = np.logspace(-3,1,num=6)
+    D1, D2, E = sham(d, drug)
+
+    np.random.seed(0)
+    E = E + np.random.normal(0, 0.02, (2, len(E)))
+
+    # Each plate is scored like fit(), up to the batched single-drug fits
+    plates = ZIP().fit_plates(D1, D2, E)
+    assert plates.shape == E.shape
+    assert np.allclose(plates[0], ZIP().fit(D1, D2, E[0]), atol=1e-2)
+    assert np.allclose(plates[1], ZIP().fit(D1, D2, E[1]), atol=1e-2)